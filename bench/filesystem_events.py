@@ -0,0 +1,124 @@
+"""
+Compare filesystem event backends (inotify and polling) on a large tree.
+
+For each backend, a watcher of '**/*.txt' runs beside a writer, which idles for a while,
+then modifies files one by one. It reports setup time, CPU time of the process while
+idle and while changing, and latency from each write to its Modify event.
+
+    python bench/filesystem_events.py [files] [seconds] [period]
+"""
+
+import asyncio
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from timeit import default_timer as timer
+
+sys.path.append(str(Path(__file__).parent.parent.joinpath("src")))
+
+from coxbuild.events import inotify
+from coxbuild.events.filesystems import FileSystemChangeType, changed
+
+CHANGES = 20
+FANOUT = 100
+
+
+def build(root: Path, files: int) -> list[Path]:
+    """Create a tree with directories of FANOUT files."""
+    result = []
+    for i in range(files):
+        directory = root.joinpath(f"d{i // FANOUT // FANOUT}", f"d{i // FANOUT}")
+        if i % FANOUT == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+        file = directory.joinpath(f"f{i}.txt")
+        file.write_text("0")
+        result.append(file)
+    return result
+
+
+async def measure(root: Path, files: list[Path], backend: str, seconds: float, period: float) -> dict[str, float]:
+    written: dict[Path, float] = {}
+    latencies: list[float] = []
+    started = asyncio.Event()
+
+    async def watch():
+        event = changed(root, "**/*.txt", {FileSystemChangeType.Modify},
+                        timedelta(seconds=period), backend=backend)
+        # the first step sets up watches or the initial snapshot
+        first = asyncio.ensure_future(event.__anext__())
+        await asyncio.sleep(0)
+        started.set()
+        context = await first
+        while True:
+            path = context.kwds["entry"].path
+            if path in written:
+                latencies.append(timer() - written.pop(path))
+            context = await event.__anext__()
+
+    tic = timer()
+    watcher = asyncio.ensure_future(watch())
+    # setup runs synchronously until the watcher waits for the first change
+    await started.wait()
+    setup = timer() - tic
+
+    # polling blocks the event loop, so that sleeping may take longer
+    cpu = time.process_time()
+    tic = timer()
+    await asyncio.sleep(seconds)
+    idle = (time.process_time() - cpu) / (timer() - tic)
+
+    cpu = time.process_time()
+    tic = timer()
+    for file in random.sample(files, CHANGES):
+        file = file.resolve()
+        written[file] = timer()
+        file.write_text("1")
+        await asyncio.sleep(max(period, 0.05))
+    deadline = timer() + max(period * 2, 1)
+    while written and timer() < deadline:
+        await asyncio.sleep(0.01)
+    busy = (time.process_time() - cpu) / (timer() - tic)
+
+    watcher.cancel()
+    try:
+        await watcher
+    except asyncio.CancelledError:
+        pass
+
+    return {
+        "setup": setup,
+        "idle": idle,
+        "busy": busy,
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "max": max(latencies, default=float("nan")),
+        "missed": len(written),
+    }
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+    period = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    backends = ["polling"]
+    if inotify.available():
+        backends.insert(0, "inotify")
+
+    with tempfile.TemporaryDirectory() as temp:
+        root = Path(temp)
+        tic = timer()
+        files = build(root, count)
+        print(f"Created {count} files in {timer() - tic:.2f}s, polling period {period}s.")
+        print("Backend\tSetup\tCPU idle\tCPU busy\tLatency p50\tLatency max\tMissed")
+        for backend in backends:
+            result = asyncio.run(measure(root, files, backend, seconds, period))
+            print(f"{backend}\t{result['setup']:.2f}s\t{result['idle']*100:.1f}%\t\t{result['busy']*100:.1f}%\t\t"
+                  f"{result['p50']*1000:.1f}ms\t\t{result['max']*1000:.1f}ms\t\t{result['missed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Measure time and memory of filesystem snapshots and their diff on a large tree.
+
+The legacy snapshot (one dataclass with three datetimes per entry, by glob, resolve and
+four stat calls) is compared with the compact snapshot in coxbuild.events.filesystems.
+
+    python bench/filesystem_snapshot.py [files]
+"""
+
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from timeit import default_timer as timer
+
+sys.path.append(str(Path(__file__).parent.parent.joinpath("src")))
+
+from coxbuild.events.filesystems import (DirectoryEntry, FileEntry,
+                                         FileSystemSnapshot, diff)
+
+FANOUT = 100
+GLOB = "**/*"
+
+
+class LegacySnapshot:
+    def __init__(self, path: Path, glob: str) -> None:
+        self.entries = {}
+        for item in path.glob(glob):
+            item = item.resolve()
+            stat = item.stat()
+            ctime, mtime, atime = [datetime.fromtimestamp(
+                t) for t in [stat.st_ctime, stat.st_mtime, stat.st_atime]]
+            if item.is_file():
+                entry = FileEntry(item, ctime, mtime, atime)
+            elif item.is_dir():
+                entry = DirectoryEntry(item, ctime, mtime, atime)
+            self.entries[entry.id()] = entry
+
+
+def legacyDiff(old: LegacySnapshot, new: LegacySnapshot):
+    for key in set(old.entries) | set(new.entries):
+        olde, newe = old.entries.get(key), new.entries.get(key)
+        if not olde or not newe or olde.modification < newe.modification:
+            yield key
+
+
+def build(root: Path, files: int) -> None:
+    for i in range(files):
+        directory = root.joinpath(f"d{i // FANOUT // FANOUT}", f"d{i // FANOUT}")
+        if i % FANOUT == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+        directory.joinpath(f"f{i}.txt").write_text("0")
+
+
+def measure(name: str, snapshot, differ, root: Path) -> None:
+    tic = timer()
+    old = snapshot(root, GLOB)
+    elapsed = timer() - tic
+
+    # tracing slows down allocations, so that memory is measured in another run
+    tracemalloc.start()
+    new = snapshot(root, GLOB)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tic = timer()
+    changes = sum(1 for _ in differ(old, new))
+    diffed = timer() - tic
+    print(f"{name}\t{elapsed:.2f}s\t\t{memory / 2**20:.1f} MiB\t\t{diffed * 1000:.1f}ms\t\t{changes}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as temp:
+        root = Path(temp)
+        build(root, count)
+        print(f"{count} files")
+        print("Snapshot\tTime\t\tMemory\t\tDiff (unchanged)\tChanges")
+        measure("legacy", LegacySnapshot, legacyDiff, root)
+        measure("compact", FileSystemSnapshot, diff, root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Measure cold start import time of coxbuild entry points with '-X importtime'.
+
+Each scenario runs in a fresh interpreter several times, and the median cumulative
+import time of the top-level modules is reported, with the slowest imported modules.
+With '--check', it fails if a scenario imports a deferred module, or exceeds its budget.
+
+    python bench/import_time.py [runs] [--check]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).parent.parent.joinpath("src")
+
+# scenario -> (code, budget in ms, modules which must not be imported)
+SCENARIOS: dict[str, tuple[str, float, list[str]]] = {
+    "version": (
+        "import sys; sys.argv = ['coxbuild', '--version']\n"
+        "from coxbuild.__main__ import main\n"
+        "try: main()\n"
+        "except SystemExit: pass",
+        100,
+        ["yaml", "json", "urllib.request", "graphlib", "asyncio",
+         "sqlite3", "zipfile", "ssl", "concurrent.futures.process", "coxbuild.pipelines"]),
+    "client": (
+        "import coxbuild.client",
+        50,
+        ["click", "asyncio", "coxbuild.configurations"]),
+    "schema": (
+        "import coxbuild.schema",
+        80,
+        ["yaml", "urllib.request", "asyncio", "coxbuild.pipelines"]),
+    "prelude": (
+        "from coxbuild.schema import *",
+        180,
+        ["yaml", "urllib.request", "sqlite3", "zipfile", "http.client", "concurrent.futures.process"]),
+}
+
+
+def importtime(code: str) -> tuple[float, dict[str, int]]:
+    """
+    Run code in a fresh interpreter.
+
+    Return total import time in ms, and module -> self import time in microseconds, after interpreter startup.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                            cwd=SRC, env=os.environ | {"PYTHONPATH": str(SRC)})
+    modules: dict[str, int] = {}
+    total = 0
+    started = False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|", 2)
+        toplevel = name.startswith(" ") and not name.startswith("  ")
+        name = name.strip()
+        if started:
+            modules[name] = int(own)
+            if toplevel:
+                total += int(cumulative)
+        if name == "site":
+            started = True
+    return total / 1000, modules
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    runs = int(args[0]) if args else 5
+    check = "--check" in sys.argv
+
+    failed = False
+    for name, (code, budget, deferred) in SCENARIOS.items():
+        times = []
+        for _ in range(runs):
+            elapsed, modules = importtime(code)
+            times.append(elapsed)
+        median = statistics.median(times)
+        imported = [module for module in deferred if module in modules]
+        slowest = sorted(modules.items(), key=lambda x: -x[1])[:5]
+
+        status = "ok"
+        if check and (imported or median > budget):
+            status = "FAIL"
+            failed = True
+        print(f"{name:10}\tmedian {median:8.2f} ms\tbudget {budget:6.0f} ms\t{status}")
+        if imported:
+            print(f"{'':10}\tdeferred modules imported: {', '.join(imported)}")
+        print(f"{'':10}\tslowest: " + ", ".join(
+            f"{module} {own/1000:.1f}ms" for module, own in slowest))
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measure event loop responsiveness while synchronous tasks are running.
+
+A ticker coroutine sleeps for a short interval in a loop and records how late
+each wake-up is, while a pipeline of blocking tasks runs beside it.
+
+    python bench/loop_responsiveness.py [tasks] [seconds]
+"""
+
+import asyncio
+import contextlib
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+from timeit import default_timer as timer
+
+sys.path.append(str(Path(__file__).parent.parent.joinpath("src")))
+
+from coxbuild.configurations import Configuration
+from coxbuild.pipelines import Pipeline, PipelineSettings
+from coxbuild.tasks import Task, TaskSettings
+
+INTERVAL = 0.01
+
+
+async def measure(tasks: int, seconds: float, threads: int) -> list[float]:
+    pipeline = Pipeline()
+    for i in range(tasks):
+        pipeline.register(Task(f"block{i}", lambda: time.sleep(seconds)))
+
+    config = Configuration()
+    PipelineSettings(config).jobs = tasks
+    TaskSettings(config).threads = threads
+
+    lags: list[float] = []
+    done = False
+
+    async def ticker():
+        while not done:
+            tic = timer()
+            await asyncio.sleep(INTERVAL)
+            lags.append(timer() - tic - INTERVAL)
+
+    tick = asyncio.ensure_future(ticker())
+    runner = pipeline(*pipeline.tasks.keys())
+    runner.context.config = config
+    await runner
+    done = True
+    await tick
+    return lags
+
+
+def main():
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+
+    results = {}
+    for threads in (0, tasks):
+        with contextlib.redirect_stdout(io.StringIO()):
+            lags = asyncio.run(measure(tasks, seconds, threads))
+        results[threads] = lags
+
+    for threads, lags in results.items():
+        mode = "event loop" if threads == 0 else f"thread pool ({threads})"
+        print(f"{mode:20}\tticks {len(lags):5}\tmax lag {max(lags)*1000:9.2f} ms\t"
+              f"median lag {statistics.median(lags)*1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
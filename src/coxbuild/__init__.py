@@ -12,3 +12,17 @@ def get_app_directory() -> Path:
 def get_working_directory() -> Path:
     """Get coxbuild working directory."""
     return Path(os.curdir)
+
+
+def get_cache_directory() -> Path:
+    """Get coxbuild cache directory for the current user."""
+    if os.getenv("COXBUILD_CACHE"):
+        return Path(os.environ["COXBUILD_CACHE"])
+    if os.name == "nt" and os.getenv("LOCALAPPDATA"):
+        return Path(os.environ["LOCALAPPDATA"]).joinpath("coxbuild", "cache")
+    return Path(os.getenv("XDG_CACHE_HOME") or Path.home().joinpath(".cache")).joinpath("coxbuild")
+
+
+def get_state_directory() -> Path:
+    """Get coxbuild state directory for the working directory."""
+    return get_working_directory().joinpath(".coxbuild")
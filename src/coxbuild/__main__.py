@@ -5,10 +5,6 @@ from pathlib import Path
 import click
 
 from coxbuild import __version__
-from coxbuild.configurations import Configuration
-from coxbuild.configurations.builders import (DictionaryConfigurationBuilder,
-                                              JsonConfigurationBuilder,
-                                              YamlConfigurationBuilder)
 
 
 @click.command()
@@ -21,9 +17,14 @@ from coxbuild.configurations.builders import (DictionaryConfigurationBuilder,
 @click.option('-c', '--config', multiple=True, help="Configuration entry 'key=value'.", default=[])
 @click.option('-j', '--json', multiple=True, help="Configuration in JSON.", default=[])
 @click.option('-y', '--yaml', multiple=True, help="Configuration in YAML.", default=[])
+@click.option('-J', '--jobs', type=click.IntRange(min=1), default=None, help="Maximum number of tasks running concurrently.")
+@click.option('--fail-fast', is_flag=True, default=False, help="Cancel running tasks when a task fails.")
+@click.option('--plan', is_flag=True, default=False, help="Print execution plan and estimated wall time for 1 to JOBS jobs, without running tasks.")
+@click.option('--plan-preconditions', is_flag=True, default=False, help="Evaluate up-to-date checking and preconditions in plan mode.")
+@click.option('--daemon', is_flag=True, default=False, help="Serve invocations from coxbuild-client on a Unix socket in the working directory.")
 @click.version_option(__version__, package_name="coxbuild", prog_name="coxbuild", message="%(prog)s v%(version)s, written by StardustDL.")
 @click.option('-v', '--verbose', count=True, default=0, type=click.IntRange(0, 5))
-def main(ctx=None, tasks: list[str] | None = None, directory: Path = ".", file: str = "", url: str = "", ext: str = "", uri: str = "file://buildcox.py", config: list[str] | None = None, yaml: list[str] | None = None, json: list[str] | None = None, verbose: int = 0) -> None:
+def main(ctx=None, tasks: list[str] | None = None, directory: Path = ".", file: str = "", url: str = "", ext: str = "", uri: str = "file://buildcox.py", config: list[str] | None = None, yaml: list[str] | None = None, json: list[str] | None = None, jobs: int | None = None, fail_fast: bool = False, plan: bool = False, plan_preconditions: bool = False, daemon: bool = False, verbose: int = 0) -> None:
     """
     Coxbuild is a tiny python-script-based build automation tool, an alternative to make, psake and so on.
 
@@ -40,6 +41,7 @@ def main(ctx=None, tasks: list[str] | None = None, directory: Path = ".", file:
         5: logging.NOTSET
     }[verbose]
     logging.basicConfig(level=loggingLevel)
+    logging.getLogger().setLevel(loggingLevel)
     logger = logging.getLogger("Cli-Main")
     logger.debug(f"Logging level: {loggingLevel}")
 
@@ -52,10 +54,22 @@ def main(ctx=None, tasks: list[str] | None = None, directory: Path = ".", file:
     elif ext:
         uri = f"ext://{ext}"
 
+    if daemon:
+        from coxbuild.daemon import Daemon
+        Daemon().serve()
+        return
+
     from coxbuild import schema
+    from coxbuild.configurations.builders import (
+        DictionaryConfigurationBuilder, JsonConfigurationBuilder,
+        YamlConfigurationBuilder)
     from coxbuild.extensions.loader import load as loadext
 
-    schema.manager.register(loadext(uri))
+    server = click.get_current_context().obj
+    if server is not None:
+        server.register(uri)
+    else:
+        schema.manager.register(loadext(uri))
 
     json = json or []
     yaml = yaml or []
@@ -78,9 +92,20 @@ def main(ctx=None, tasks: list[str] | None = None, directory: Path = ".", file:
             continue
         configdata[subs[0]] = subs[1]
 
+    if jobs:
+        configdata["pipeline:jobs"] = jobs
+    if fail_fast:
+        configdata["pipeline:failFast"] = True
+
     schema.manager.configBuilders.add(
         DictionaryConfigurationBuilder(configdata))
 
+    if plan:
+        result = schema.manager.plan(
+            *(tasks or []), preconditions=plan_preconditions, jobs=jobs)
+        print(result.report())
+        exit(0 if result else 1)
+
     exit(0 if schema.manager.execute(*(tasks or [])) else 1)
 
 
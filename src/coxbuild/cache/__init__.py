@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import os
+import zipfile
+from uuid import uuid4
+from dataclasses import dataclass
+from hashlib import sha256
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable
+
+from coxbuild import get_cache_directory, get_working_directory
+from coxbuild.configurations import Configuration, ConfigurationAccessor
+from coxbuild.fingerprints import expand, stableRepr
+from coxbuild.utils import formatSize, parseSize
+
+if TYPE_CHECKING:
+    from coxbuild.tasks import Task
+
+    from .remote import RemoteCache
+
+logger = logging.getLogger("cache")
+
+
+class CacheSettings(ConfigurationAccessor):
+    """Settings for task result cache."""
+    __configname__ = "cache"
+
+    @property
+    def path(self) -> Path:
+        """Directory of the local cache."""
+        return (self.getPath("path") or get_cache_directory().joinpath("actions")).resolve()
+
+    @path.setter
+    def path(self, value: Path) -> None:
+        self.config["path"] = value.resolve()
+
+    @property
+    def maxSize(self) -> int:
+        """Maximum size in bytes of the local cache, e.g. '512M'."""
+        return parseSize(self.get("maxSize") or "1G")
+
+    @maxSize.setter
+    def maxSize(self, value: int | str) -> None:
+        self.config["maxSize"] = value
+
+    @property
+    def remote(self) -> str:
+        """Base URL of the remote cache, empty for local cache only."""
+        return self.get("remote") or ""
+
+    @remote.setter
+    def remote(self, value: str) -> None:
+        self.config["remote"] = value
+
+
+def hashFile(file: Path) -> str:
+    """Get SHA-256 hash of file content."""
+    hasher = sha256()
+    with file.open("rb") as f:
+        while chunk := f.read(1 << 20):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _archiveName(file: Path) -> str | None:
+    try:
+        return file.resolve().relative_to(get_working_directory().resolve()).as_posix()
+    except ValueError:
+        return None
+
+
+def actionKey(task: "Task", args: list[Any], kwds: dict[str, Any], config: Configuration | None) -> str:
+    """
+    Get the content-addressed key for a task invocation.
+
+    The key covers task name, stable arguments, paths (relative to working directory) and content of declared inputs,
+    configuration entries declared by the task and hashcode of its extension.
+    """
+    hasher = sha256()
+
+    def add(*items: str):
+        for item in items:
+            hasher.update(item.encode())
+            hasher.update(b"\0")
+
+    add("task", task.name)
+    add("extension", task.extension.hashcode if task.extension else "")
+    for arg in args:
+        add("arg", stableRepr(arg) or "")
+    for k, v in sorted(kwds.items()):
+        if stableRepr(v) is not None:
+            add("kwd", k, stableRepr(v))
+    for key in task.cacheKeys:
+        value = config.get(key) if config else None
+        add("config", key.lower(), stableRepr(value) or repr(value))
+    for file in expand(task.inputs, config):
+        # relative paths, so that checkouts at other paths share keys
+        add("input", _archiveName(file) or file.resolve().as_posix(), hashFile(file))
+    return hasher.hexdigest()
+
+
+@dataclass
+class CacheStatistics:
+    """Statistics of a cache."""
+    entries: int
+    """number of entries"""
+    size: int
+    """total size in bytes"""
+
+
+class ActionCache:
+    """
+    Local on-disk cache for task outputs, keyed by action key.
+
+    Entries are zip archives of output files (relative to working directory).
+    Writes are atomic so several processes can share the cache,
+    and least recently used entries are evicted when the cache is larger than its maximum size.
+    """
+
+    def __init__(self, path: Path, maxSize: int) -> None:
+        self.path = path
+        self.maxSize = maxSize
+
+    def entry(self, key: str) -> Path:
+        """Get path to the entry."""
+        return self.path.joinpath(key[:2], f"{key}.zip")
+
+    def entries(self) -> list[Path]:
+        """Get all entries, least recently used first."""
+        items = []
+        if not self.path.exists():
+            return items
+        for sub in self.path.iterdir():
+            if sub.is_dir():
+                items.extend(sub.glob("*.zip"))
+
+        def mtime(item: Path):
+            try:
+                return item.stat().st_mtime_ns
+            except OSError:
+                return 0
+        return sorted(items, key=mtime)
+
+    def stats(self) -> CacheStatistics:
+        """Get statistics."""
+        size = 0
+        entries = self.entries()
+        for item in entries:
+            try:
+                size += item.stat().st_size
+            except OSError:
+                pass
+        return CacheStatistics(len(entries), size)
+
+    def has(self, key: str) -> bool:
+        """Check if the entry exists."""
+        return self.entry(key).exists()
+
+    def read(self, key: str) -> bytes | None:
+        """Read the raw archive of the entry, None for missing."""
+        try:
+            data = self.entry(key).read_bytes()
+        except FileNotFoundError:
+            return None
+        self._touch(key)
+        return data
+
+    def write(self, key: str, data: bytes) -> None:
+        """Write the raw archive of the entry."""
+        target = self.entry(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp = target.with_name(f"{target.name}.{uuid4().hex}.tmp")
+        temp.write_bytes(data)
+        os.replace(temp, target)
+        self.prune()
+
+    def put(self, key: str, files: Iterable[Path]) -> bool:
+        """Archive files into the entry, return False if some file is not cacheable."""
+        target = self.entry(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp = target.with_name(f"{target.name}.{uuid4().hex}.tmp")
+        try:
+            with zipfile.ZipFile(temp, "w", zipfile.ZIP_DEFLATED) as archive:
+                for file in files:
+                    name = _archiveName(file)
+                    if name is None:
+                        logger.warning(
+                            f"Output {file} is outside working directory, not cacheable.")
+                        return False
+                    archive.write(file, name)
+            os.replace(temp, target)
+        finally:
+            temp.unlink(missing_ok=True)
+        self.prune()
+        return True
+
+    def get(self, key: str) -> bool:
+        """Restore files from the entry, return False for missing."""
+        try:
+            archive = zipfile.ZipFile(self.entry(key))
+        except FileNotFoundError:
+            return False
+        root = get_working_directory()
+        with archive:
+            for info in archive.infolist():
+                name = Path(info.filename)
+                if name.is_absolute() or ".." in name.parts:
+                    raise ValueError(f"Unsafe path in cache entry: {name}")
+                archive.extract(info, root)
+        self._touch(key)
+        return True
+
+    def _touch(self, key: str) -> None:
+        try:
+            os.utime(self.entry(key))
+        except OSError:
+            pass
+
+    def remove(self, key: str) -> None:
+        """Remove the entry."""
+        self.entry(key).unlink(missing_ok=True)
+
+    def prune(self, maxSize: int | None = None) -> int:
+        """Evict least recently used entries until the cache fits the size, return the number of evicted entries."""
+        maxSize = self.maxSize if maxSize is None else maxSize
+        entries = []
+        total = 0
+        for item in self.entries():
+            try:
+                size = item.stat().st_size
+            except OSError:
+                continue
+            entries.append((item, size))
+            total += size
+
+        evicted = 0
+        for item, size in entries:
+            if total <= maxSize:
+                break
+            try:
+                item.unlink()
+                evicted += 1
+            except OSError:
+                pass
+            total -= size
+        if evicted:
+            logger.info(f"Evict {evicted} entries from cache {self.path}.")
+        return evicted
+
+
+def fromConfig(config: Configuration | None) -> ActionCache:
+    """Get the action cache by configuration."""
+    settings = CacheSettings(config or Configuration())
+    return ActionCache(settings.path, settings.maxSize)
+
+
+def remoteFromConfig(config: Configuration | None) -> "RemoteCache | None":
+    """Get the remote cache by configuration, None if not configured."""
+    from .remote import client
+
+    url = CacheSettings(config or Configuration()).remote
+    return client(url) if url else None
+
+
+def restore(key: str, config: Configuration | None) -> bool:
+    """Restore outputs from the local cache entry, return False for missing."""
+    return fromConfig(config).get(key)
+
+
+async def fetch(key: str, config: Configuration | None) -> bool:
+    """Fetch the cache entry from the remote cache and restore outputs, return False for missing."""
+    remote = remoteFromConfig(config)
+    if remote is None:
+        return False
+    logger.debug(f"Fetch cache entry {key} from {remote.url}.")
+    data = await remote.getAsync(key)
+    if data is None:
+        return False
+
+    def store():
+        local = fromConfig(config)
+        local.write(key, data)
+        return local.get(key)
+
+    return await asyncio.get_running_loop().run_in_executor(None, store)
+
+
+def save(task: "Task", key: str, config: Configuration | None) -> None:
+    """Save declared outputs of the task into the cache entry, and upload it to the remote cache in background."""
+    local = fromConfig(config)
+    if not local.put(key, expand(task.outputs, config)):
+        return
+    remote = remoteFromConfig(config)
+    if remote is None:
+        return
+    data = local.read(key)
+    if data is not None:
+        logger.debug(f"Upload cache entry {key} to {remote.url}.")
+        remote.upload(key, data)
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("cache-remote")
+
+
+class RemoteCacheException(Exception):
+    """Exception for remote cache requests."""
+    pass
+
+
+class RemoteCache:
+    """
+    Client of a remote cache by simple HTTP protocol.
+
+    GET {url}/{key} to read an entry (404 for missing), PUT {url}/{key} to write an entry.
+    Connections are kept alive and reused, uploads run in parallel in background,
+    on their own threads so that reads never wait behind them. Close the client to flush uploads.
+    """
+
+    def __init__(self, url: str, connections: int = 4, timeout: float = 30) -> None:
+        """
+        Create client.
+
+        url: base url of the remote cache
+        connections: maximum number of connections
+        timeout: timeout in seconds for each request
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported remote cache URL: {url}")
+        self.url = url
+        self.timeout = timeout
+        self._scheme = parts.scheme
+        self._netloc = parts.netloc
+        self._prefix = parts.path.rstrip("/")
+        self._connections: queue.LifoQueue[HTTPConnection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(connections)
+        self._reader = ThreadPoolExecutor(
+            connections, thread_name_prefix="coxbuild-remote-cache-read")
+        self._uploader = ThreadPoolExecutor(
+            connections, thread_name_prefix="coxbuild-remote-cache-upload")
+        self._uploads: set[Future] = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self) -> HTTPConnection:
+        try:
+            return self._connections.get_nowait()
+        except queue.Empty:
+            cls = HTTPSConnection if self._scheme == "https" else HTTPConnection
+            return cls(self._netloc, timeout=self.timeout)
+
+    def _request(self, method: str, key: str, body: bytes | None = None) -> tuple[int, bytes]:
+        error: Exception | None = None
+        with self._slots:
+            # the kept-alive connection may be closed by server, retry once with a new one
+            for _ in range(2):
+                connection = self._connect()
+                try:
+                    connection.request(method, f"{self._prefix}/{key}", body=body, headers={
+                        "Content-Type": "application/octet-stream"} if body is not None else {})
+                    response = connection.getresponse()
+                    data = response.read()
+                except (HTTPException, OSError) as ex:
+                    connection.close()
+                    error = ex
+                    continue
+                if response.will_close:
+                    connection.close()
+                else:
+                    self._connections.put(connection)
+                return response.status, data
+        raise error
+
+    def get(self, key: str) -> bytes | None:
+        """Read an entry, None for missing."""
+        status, data = self._request("GET", key)
+        if status == 404:
+            return None
+        if status != 200:
+            raise RemoteCacheException(
+                f"Failed to get {key} from {self.url}: HTTP {status}.")
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Write an entry."""
+        status, _ = self._request("PUT", key, data)
+        if status not in (200, 201, 204):
+            raise RemoteCacheException(
+                f"Failed to put {key} to {self.url}: HTTP {status}.")
+
+    async def getAsync(self, key: str) -> bytes | None:
+        """Read an entry without blocking the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._reader, self.get, key)
+
+    def upload(self, key: str, data: bytes) -> Future:
+        """Write an entry in background."""
+        def done(future: Future):
+            with self._lock:
+                self._uploads.discard(future)
+            if future.exception():
+                logger.warning(
+                    f"Failed to upload {key} to {self.url}: {future.exception()}")
+
+        with self._lock:
+            if self._closed:
+                raise RemoteCacheException(
+                    f"Failed to upload {key} to {self.url}: client is closed.")
+            future = self._uploader.submit(self.put, key, data)
+            self._uploads.add(future)
+        future.add_done_callback(done)
+        return future
+
+    def wait(self) -> None:
+        """Wait for all background uploads."""
+        with self._lock:
+            uploads = list(self._uploads)
+        for future in uploads:
+            try:
+                future.result()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        """Wait for uploads, stop background threads and close connections."""
+        with self._lock:
+            self._closed = True
+        self.wait()
+        self._uploader.shutdown()
+        self._reader.shutdown()
+        while True:
+            try:
+                self._connections.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def __enter__(self) -> "RemoteCache":
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb) -> None:
+        self.close()
+
+
+_clients: dict[str, RemoteCache] = {}
+
+
+def client(url: str) -> RemoteCache:
+    """Get the shared client for the remote cache."""
+    if url not in _clients:
+        _clients[url] = RemoteCache(url)
+    return _clients[url]
+
+
+def closeAll() -> None:
+    """Flush and close all shared clients, clients are created again when they are used later."""
+    while _clients:
+        _, remote = _clients.popitem()
+        remote.close()
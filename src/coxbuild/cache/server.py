@@ -0,0 +1,111 @@
+"""
+Reference server of the remote cache protocol.
+
+GET /{key} to read an entry (404 for missing), PUT /{key} to write an entry.
+Any path prefix is accepted, and the last path segment is the key.
+
+    python -m coxbuild.cache.server --port 8080 --root ./cache
+"""
+
+import logging
+import os
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from uuid import uuid4
+
+import click
+
+logger = logging.getLogger("cache-server")
+
+_key = re.compile(r"^[A-Za-z0-9_\-.]+$")
+
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    root: Path = Path(".")
+
+    def _entry(self) -> Path | None:
+        key = self.path.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+        if not _key.match(key) or key.startswith("."):
+            return None
+        return self.root.joinpath(key[:2], key)
+
+    def _reply(self, status: int, data: bytes = b"", body: bool = True) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if body and data:
+            self.wfile.write(data)
+
+    def _read(self, head: bool = False) -> None:
+        entry = self._entry()
+        if entry is None:
+            self._reply(400, body=not head)
+            return
+        try:
+            data = entry.read_bytes()
+        except FileNotFoundError:
+            self._reply(404, body=not head)
+            return
+        self._reply(200, data, body=not head)
+
+    def do_GET(self) -> None:
+        self._read()
+
+    def do_HEAD(self) -> None:
+        self._read(head=True)
+
+    def do_PUT(self) -> None:
+        entry = self._entry()
+        length = int(self.headers.get("Content-Length") or 0)
+        data = self.rfile.read(length)
+        if entry is None:
+            self._reply(400)
+            return
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        temp = entry.with_name(f"{entry.name}.{uuid4().hex}.tmp")
+        temp.write_bytes(data)
+        os.replace(temp, entry)
+        self._reply(201)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.info(f"{self.address_string()} {format % args}")
+
+
+def createServer(root: Path, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    Create cache server.
+
+    root: directory to store entries
+    host: host to bind
+    port: port to bind, 0 for a random port
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    handler = type("BoundCacheRequestHandler", (CacheRequestHandler,), {
+                   "root": root.resolve()})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+@click.command()
+@click.option('-H', '--host', default="127.0.0.1", help="Host to bind.")
+@click.option('-p', '--port', default=8080, type=int, help="Port to bind.")
+@click.option('-r', '--root', type=click.Path(file_okay=False, path_type=Path), default="./coxbuild-cache", help="Directory to store entries.")
+@click.option('-v', '--verbose', count=True, default=0)
+def main(host: str = "127.0.0.1", port: int = 8080, root: Path = Path("./coxbuild-cache"), verbose: int = 0) -> None:
+    """Serve remote cache for coxbuild."""
+    logging.basicConfig(level=logging.INFO if verbose else logging.WARNING)
+    server = createServer(root, host, port)
+    click.echo(
+        f"Serving cache {root.resolve()} at http://{server.server_address[0]}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Thin client for coxbuild daemon.
+
+It forwards the command line to the daemon of the current directory and streams output back,
+or runs coxbuild in process if no daemon is running. Only standard library is imported before connecting.
+"""
+
+import json
+import os
+import re
+import socket
+import sys
+
+_trailer = re.compile(rb"\0-?\d*\n?")
+
+
+def connect() -> socket.socket | None:
+    """Connect to the daemon of the current directory, None if it is not running."""
+    path = os.path.join(".coxbuild", "daemon.sock")
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except OSError:
+        client.close()
+        return None
+    return client
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+
+    client = connect()
+    if client is None:
+        from coxbuild.__main__ import main as climain
+        climain(args=argv, prog_name="coxbuild")
+        return
+
+    # the daemon is already running
+    argv = [arg for arg in argv if arg != "--daemon"]
+    with client:
+        client.sendall(json.dumps(
+            {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}).encode() + b"\n")
+
+        out = sys.stdout.buffer
+        pending = b""
+        while chunk := client.recv(65536):
+            pending += chunk
+            cut = pending.rfind(b"\0")
+            if cut < 0 or not _trailer.fullmatch(pending, cut):
+                cut = len(pending)
+            out.write(pending[:cut])
+            out.flush()
+            pending = pending[cut:]
+
+    code = pending[1:].strip()
+    sys.exit(int(code) if code else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,8 @@
-import json
 import os
 from abc import ABC, abstractmethod
 from pathlib import Path
 from typing import Any
 
-import yaml
-
 from . import Configuration
 
 
@@ -59,6 +56,8 @@ class JsonConfigurationBuilder(ConfigurationBuilder):
     def build(self, config: Configuration) -> None:
         if not self.path.exists():
             return
+        import json
+
         DictionaryConfigurationBuilder(
             json.loads(self.path.read_text())).build(config)
 
@@ -71,6 +70,8 @@ class YamlConfigurationBuilder(ConfigurationBuilder):
     def build(self, config: Configuration) -> None:
         if not self.path.exists():
             return
+        import yaml
+
         DictionaryConfigurationBuilder(
             yaml.safe_load(self.path.read_text())).build(config)
 
@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+from pathlib import Path
+
+from coxbuild import get_state_directory
+from coxbuild.configurations.builders import getDefaultBuilder
+from coxbuild.extensions import Extension
+from coxbuild.extensions.loader import hashed
+from coxbuild.extensions.loader import load as loadext
+
+logger = logging.getLogger("daemon")
+
+
+def get_socket_path() -> Path:
+    """Get the daemon socket path for the working directory (relative, to keep it short)."""
+    return get_state_directory().joinpath("daemon.sock")
+
+
+class Daemon:
+    """Serve coxbuild invocations on a Unix socket, with schemas and extensions kept loaded."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or get_socket_path()
+        self.root = Path.cwd()
+        self.extensions: dict[str, dict[str, Extension]] = {}
+        """schema key -> extensions registered by loading the schema"""
+
+    def _identify(self, uri: str) -> str:
+        """Get the key of a schema."""
+        schema, _, path = uri.partition("://")
+        if schema.split("@", 1)[0] == "file":
+            return f"file://{Path(path).resolve()}"
+        return uri
+
+    def _fresh(self, extensions: dict[str, Extension]) -> bool:
+        """Check whether loaded files (the schema and extensions loaded by it) are unchanged, only files are checked for content changes."""
+        for ext in extensions.values():
+            schema, _, path = ext.uri.partition("://")
+            if schema.split("@", 1)[0] != "file":
+                continue
+            try:
+                if hashed(Path(path).read_text()) != ext.hashcode:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def register(self, uri: str) -> None:
+        """Register the schema and its extensions into the schema manager, reload it only when its content changes."""
+        from coxbuild import schema
+
+        schema.manager.configBuilders = getDefaultBuilder()
+
+        key = self._identify(uri)
+        cached = self.extensions.get(key)
+        if cached is not None and self._fresh(cached):
+            logger.info(f"Reuse loaded schema: {key}")
+            schema.manager.extensions = dict(cached)
+            return
+
+        logger.info(f"Load schema: {key}")
+        schema.manager.extensions = {}
+        schema.manager.register(loadext(uri))
+        self.extensions[key] = dict(schema.manager.extensions)
+
+    def handle(self, connection: socket.socket) -> None:
+        """Handle a request: run the command line in client's directory and environment, stream output to the client."""
+        from coxbuild.__main__ import main
+
+        with connection.makefile("rb") as reader:
+            request = json.loads(reader.readline())
+
+        environ = dict(os.environ)
+        stdout, stderr = os.dup(1), os.dup(2)
+        code = 1
+        try:
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(request["env"])
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(connection.fileno(), 1)
+            os.dup2(connection.fileno(), 2)
+            try:
+                # never serve a nested daemon
+                main.main(args=[arg for arg in request["argv"] if arg != "--daemon"], prog_name="coxbuild",
+                          standalone_mode=False, obj=self)
+                code = 0
+            except SystemExit as ex:
+                code = ex.code if isinstance(
+                    ex.code, int) else (0 if ex.code is None else 1)
+            except Exception as ex:
+                logger.error("Failed to handle request.", exc_info=ex)
+                print(f"Coxbuild daemon failed: {ex}")
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+        finally:
+            os.dup2(stdout, 1)
+            os.dup2(stderr, 2)
+            os.close(stdout)
+            os.close(stderr)
+            os.environ.clear()
+            os.environ.update(environ)
+            os.chdir(self.root)
+
+        connection.sendall(b"\0" + str(code).encode() + b"\n")
+
+    def serve(self) -> None:
+        """Serve requests one by one until interrupted."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self.path.unlink()
+
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        sys.stdout.reconfigure(line_buffering=True)
+        sys.stderr.reconfigure(line_buffering=True)
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            # only the owner may connect and run tasks, whatever the umask is
+            umask = os.umask(0o177)
+            try:
+                server.bind(str(self.path))
+            finally:
+                os.umask(umask)
+            os.chmod(self.path, 0o600)
+            server.listen()
+            print(f"Coxbuild daemon is listening on {self.path}, press Ctrl+C to stop.")
+            try:
+                while True:
+                    connection, _ = server.accept()
+                    with connection:
+                        try:
+                            self.handle(connection)
+                        except OSError as ex:
+                            logger.warning(
+                                "Connection to client failed.", exc_info=ex)
+            except KeyboardInterrupt:
+                print("Coxbuild daemon stopped.")
+            finally:
+                self.path.unlink(missing_ok=True)
@@ -1,8 +1,9 @@
 import asyncio
 import functools
 import logging
+from collections import deque
 from datetime import date, datetime, time, timedelta
-from typing import AsyncIterator, Awaitable, Callable, ParamSpec
+from typing import Any, AsyncIterator, Awaitable, Callable, ParamSpec
 
 from ..services import EventContext, EventType
 
@@ -85,14 +86,19 @@ async def limit(event: EventType, number: int = 1):
     if number == 0:
         return
 
-    async for context in event:
-        yield context
+    try:
+        async for context in event:
+            yield context
 
-        if number > 0:
-            number -= 1
+            if number > 0:
+                number -= 1
 
-        if number == 0:
-            break
+            if number == 0:
+                break
+    finally:
+        # stop the event immediately, e.g. background tasks of combinators
+        if hasattr(event, "aclose"):
+            await event.aclose()
 
 
 def once(event: EventType):
@@ -108,3 +114,172 @@ async def occur(event: EventType):
     """
     async for context in event:
         return context
+
+
+_END = object()
+_NONE = object()
+
+
+class _Pump:
+    """Consume an event in a background task, so that occurrences are received (with time) while the consumer is busy."""
+
+    def __init__(self, event: EventType) -> None:
+        self.queue: asyncio.Queue[Any] = asyncio.Queue()
+        self.error: BaseException | None = None
+        self.task = asyncio.ensure_future(self._run(event))
+
+    async def _run(self, event: EventType):
+        try:
+            async for context in event:
+                self.queue.put_nowait(context)
+        except Exception as ex:
+            self.error = ex
+        finally:
+            self.queue.put_nowait(_END)
+
+    async def get(self, timeout: float | None = None) -> Any:
+        """
+        Get the next context, or _END when the event finishes.
+
+        timeout: maximum seconds to wait, 0 for no waiting, raise asyncio.TimeoutError on expiry
+        """
+        if timeout is not None and timeout <= 0:
+            if self.queue.empty():
+                raise asyncio.TimeoutError()
+            item = self.queue.get_nowait()
+        else:
+            item = await asyncio.wait_for(self.queue.get(), timeout)
+        if item is _END:
+            # keep finished for later calls
+            self.queue.put_nowait(_END)
+            if self.error is not None:
+                raise self.error
+        return item
+
+    async def close(self):
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+
+async def debounce(event: EventType, window: timedelta):
+    """
+    Occur with the latest context, after the event stops occurring for a window.
+
+    window: quiet duration
+    """
+    pump = _Pump(event)
+    try:
+        while True:
+            context = await pump.get()
+            if context is _END:
+                break
+            while True:
+                try:
+                    newer = await pump.get(window.total_seconds())
+                except asyncio.TimeoutError:
+                    break
+                if newer is _END:
+                    yield context
+                    return
+                context = newer
+            yield context
+    finally:
+        await pump.close()
+
+
+async def throttle(event: EventType, interval: timedelta):
+    """
+    Occur at most once in an interval, with the first context immediately, and the latest one at the end of the interval.
+
+    interval: minimum duration between occurrences
+    """
+    loop = asyncio.get_running_loop()
+    seconds = interval.total_seconds()
+    pump = _Pump(event)
+    last = -float("inf")
+    pending = _NONE
+    try:
+        while True:
+            wait = last + seconds - loop.time()
+            if pending is not _NONE and wait <= 0:
+                last = loop.time()
+                context, pending = pending, _NONE
+                yield context
+                continue
+            try:
+                context = await pump.get(None if pending is _NONE else wait)
+            except asyncio.TimeoutError:
+                continue
+            if context is _END:
+                if pending is not _NONE:
+                    yield pending
+                break
+            if pending is _NONE and loop.time() - last >= seconds:
+                last = loop.time()
+                yield context
+            else:
+                pending = context
+    finally:
+        await pump.close()
+
+
+async def batch(event: EventType, maxsize: int | None = None, window: timedelta | None = None):
+    """
+    Collect occurrences into batches, each batch occurs with one context, whose keyword argument `contexts` is the list of collected contexts.
+
+    maxsize: maximum number of contexts in a batch, None for no limit
+    window: duration to collect contexts from the first one, None to collect the contexts occurred while the consumer is busy
+    """
+    loop = asyncio.get_running_loop()
+    pump = _Pump(event)
+    try:
+        while True:
+            context = await pump.get()
+            if context is _END:
+                break
+            contexts = [context]
+            deadline = None if window is None else loop.time() + window.total_seconds()
+            ended = False
+            while maxsize is None or len(contexts) < maxsize:
+                try:
+                    context = await pump.get(0 if deadline is None else deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                if context is _END:
+                    ended = True
+                    break
+                contexts.append(context)
+            yield EventContext.build(contexts=contexts)
+            if ended:
+                break
+    finally:
+        await pump.close()
+
+
+async def distinct(event: EventType, key: Callable[[EventContext | None], Any] | None = None, window: timedelta | None = None):
+    """
+    Skip duplicate occurrences.
+
+    key: get the value to compare from a context, None to compare contexts
+    window: skip a context if its key equals a key that occurred in the window, None to only compare with the previous one
+    """
+    loop = asyncio.get_running_loop()
+    seen: deque[tuple[float, Any]] = deque()
+    previous = _NONE
+    async for context in event:
+        value = context if key is None else key(context)
+        if window is None:
+            if previous is not _NONE and value == previous:
+                continue
+            previous = value
+        else:
+            now = loop.time()
+            while seen and now - seen[0][0] > window.total_seconds():
+                seen.popleft()
+            if any(value == old for _, old in seen):
+                continue
+            seen.append((now, value))
+        yield context
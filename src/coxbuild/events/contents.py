@@ -0,0 +1,141 @@
+"""Content hashes of files, to tell real modifications from stat-only changes."""
+
+import json
+import logging
+import os
+import time
+from hashlib import sha256
+from pathlib import Path
+
+from coxbuild import get_state_directory
+from coxbuild.utils import fileLock
+
+logger = logging.getLogger("contents")
+
+StatKey = tuple[int, int, int]
+"""(inode, size, modification time in ns)"""
+
+
+def statKey(st: os.stat_result) -> StatKey:
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def hashFile(file: Path) -> str:
+    """Get SHA-256 hash of file content."""
+    hasher = sha256()
+    with file.open("rb") as f:
+        while chunk := f.read(1 << 20):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class ContentIndex:
+    """
+    Persistent index of (inode, size, modification time in ns) -> content hash, and last known hashes of watched files.
+
+    Files are hashed only when their stat key is not in the index, so that restarting a watcher stats files only.
+    Methods are blocking (hashing and writing files), call them in a thread from event loops.
+    """
+
+    def __init__(self, path: Path | None = None, interval: float = 5) -> None:
+        """
+        path: file to persist the index, None for 'hashes.json' in the state directory
+        interval: minimum seconds between throttled saves
+        """
+        self.path = path or get_state_directory().joinpath("hashes.json")
+        self.hashes: dict[str, str] = self._load()
+        """stat key (joined by ':') -> content hash"""
+        self.current: dict[Path, tuple[str, str]] = {}
+        """path -> (stat key, content hash) when it was checked last time"""
+        self.interval = interval
+        self._stale: set[str] = set()
+        self._dirty = False
+        self._saved: float | None = None
+
+    def _load(self) -> dict[str, str]:
+        try:
+            return json.loads(self.path.read_text("utf-8"))
+        except FileNotFoundError:
+            return {}
+        except Exception as ex:
+            logger.warning(f"Failed to load content hashes: {ex}")
+            return {}
+
+    def digest(self, file: Path, key: StatKey) -> str | None:
+        """Get content hash of a file with the stat key, hash the file if it is not indexed, None if it is unreadable."""
+        name = ":".join(map(str, key))
+        result = self.hashes.get(name)
+        if result is None:
+            try:
+                result = hashFile(file)
+            except OSError:
+                return None
+            self.hashes[name] = result
+            self._dirty = True
+        return result
+
+    def prime(self, files: dict[Path, StatKey]) -> None:
+        """Record current hashes of files (path -> stat key)."""
+        for file, key in files.items():
+            digest = self.digest(file, key)
+            if digest is not None:
+                self.current[file] = (":".join(map(str, key)), digest)
+
+    def changed(self, file: Path) -> bool:
+        """Check and record whether file content differs from the last time, unknown or unreadable files are changed."""
+        try:
+            key = statKey(file.stat())
+        except OSError:
+            self.forget(file)
+            return True
+        name = ":".join(map(str, key))
+        old = self.current.get(file)
+        if old is not None and old[0] == name:
+            return False
+        digest = self.digest(file, key)
+        if digest is None:
+            self.forget(file)
+            return True
+        if old is not None:
+            self._stale.add(old[0])
+            self._dirty = True
+        self.current[file] = (name, digest)
+        return old is None or old[1] != digest
+
+    def forget(self, file: Path) -> None:
+        """Forget a deleted file."""
+        old = self.current.pop(file, None)
+        if old is not None:
+            self._stale.add(old[0])
+            self._dirty = True
+
+    def save(self, throttle: bool = False) -> None:
+        """
+        Write the index if it is changed, merged with the index written by other watchers.
+
+        throttle: skip writing if the index was written within the interval
+        """
+        if not self._dirty:
+            return
+        if throttle and self._saved is not None and time.monotonic() - self._saved < self.interval:
+            return
+        try:
+            with fileLock(self.path.with_name(f"{self.path.name}.lock")):
+                self._write()
+        except OSError as ex:
+            logger.warning(f"Failed to save content hashes: {ex}")
+        self._saved = time.monotonic()
+        self._stale.clear()
+        self._dirty = False
+
+    def _write(self) -> None:
+        data = self._load()
+        live = {name for name, _ in self.current.values()}
+        for name in self._stale - live:
+            data.pop(name, None)
+            self.hashes.pop(name, None)
+        data.update(self.hashes)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        temp.write_text(json.dumps(data), "utf-8")
+        os.replace(temp, self.path)
@@ -1,3 +1,9 @@
+import asyncio
+import logging
+import os
+import re
+import stat
+from array import array
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
@@ -6,7 +12,11 @@ from pathlib import Path
 from coxbuild import get_working_directory
 from coxbuild.services import EventContext
 
-from . import delay, occur, periodic
+from . import delay, inotify, occur, periodic
+from .contents import ContentIndex, StatKey
+from .ignores import IgnoreRules, globPattern
+
+logger = logging.getLogger("filesystems")
 
 
 class FileSystemChangeType(Enum):
@@ -37,45 +47,355 @@ class DirectoryEntry(FileSystemEntry):
     pass
 
 
+def _entry(path: Path, isdir: bool) -> FileSystemEntry:
+    try:
+        st = path.stat()
+        ctime, mtime, atime = [datetime.fromtimestamp(
+            t) for t in [st.st_ctime, st.st_mtime, st.st_atime]]
+    except OSError:
+        # deleted entries are not available any more
+        ctime = mtime = atime = datetime.now()
+    return (DirectoryEntry if isdir else FileEntry)(path, ctime, mtime, atime)
+
+
+_FILE = 1
+_DIRECTORY = 2
+
+_Record = tuple[int, int, int, int, int, int]
+"""(kind, inode, size, ctime, mtime, atime) of an entry"""
+
+
+def _record(st: os.stat_result) -> _Record | None:
+    """Get the record of a stat result, None for entries other than files and directories."""
+    if stat.S_ISREG(st.st_mode):
+        kind = _FILE
+    elif stat.S_ISDIR(st.st_mode):
+        kind = _DIRECTORY
+    else:
+        return None
+    return (kind, st.st_ino, st.st_size, st.st_ctime_ns, st.st_mtime_ns, st.st_atime_ns)
+
+
 class FileSystemSnapshot:
-    def __init__(self,  path: Path, glob: str | None = None) -> None:
-        self.entries: dict[str, FileSystemEntry] = {}
-        items = path.glob(glob) if glob else [path]
-        for item in items:
-            item = item.resolve()
-            stat = item.stat()
-            ctime, mtime, atime = [datetime.fromtimestamp(
-                t) for t in [stat.st_ctime, stat.st_mtime, stat.st_atime]]
-            if item.is_file():
-                entry = FileEntry(item, ctime, mtime, atime)
-            elif item.is_dir():
-                entry = DirectoryEntry(item, ctime, mtime, atime)
-            if entry:
-                self.entries[entry.id()] = entry
+    """
+    Compact snapshot of entries' stat, built by os.scandir with one stat call per entry.
+
+    Relative POSIX paths are packed into one string, with kinds and integer stat fields in parallel arrays,
+    FileSystemEntry objects are only created for changed entries.
+    """
 
+    __slots__ = ("root", "packed", "offsets", "kinds", "inodes", "sizes",
+                 "ctimes", "mtimes", "atimes", "_index")
 
-def diff(old: FileSystemSnapshot, new: FileSystemSnapshot):
-    keys = set(old.entries) | set(new.entries)
-    for key in keys:
-        olde = old.entries.get(key)
-        newe = new.entries.get(key)
-        if not olde:
-            yield (FileSystemChangeType.Create, newe)
-        elif not newe:
-            yield (FileSystemChangeType.Delete, olde)
-        elif isinstance(olde, FileEntry) and isinstance(newe, FileEntry) or isinstance(olde, DirectoryEntry) and isinstance(newe, DirectoryEntry):
-            if olde.creation < newe.creation:
-                yield (FileSystemChangeType.Create, olde)
-            if olde.modification < newe.modification:
-                yield (FileSystemChangeType.Modify, olde)
-            if olde.access < newe.access:
-                yield (FileSystemChangeType.Access, olde)
+    def __init__(self, path: Path, glob: str | None = None, ignore: IgnoreRules | None = None, records: dict[str, _Record] | None = None) -> None:
+        """
+        path: path to snapshot
+        glob: glob pattern of entries in the path, None for the path itself
+        ignore: rules of ignored entries, ignored directories are never entered
+        records: known records by relative POSIX path, used instead of scanning
+        """
+        self.root = path.resolve()
+        self.packed = ""
+        """relative POSIX paths (empty for the root) joined by NUL"""
+        self.offsets = array("Q")
+        """start offsets of paths in the packed string"""
+        self.kinds = bytearray()
+        self.inodes = array("Q")
+        self.sizes = array("q")
+        self.ctimes = array("q")
+        self.mtimes = array("q")
+        self.atimes = array("q")
+        """times in nanoseconds"""
+        self._index: dict[str, int] | None = None
+
+        paths: list[str] = []
+        if records is not None:
+            for relative, record in records.items():
+                self._add(paths, relative, record)
+        elif glob is None:
+            try:
+                self._add(paths, "", _record(os.stat(self.root)))
+            except OSError:
+                pass
         else:
-            yield (FileSystemChangeType.Delete, olde)
-            yield (FileSystemChangeType.Create, newe)
+            self._scan(paths, globPattern(glob),
+                       None if "**" in glob else glob.count("/"), ignore or None)
+        self.packed = "\0".join(paths)
+        offset = 0
+        for path in paths:
+            self.offsets.append(offset)
+            offset += len(path) + 1
+
+    def _add(self, paths: list[str], path: str, record: _Record | None) -> None:
+        if record is None:
+            return
+        kind, inode, size, ctime, mtime, atime = record
+        paths.append(path)
+        self.kinds.append(kind)
+        self.inodes.append(inode)
+        self.sizes.append(size)
+        self.ctimes.append(ctime)
+        self.mtimes.append(mtime)
+        self.atimes.append(atime)
+
+    def _scan(self, paths: list[str], pattern: re.Pattern[str], depth: int | None, ignore: IgnoreRules | None) -> None:
+        """Scan matching entries, descend into directories (without following symlinks) up to depth (None for unlimited)."""
+        stack: list[tuple[str, int]] = [("", 0)]
+        while stack:
+            prefix, level = stack.pop()
+            try:
+                entries = os.scandir(self.root / prefix if prefix else self.root)
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                continue
+            with entries:
+                for entry in entries:
+                    path = f"{prefix}{entry.name}"
+                    if ignore is not None and ignore.ignored(path, entry.is_dir(follow_symlinks=False)):
+                        continue
+                    if pattern.fullmatch(path) is not None:
+                        try:
+                            self._add(paths, path, _record(entry.stat()))
+                        except OSError:
+                            # removed or broken symlink
+                            pass
+                    if (depth is None or level < depth) and entry.is_dir(follow_symlinks=False):
+                        stack.append((f"{path}/", level + 1))
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @property
+    def paths(self) -> list[str]:
+        """Relative POSIX paths of entries (unpacked on each access)."""
+        return self.packed.split("\0") if self.kinds else []
+
+    def path(self, i: int) -> str:
+        """Get the relative POSIX path of the i-th entry."""
+        end = self.offsets[i+1] - 1 if i + 1 < len(self) else len(self.packed)
+        return self.packed[self.offsets[i]:end]
+
+    def index(self) -> dict[str, int]:
+        """Get relative path -> index of entries."""
+        if self._index is None:
+            self._index = {path: i for i, path in enumerate(self.paths)}
+        return self._index
+
+    def entry(self, i: int) -> FileSystemEntry:
+        """Create the entry object of the i-th entry."""
+        relative = self.path(i)
+        path = self.root / relative if relative else self.root
+        ctime, mtime, atime = [datetime.fromtimestamp(t[i] / 1e9)
+                               for t in (self.ctimes, self.mtimes, self.atimes)]
+        return (FileEntry if self.kinds[i] == _FILE else DirectoryEntry)(path, ctime, mtime, atime)
+
+    @property
+    def entries(self) -> dict[str, FileSystemEntry]:
+        """Entry objects by resolved path (created on each access)."""
+        return {entry.id(): entry for entry in map(self.entry, range(len(self)))}
+
+    def records(self) -> dict[str, _Record]:
+        """Get relative path -> record of entries."""
+        return {self.path(i): (self.kinds[i], self.inodes[i], self.sizes[i], self.ctimes[i], self.mtimes[i], self.atimes[i])
+                for i in range(len(self))}
+
+    def files(self) -> dict[Path, StatKey]:
+        """Get path -> (inode, size, modification time in ns) of files."""
+        return {self.root / self.path(i): (self.inodes[i], self.sizes[i], self.mtimes[i])
+                for i in range(len(self)) if self.kinds[i] == _FILE}
+
+
+def diff(old: FileSystemSnapshot, new: FileSystemSnapshot):
+    """Yield (change type, entry) between snapshots, entries are of the new snapshot except deleted ones."""
+    if len(old) == len(new) and old.packed == new.packed:
+        # the common case: no entry is created or deleted, compare whole arrays first
+        if old.kinds == new.kinds and old.inodes == new.inodes and old.sizes == new.sizes \
+                and old.ctimes == new.ctimes and old.mtimes == new.mtimes and old.atimes == new.atimes:
+            return
+        pairs = zip(range(len(old)), range(len(new)))
+    else:
+        oldIndex, newIndex = old.index(), new.index()
+        for path, i in oldIndex.items():
+            if path not in newIndex:
+                yield (FileSystemChangeType.Delete, old.entry(i))
+        for path, j in newIndex.items():
+            if path not in oldIndex:
+                yield (FileSystemChangeType.Create, new.entry(j))
+        pairs = ((i, newIndex[path])
+                 for path, i in oldIndex.items() if path in newIndex)
+
+    for i, j in pairs:
+        if old.kinds[i] != new.kinds[j]:
+            yield (FileSystemChangeType.Delete, old.entry(i))
+            yield (FileSystemChangeType.Create, new.entry(j))
+            continue
+        if old.ctimes[i] < new.ctimes[j] or old.inodes[i] != new.inodes[j]:
+            yield (FileSystemChangeType.Create, new.entry(j))
+        if old.mtimes[i] < new.mtimes[j] or old.sizes[i] != new.sizes[j]:
+            yield (FileSystemChangeType.Modify, new.entry(j))
+        if old.atimes[i] < new.atimes[j]:
+            yield (FileSystemChangeType.Access, new.entry(j))
+
+
+def _prime(index: ContentIndex, snap: FileSystemSnapshot) -> None:
+    """Record known contents before any change."""
+    index.prime(snap.files())
+    index.save()
+
+
+def _verify(index: ContentIndex, changes: list[tuple[FileSystemChangeType, Path, bool]]) -> list[bool]:
+    """
+    Check whether changes (type, path, is directory) are emitted, and save the index (throttled).
 
+    Creation (of replaced files) and modification of files are emitted only when their content changes.
+    """
+    verdicts: dict[Path, bool] = {}
+    result = []
+    for ctype, path, isdir in changes:
+        if isdir or ctype not in (FileSystemChangeType.Create, FileSystemChangeType.Modify, FileSystemChangeType.Delete):
+            result.append(True)
+            continue
+        if ctype == FileSystemChangeType.Delete:
+            index.forget(path)
+            result.append(True)
+            continue
+        if path not in verdicts:
+            verdicts[path] = index.changed(path)
+        result.append(verdicts[path])
+    index.save(throttle=True)
+    return result
+
+
+async def _verified(index: ContentIndex | None, changes: list[tuple[FileSystemChangeType, Path, bool]]) -> list[tuple[FileSystemChangeType, Path, bool]]:
+    """Filter changes by _verify in a thread, so that hashing files does not block the event loop."""
+    if index is None or not changes:
+        return changes
+    verdicts = await asyncio.to_thread(_verify, index, changes)
+    return [change for change, verdict in zip(changes, verdicts) if verdict]
+
+
+_CHANGES = {
+    FileSystemChangeType.Create: inotify.IN_CREATE | inotify.IN_MOVED_TO,
+    FileSystemChangeType.Modify: inotify.IN_MODIFY | inotify.IN_ATTRIB,
+    FileSystemChangeType.Access: inotify.IN_ACCESS,
+    FileSystemChangeType.Delete: inotify.IN_DELETE | inotify.IN_MOVED_FROM | inotify.IN_DELETE_SELF | inotify.IN_MOVE_SELF,
+}
+
+_CHILDREN = inotify.IN_CREATE | inotify.IN_DELETE | inotify.IN_MOVED_FROM | inotify.IN_MOVED_TO
+
+
+async def _differ(old: FileSystemSnapshot, new: FileSystemSnapshot, type: set[FileSystemChangeType] | None, index: ContentIndex | None):
+    """Yield event contexts of changes between snapshots."""
+    entries = {(ctype, entry.path): entry for ctype, entry in diff(old, new)
+               if type is None or ctype in type}
+    for ctype, path, _ in await _verified(index, [(ctype, path, isinstance(entry, DirectoryEntry)) for (ctype, path), entry in entries.items()]):
+        yield EventContext.build(type=ctype, entry=entries[(ctype, path)])
+
+
+async def _watch(watcher: "inotify.RecursiveWatcher", root: Path, glob: str | None, type: set[FileSystemChangeType] | None, ignore: IgnoreRules, snap: FileSystemSnapshot, index: ContentIndex | None = None):
+    """
+    Yield event contexts from inotify events.
+
+    snap: state at the start, kept updated as events are delivered, and compared with a rescan when inotify events are lost (IN_Q_OVERFLOW)
+    """
+    pattern = globPattern(glob) if glob else None
+
+    def relative(path: Path) -> str | None:
+        """Get the relative POSIX path of a matched entry, None if it is not matched."""
+        if pattern is None:
+            return "" if path == root else None
+        if path == root:
+            return None
+        result = path.relative_to(root).as_posix()
+        return result if pattern.fullmatch(result) is not None else None
+
+    known = snap.records()
+
+    async for events in watcher.events():
+        if any(event.mask & inotify.IN_Q_OVERFLOW for event in events):
+            logger.info(f"Rescan {root} for lost events.")
+            newsnap = await asyncio.to_thread(FileSystemSnapshot, root, glob, ignore)
+            async for context in _differ(FileSystemSnapshot(root, records=known), newsnap, type, index):
+                yield context
+            known = newsnap.records()
+            continue
 
-async def changed(path: Path | None = None, glob: str | None = None, type: set[FileSystemChangeType] | None = None, period: timedelta | None = None):
+        # entry changes in order, without duplicates in a batch
+        changes: dict[tuple[FileSystemChangeType, Path], bool] = {}
+        # existence of matched entries after events in the batch
+        exists: dict[str, bool] = {}
+        for event in events:
+            key = relative(event.path)
+            for ctype, mask in _CHANGES.items():
+                if not event.mask & mask:
+                    continue
+                if event.mask & (inotify.IN_DELETE_SELF | inotify.IN_MOVE_SELF) and event.path != root:
+                    # reported by the parent directory
+                    continue
+                if ctype == FileSystemChangeType.Create and key is not None and exists.get(key, key in known):
+                    # replaced, e.g. saved atomically by moving a temporary file to it
+                    ctype = FileSystemChangeType.Modify
+                changes[(ctype, event.path)] = event.isdir
+            if key is not None:
+                if event.mask & _CHANGES[FileSystemChangeType.Create]:
+                    exists[key] = True
+                elif event.mask & _CHANGES[FileSystemChangeType.Delete]:
+                    exists[key] = False
+                else:
+                    exists.setdefault(key, key in known)
+            if event.mask & _CHILDREN and event.path != root:
+                # modification time of the parent directory is changed
+                changes[(FileSystemChangeType.Modify, event.path.parent)] = True
+                parent = relative(event.path.parent)
+                if parent is not None:
+                    exists.setdefault(parent, parent in known)
+
+        for key in exists:
+            try:
+                record = _record(os.stat(root / key if key else root))
+            except OSError:
+                record = None
+            if record is None:
+                known.pop(key, None)
+            else:
+                known[key] = record
+
+        matched = [(ctype, path, isdir) for (ctype, path), isdir in changes.items()
+                   if (type is None or ctype in type) and relative(path) is not None]
+        for ctype, path, isdir in await _verified(index, matched):
+            yield EventContext.build(type=ctype, entry=_entry(path, isdir))
+
+
+async def _poll(path: Path, glob: str | None, type: set[FileSystemChangeType] | None, period: timedelta, ignore: IgnoreRules, index: ContentIndex | None = None):
+    snap = FileSystemSnapshot(path, glob, ignore)
+    if index is not None:
+        await asyncio.to_thread(_prime, index, snap)
+
+    async for _ in periodic(period):
+        newsnap = FileSystemSnapshot(path, glob, ignore)
+
+        async for context in _differ(snap, newsnap, type, index):
+            yield context
+
+        snap = newsnap
+
+
+def _watcher(path: Path, glob: str | None, type: set[FileSystemChangeType] | None, ignore: IgnoreRules) -> "inotify.RecursiveWatcher":
+    mask = inotify.IN_MODIFY | inotify.IN_ATTRIB | _CHILDREN
+    if type is None or FileSystemChangeType.Access in type:
+        mask |= inotify.IN_ACCESS
+    recursive = glob is not None and ("**" in glob or "/" in glob)
+    watcher = inotify.RecursiveWatcher(path, mask, recursive, (lambda p, isdir: ignore.ignored(
+        p.relative_to(path).as_posix(), isdir)) if ignore else None)
+    try:
+        watcher.start()
+    except:
+        watcher.close()
+        raise
+    return watcher
+
+
+async def changed(path: Path | None = None, glob: str | None = None, type: set[FileSystemChangeType] | None = None, period: timedelta | None = None, backend: str | None = None,
+                  ignore: list[str] | None = None, ignoreFiles: list[str] | None = None, verify: bool | ContentIndex = False):
     """
     Detect file or directory change (create, delete, modify, access).
 
@@ -86,33 +406,61 @@ async def changed(path: Path | None = None, glob: str | None = None, type: set[F
     path: path to watch
     glob: glob pattern to watch
     type: change type to watch
+    period: period of polling
+    backend: "polling" (None), or "inotify" (Linux), which falls back to polling when it is not available or its watch limit is reached
+    ignore: ignore patterns in gitignore syntax, ignored directories are never entered
+    ignoreFiles: names of ignore files (in gitignore syntax) in the path, None for [".coxbuildignore"]
+    verify: compare content hashes of files (by an index persisted in the state directory, or the given one), so that files are created (replaced) or modified only when their content changes
     """
     period = period or timedelta(seconds=0)
     path = path or get_working_directory()
+    rules = IgnoreRules.load(path, ignore, ignoreFiles) if path.is_dir() else IgnoreRules(ignore or ())
+    index = (verify if isinstance(verify, ContentIndex)
+             else ContentIndex()) if verify is not False else None
 
-    snap = FileSystemSnapshot(path, glob)
-
-    async for _ in periodic(period):
-        newsnap = FileSystemSnapshot(path, glob)
+    watcher = None
+    if backend == "inotify" and inotify.available():
+        try:
+            watcher = _watcher(path.resolve(), glob, type, rules)
+        except OSError as ex:
+            if not inotify.isLimitError(ex):
+                raise
+            logger.warning(
+                f"Inotify limit is reached for {path}, fall back to polling.", exc_info=ex)
+    elif backend not in (None, "inotify", "polling"):
+        raise ValueError(f"Unknown filesystem event backend: {backend}")
 
-        for ctype, entry in diff(snap, newsnap):
-            if type is None or ctype in type:
-                yield EventContext.build(type=ctype, entry=entry)
+    try:
+        if watcher is None:
+            async for context in _poll(path, glob, type, period, rules, index):
+                yield context
+            return
 
-        snap = newsnap
+        # known state before any change
+        snap = await asyncio.to_thread(FileSystemSnapshot, path, glob, rules)
+        if index is not None:
+            await asyncio.to_thread(_prime, index, snap)
+        async for context in _watch(watcher, path.resolve(), glob, type, rules, snap, index):
+            yield context
+    finally:
+        if watcher is not None:
+            watcher.close()
+        if index is not None:
+            # throttled changes
+            index.save()
 
 
-def access(path: Path | None = None, glob: str | None = None, period: timedelta | None = None):
-    return changed(path, glob, {FileSystemChangeType.Access}, period)
+def access(path: Path | None = None, glob: str | None = None, period: timedelta | None = None, ignore: list[str] | None = None):
+    return changed(path, glob, {FileSystemChangeType.Access}, period, ignore=ignore)
 
 
-def create(path: Path | None = None, glob: str | None = None, period: timedelta | None = None):
-    return changed(path, glob, {FileSystemChangeType.Create}, period)
+def create(path: Path | None = None, glob: str | None = None, period: timedelta | None = None, ignore: list[str] | None = None):
+    return changed(path, glob, {FileSystemChangeType.Create}, period, ignore=ignore)
 
 
-def modify(path: Path | None = None, glob: str | None = None, period: timedelta | None = None):
-    return changed(path, glob, {FileSystemChangeType.Modify}, period)
+def modify(path: Path | None = None, glob: str | None = None, period: timedelta | None = None, ignore: list[str] | None = None, verify: bool | ContentIndex = False):
+    return changed(path, glob, {FileSystemChangeType.Modify}, period, ignore=ignore, verify=verify)
 
 
-def delete(path: Path | None = None, glob: str | None = None, period: timedelta | None = None):
-    return changed(path, glob, {FileSystemChangeType.Delete}, period)
+def delete(path: Path | None = None, glob: str | None = None, period: timedelta | None = None, ignore: list[str] | None = None):
+    return changed(path, glob, {FileSystemChangeType.Delete}, period, ignore=ignore)
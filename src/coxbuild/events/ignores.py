@@ -0,0 +1,138 @@
+"""Gitignore-style ignore rules for filesystem watching."""
+
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+logger = logging.getLogger("ignores")
+
+IGNORE_FILES = [".coxbuildignore"]
+"""default ignore files in the watched directory"""
+
+
+def _segment(pattern: str) -> str:
+    result = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        i += 1
+        if c == "*":
+            result.append("[^/]*")
+        elif c == "?":
+            result.append("[^/]")
+        elif c == "[" and pattern.find("]", i + 1) != -1:
+            end = pattern.find("]", i + 1)
+            chars = pattern[i:end]
+            i = end + 1
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            elif chars.startswith("^"):
+                chars = "\\" + chars
+            result.append(f"[{chars}]")
+        else:
+            result.append(re.escape(c))
+    return "".join(result)
+
+
+def _translate(glob: str) -> str:
+    segments = glob.split("/")
+    parts = []
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == "**":
+            parts.append(".*" if last else "(?:.+/)?")
+        else:
+            parts.append(_segment(segment) + ("" if last else "/"))
+    return "".join(parts)
+
+
+def globPattern(glob: str) -> re.Pattern[str]:
+    """Translate a glob pattern of Path.glob (with '**') into a regex for relative POSIX paths."""
+    return re.compile(_translate(glob))
+
+
+@dataclass
+class IgnoreRule:
+    """A rule of ignore patterns."""
+    pattern: re.Pattern[str]
+    """regex for relative POSIX paths"""
+    negated: bool = False
+    """re-include matched paths (starts with '!')"""
+    directory: bool = False
+    """only match directories (ends with '/')"""
+
+
+class IgnoreRules:
+    """
+    Ignore rules in gitignore syntax, for paths relative to a directory. The last matching rule wins.
+
+    Ignored directories are pruned, so paths in them can not be re-included, the same as git.
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()) -> None:
+        self.rules: list[IgnoreRule] = []
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, line: str) -> None:
+        """Add a rule in gitignore syntax, blank lines and comments are skipped."""
+        line = line.rstrip("\n").rstrip()
+        if not line or line.startswith("#"):
+            return
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        directory = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return
+        # patterns with a slash (except the trailing one) are relative to the directory, others match at any level
+        anchored = "/" in line
+        line = line.lstrip("/")
+        source = _translate(line)
+        if not anchored:
+            source = "(?:.+/)?" + source
+        self.rules.append(IgnoreRule(re.compile(source), negated, directory))
+
+    @classmethod
+    def load(cls, root: Path, patterns: Iterable[str] | None = None, files: Iterable[str] | None = None) -> "IgnoreRules":
+        """
+        Load rules from patterns and ignore files in the directory.
+
+        root: the directory
+        patterns: ignore patterns, applied after ignore files
+        files: names of ignore files in the directory, None for IGNORE_FILES
+        """
+        rules = cls()
+        for name in IGNORE_FILES if files is None else files:
+            file = root / name
+            if not file.is_file():
+                continue
+            logger.debug(f"Load ignore file {file}.")
+            for line in file.read_text(encoding="utf-8").splitlines():
+                rules.add(line)
+        for pattern in patterns or ():
+            rules.add(pattern)
+        return rules
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def ignored(self, path: str, isdir: bool) -> bool:
+        """
+        Return if the path is ignored.
+
+        path: relative POSIX path
+        isdir: the path is a directory
+        """
+        result = False
+        for rule in self.rules:
+            if rule.negated != result or rule.directory and not isdir:
+                continue
+            if rule.pattern.fullmatch(path) is not None:
+                result = not rule.negated
+        return result
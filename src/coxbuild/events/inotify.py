@@ -0,0 +1,271 @@
+"""Linux inotify binding by ctypes, with recursive watches."""
+
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import struct
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Callable
+
+logger = logging.getLogger("inotify")
+
+IN_ACCESS = 0x00000001
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_UNMOUNT = 0x00002000
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+_EVENT = struct.Struct("iIII")
+
+_libc = None
+
+
+def _load():
+    global _libc
+    if _libc is None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c")
+                           or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_init1.restype = ctypes.c_int
+        libc.inotify_add_watch.argtypes = [
+            ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_add_watch.restype = ctypes.c_int
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        libc.inotify_rm_watch.restype = ctypes.c_int
+        _libc = libc
+    return _libc
+
+
+def available() -> bool:
+    """Return if inotify is available on this platform."""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        return hasattr(_load(), "inotify_init1")
+    except OSError:
+        return False
+
+
+def _check(ret: int, path: Path | None = None) -> int:
+    if ret < 0:
+        code = ctypes.get_errno()
+        raise OSError(code, os.strerror(code), None if path is None else str(path))
+    return ret
+
+
+@dataclass
+class InotifyEvent:
+    """Raw inotify event."""
+    mask: int
+    """event mask"""
+    path: Path
+    """path of the watched directory, or of the entry in it"""
+    cookie: int = 0
+    """cookie to pair IN_MOVED_FROM and IN_MOVED_TO"""
+
+    @property
+    def isdir(self) -> bool:
+        return bool(self.mask & IN_ISDIR)
+
+
+class Inotify:
+    """Inotify instance, its watches and a non-blocking file descriptor."""
+
+    def __init__(self) -> None:
+        self.fd = _check(_load().inotify_init1(IN_NONBLOCK | IN_CLOEXEC))
+        self.watches: dict[int, Path] = {}
+        """watch descriptor -> watched path"""
+        self.paths: dict[Path, int] = {}
+        """watched path -> watch descriptor"""
+
+    def add(self, path: Path, mask: int) -> int:
+        """Add or update the watch on a path."""
+        wd = _check(_load().inotify_add_watch(
+            self.fd, os.fsencode(path), mask), path)
+        old = self.watches.get(wd)
+        if old is not None and old != path:
+            self.paths.pop(old, None)
+        self.watches[wd] = path
+        self.paths[path] = wd
+        return wd
+
+    def remove(self, path: Path) -> None:
+        """Remove the watch on a path, ignore if it has been removed by kernel."""
+        wd = self.paths.pop(path, None)
+        if wd is None:
+            return
+        self.watches.pop(wd, None)
+        _load().inotify_rm_watch(self.fd, wd)
+
+    def forget(self, wd: int) -> None:
+        """Forget a watch removed by kernel (IN_IGNORED)."""
+        path = self.watches.pop(wd, None)
+        if path is not None and self.paths.get(path) == wd:
+            del self.paths[path]
+
+    def read(self) -> list[tuple[int, int, int, str]]:
+        """Read pending events as (watch descriptor, mask, cookie, name), empty if there is none."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(
+                    data[offset:offset+length].rstrip(b"\0"))
+                offset += length
+                events.append((wd, mask, cookie, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class RecursiveWatcher:
+    """Watch a path, and directories in it recursively (if recursive), new directories are watched when they appear."""
+
+    def __init__(self, root: Path, mask: int, recursive: bool = True, ignored: Callable[[Path, bool], bool] | None = None) -> None:
+        """
+        root: path to watch
+        mask: events to watch
+        recursive: watch all directories in the path
+        ignored: decide whether an entry (path, is directory) is ignored, ignored directories are never watched
+        """
+        self.root = root
+        self.mask = mask | IN_DELETE_SELF | IN_MOVE_SELF
+        self.recursive = recursive
+        self.ignored = ignored
+        self.name: str | None = None
+        """name of the watched file in its parent directory, None when the root is a directory"""
+        self.inotify = Inotify()
+
+    def _watch(self, path: Path) -> None:
+        self.inotify.add(path, self.mask | IN_ONLYDIR |
+                         IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+
+    def _walk(self, path: Path, created: list[InotifyEvent] | None = None) -> None:
+        """Watch a directory tree, and collect entries in it as created events if provided."""
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            try:
+                self._watch(current)
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        isdir = entry.is_dir(follow_symlinks=False)
+                        child = current / entry.name
+                        if self.ignored is not None and self.ignored(child, isdir):
+                            continue
+                        if created is not None:
+                            created.append(InotifyEvent(
+                                IN_CREATE | (IN_ISDIR if isdir else 0), child))
+                        if isdir:
+                            stack.append(child)
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                # removed or unreadable before watched
+                continue
+
+    def start(self) -> None:
+        """Add watches, raise OSError (errno ENOSPC) when the watch limit is reached."""
+        if self.root.is_dir():
+            if self.recursive:
+                self._walk(self.root)
+            else:
+                self._watch(self.root)
+        else:
+            # the file may be replaced or recreated, whose watch would be removed, so watch its directory
+            self.name = self.root.name
+            self._watch(self.root.parent)
+
+    def _unwatch(self, path: Path) -> None:
+        for watched in [p for p in self.inotify.paths if p == path or p.is_relative_to(path)]:
+            self.inotify.remove(watched)
+
+    def process(self) -> list[InotifyEvent]:
+        """Read pending events, keep watches updated, and return events (IN_Q_OVERFLOW when events are lost)."""
+        result: list[InotifyEvent] = []
+        for wd, mask, cookie, name in self.inotify.read():
+            if mask & IN_Q_OVERFLOW:
+                logger.warning(f"Inotify queue overflows for {self.root}.")
+                result.append(InotifyEvent(mask, self.root))
+                if self.recursive and self.root.is_dir():
+                    # creation of directories may be lost
+                    try:
+                        self._walk(self.root)
+                    except OSError as ex:
+                        logger.warning(
+                            f"Failed to watch {self.root}, changes in it are missed.", exc_info=ex)
+                continue
+            base = self.inotify.watches.get(wd)
+            if mask & IN_IGNORED:
+                self.inotify.forget(wd)
+                continue
+            if base is None:
+                continue
+            path = base / name if name else base
+            if self.name is not None:
+                if name != self.name:
+                    continue
+            elif name and self.ignored is not None and self.ignored(path, bool(mask & IN_ISDIR)):
+                continue
+            result.append(InotifyEvent(mask, path, cookie))
+
+            if not (self.recursive and name and mask & IN_ISDIR):
+                continue
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                # entries may have been created before the watch is added
+                try:
+                    self._walk(path, result)
+                except OSError as ex:
+                    logger.warning(
+                        f"Failed to watch {path}, changes in it are missed.", exc_info=ex)
+            elif mask & IN_MOVED_FROM:
+                self._unwatch(path)
+        return result
+
+    async def events(self) -> AsyncIterator[list[InotifyEvent]]:
+        """Yield batches of events as they arrive."""
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        loop.add_reader(self.inotify.fd, ready.set)
+        try:
+            while True:
+                await ready.wait()
+                ready.clear()
+                events = self.process()
+                if events:
+                    yield events
+        finally:
+            loop.remove_reader(self.inotify.fd)
+
+    def close(self) -> None:
+        self.inotify.close()
+
+
+def isLimitError(ex: OSError) -> bool:
+    """Return if the error is caused by inotify limits (max_user_watches or max_user_instances)."""
+    return ex.errno in (errno.ENOSPC, errno.EMFILE)
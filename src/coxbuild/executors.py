@@ -0,0 +1,142 @@
+import asyncio
+import atexit
+import contextvars
+import functools
+import inspect
+import logging
+import pickle
+from concurrent.futures import Executor
+from concurrent.futures.thread import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable
+
+from coxbuild.configurations import Configuration, ConfigurationAccessor
+
+if TYPE_CHECKING:
+    from concurrent.futures.process import ProcessPoolExecutor
+
+logger = logging.getLogger("executors")
+
+_threadPools: dict[int, ThreadPoolExecutor] = {}
+_processPools: dict[int, "ProcessPoolExecutor"] = {}
+_extensions: dict[str, Any] = {}
+
+
+def threadPool(workers: int) -> ThreadPoolExecutor:
+    """
+    Get the shared thread pool with the number of workers.
+
+    workers: maximum number of threads
+    """
+    if workers not in _threadPools:
+        logger.debug(f"Create thread pool with {workers} workers.")
+        _threadPools[workers] = ThreadPoolExecutor(
+            workers, thread_name_prefix="coxbuild")
+    return _threadPools[workers]
+
+
+async def invoke(executor: Executor | None, func: Callable, *args: Any, **kwds: Any) -> Any:
+    """
+    Call a function and await its result.
+
+    Non-coroutine functions run in the executor (if given) so they do not block the event loop.
+
+    executor: executor for non-coroutine functions, None to call inline
+    func: function to call
+    """
+    if executor is None or inspect.iscoroutinefunction(func):
+        res = func(*args, **kwds)
+    else:
+        context = contextvars.copy_context()
+        res = await asyncio.get_running_loop().run_in_executor(
+            executor, functools.partial(context.run, func, *args, **kwds))
+    if inspect.isawaitable(res):
+        res = await res
+    return res
+
+
+def _shutdownProcessPools():
+    # release pools before interpreter shutdown clears the lazily imported module
+    for pool in _processPools.values():
+        pool.shutdown()
+    _processPools.clear()
+
+
+def processPool(workers: int) -> "ProcessPoolExecutor":
+    """
+    Get the shared process pool with the number of workers.
+
+    workers: maximum number of processes
+    """
+    if workers not in _processPools:
+        from concurrent.futures.process import ProcessPoolExecutor
+
+        if not _processPools:
+            atexit.register(_shutdownProcessPools)
+        logger.debug(f"Create process pool with {workers} workers.")
+        _processPools[workers] = ProcessPoolExecutor(workers)
+    return _processPools[workers]
+
+
+def picklable(value: Any) -> bool:
+    """Check if the value can be sent to another process."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return True
+    try:
+        pickle.dumps(value)
+        return True
+    except Exception:
+        return False
+
+
+def portable(config: Configuration) -> Configuration:
+    """Copy configuration with picklable entries only, e.g. to send it to another process."""
+    return Configuration(config.name, {key: value for key, value in config.data.items()
+                                       if not (isinstance(value, Configuration) and value.data is config.data) and picklable(value)})
+
+
+def _portableArg(value: Any) -> Any:
+    if isinstance(value, Configuration):
+        return portable(value)
+    if isinstance(value, ConfigurationAccessor):
+        return type(value)(portable(value.rootConfig))
+    return value
+
+
+def _resolve(target: Callable | tuple[str, str]) -> Callable:
+    if not isinstance(target, tuple):
+        return target
+
+    from coxbuild.extensions.loader import load as loadext
+
+    uri, name = target
+    if uri not in _extensions:
+        logger.debug(f"Load extension {uri} in worker process.")
+        _extensions[uri] = loadext(uri)
+    for task in _extensions[uri].tasks:
+        if task.name == name and task.body is not None:
+            return task.body
+    raise LookupError(f"Not found task {name} in extension {uri}.")
+
+
+def _callInProcess(target: Callable | tuple[str, str], args: list[Any], kwds: dict[str, Any]) -> Any:
+    res = _resolve(target)(*args, **kwds)
+    if inspect.isawaitable(res):
+        async def wait():
+            return await res
+        res = asyncio.run(wait())
+    return res
+
+
+async def invokeInProcess(executor: "ProcessPoolExecutor", target: Callable | tuple[str, str], *args: Any, **kwds: Any) -> Any:
+    """
+    Call a function in a worker process and await its result.
+
+    executor: process pool
+    target: picklable function, or (extension URI, task name) to look up the task body in the worker
+
+    Configurations (and their accessors) in arguments are sent with their picklable entries only.
+    """
+    args = tuple(map(_portableArg, args))
+    kwds = {key: _portableArg(value) for key, value in kwds.items()}
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, functools.partial(_callInProcess, target, list(args), kwds))
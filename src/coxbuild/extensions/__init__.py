@@ -1,15 +1,28 @@
+import importlib
 import inspect
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from pathlib import Path
 from types import ModuleType
-from typing import Iterable
+from typing import TYPE_CHECKING, Any, Iterable
 
 import coxbuild
 from coxbuild.configurations import Configuration, ConfigurationAccessor
-from coxbuild.pipelines import PipelineHook
-from coxbuild.services import EventHandler
-from coxbuild.tasks import Task, TaskContext
+
+if TYPE_CHECKING:
+    from coxbuild.pipelines import PipelineHook
+    from coxbuild.services import EventHandler
+    from coxbuild.tasks import Task, TaskContext
+
+_submodules = {"builtin", "dotnet", "gallery", "git",
+               "gradle", "loader", "nodejs", "python", "shell"}
+
+
+def __getattr__(name: str) -> Any:
+    # extensions are imported on first access
+    if name in _submodules:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @dataclass
@@ -22,7 +35,9 @@ class Extension:
     module: ModuleType | None = None
 
     @property
-    def tasks(self) -> Iterable[Task]:
+    def tasks(self) -> Iterable["Task"]:
+        from coxbuild.tasks import Task
+
         if not self.module:
             return
         for name, member in inspect.getmembers(self.module):
@@ -38,7 +53,9 @@ class Extension:
                             yield t
 
     @property
-    def events(self) -> Iterable[EventHandler]:
+    def events(self) -> Iterable["EventHandler"]:
+        from coxbuild.services import EventHandler
+
         if not self.module:
             return
         for name, member in inspect.getmembers(self.module):
@@ -54,7 +71,9 @@ class Extension:
                             yield t
 
     @property
-    def pipelineHooks(self) -> Iterable[PipelineHook]:
+    def pipelineHooks(self) -> Iterable["PipelineHook"]:
+        from coxbuild.pipelines import PipelineHook
+
         if not self.module:
             return
         for name, member in inspect.getmembers(self.module):
@@ -145,9 +164,9 @@ class ProjectSettings(ConfigurationAccessor):
         self.config["docs"] = value.resolve()
 
 
-def withProject(task: Task) -> Task:
+def withProject(task: "Task") -> "Task":
     """Decorator to add project argument to task context."""
-    def hook(context: TaskContext):
+    def hook(context: "TaskContext"):
         if context.config:
             context.kwds.update(project=ProjectSettings(context.config))
 
@@ -1,10 +1,11 @@
 import coxbuild
 from coxbuild.configuration import Configuration
+from coxbuild.configurations import ConfigurationAccessor
 from coxbuild.extensions import ProjectSettings, withProject
 from coxbuild.managers import Manager
 from coxbuild.pipelines import Pipeline
-from coxbuild.runtime import (ExecutionState, withExecutionState, withManager,
-                              withPipeline, withService)
+from coxbuild.runtime import (ExecutionState, withConfig, withExecutionState,
+                              withManager, withPipeline, withService)
 from coxbuild.services import Service
 from coxbuild.tasks import depend, group, task
 
@@ -63,3 +64,81 @@ def ext(*, manager: "Manager"):
 async def serve(*, service: Service):
     """Start event-based service."""
     await service()
+
+
+@grouped
+@withConfig
+@task
+def cache(*, config: Configuration):
+    """Show task result cache, and evict least recently used entries over the maximum size."""
+    from coxbuild.cache import CacheSettings
+    from coxbuild.utils import formatSize
+    from coxbuild.cache import fromConfig as cacheFromConfig
+
+    settings = CacheSettings(config)
+    actions = cacheFromConfig(config)
+    stats = actions.stats()
+    print(f"Path        : {settings.path}")
+    print(f"Entries     : {stats.entries}")
+    print(f"Size        : {formatSize(stats.size)} / {formatSize(settings.maxSize)}")
+    evicted = actions.prune()
+    if evicted:
+        print(f"Evicted     : {evicted}")
+
+
+@group("", "cache")
+@withConfig
+@task
+def clear(*, config: Configuration):
+    """Remove all entries in task result cache."""
+    from coxbuild.cache import fromConfig as cacheFromConfig
+
+    actions = cacheFromConfig(config)
+    print(f"Removed {actions.prune(0)} entries.")
+
+
+class HistorySettings(ConfigurationAccessor):
+    __configname__ = "history"
+
+    @property
+    def runs(self) -> int:
+        """Number of latest runs to show."""
+        return int(self.get("runs") or 20)
+
+    @runs.setter
+    def runs(self, value: int) -> None:
+        self.config["runs"] = value
+
+
+@grouped
+@withConfig
+@task
+def history(*, config: Configuration):
+    """Show run history, duration percentiles and slowest tasks (history:runs for the number of runs)."""
+    from coxbuild.history import store as historyStore
+
+    n = HistorySettings(config).runs
+    store = historyStore()
+    runs = store.runs(n)
+    if not runs:
+        print("No run recorded, set pipeline:history to true to record runs.")
+        return
+
+    longest = max(r.duration for r in runs) or 1
+    print(f"📈  Latest {len(runs)} runs")
+    for r in reversed(runs):
+        bar = "█" * max(1, round(r.duration / longest * 30))
+        print(f"  #{r.id:<5} {r.started:%Y-%m-%d %H:%M:%S}  {'🟢' if r.status == 'Success' else '🔴'} "
+              f"{r.duration:9.2f}s  cpu {r.cputime:8.2f}s  {bar}  {' '.join(r.targets)}")
+
+    stats = store.statistics(n)
+    print("")
+    print(f"⏱️  Tasks (slowest first)")
+    print(f"  {'p50':>9} {'p95':>9} {'last':>9} {'proc cpu':>9} {'runs':>5} {'fail':>5}  trend  name")
+    for s in stats:
+        trend = "➖"
+        if s.last > s.p50 * 1.1:
+            trend = "🔺"
+        elif s.last < s.p50 * 0.9:
+            trend = "🔻"
+        print(f"  {s.p50:8.2f}s {s.p95:8.2f}s {s.last:8.2f}s {s.processCputime:8.2f}s {s.count:5} {s.failures:5}  {trend}     {s.name}")
@@ -2,7 +2,7 @@ from pathlib import Path
 
 import coxbuild
 from coxbuild.configurations import Configuration, ConfigurationAccessor
-from coxbuild.schema import group, run, task
+from coxbuild.schema import CommandExecutionArgs, group, task
 from coxbuild.tasks import Task, TaskContext
 
 from .. import ProjectSettings, withProject
@@ -54,11 +54,42 @@ def withSettings(task: Task) -> Task:
     return task
 
 
+def _restore(project: ProjectSettings) -> CommandExecutionArgs:
+    return CommandExecutionArgs(["dotnet", "restore"], cwd=project.src)
+
+
+def _build(project: ProjectSettings, settings: Settings) -> CommandExecutionArgs:
+    args = ["dotnet", "build", "-c", settings.buildConfig]
+    if project.version:
+        args.append(f"/p:Version={project.version}")
+    return CommandExecutionArgs(args, cwd=project.src)
+
+
+def _pack(project: ProjectSettings, settings: Settings) -> CommandExecutionArgs:
+    args = ["dotnet", "pack", "-c", settings.buildConfig]
+    if project.version:
+        args.append(f"/p:Version={project.version}")
+    args.extend(["-o", str(project.package)])
+    return CommandExecutionArgs(args, cwd=project.src)
+
+
+def _push(project: ProjectSettings, settings: Settings) -> CommandExecutionArgs:
+    return CommandExecutionArgs(["dotnet", "nuget", "push", f"{str(project.package)}/*",
+                                 "-s", settings.nugetSource, "-k", settings.nugetToken])
+
+
 @grouped
 @withProject
 @task
 def restore(*, project: ProjectSettings):
-    run(["dotnet", "restore"], cwd=project.src, retry=3)
+    _restore(project).run(retry=3)
+
+
+@grouped
+@withProject
+@task
+async def restoreAsync(*, project: ProjectSettings):
+    await _restore(project).runAsync(retry=3)
 
 
 @grouped
@@ -66,10 +97,15 @@ def restore(*, project: ProjectSettings):
 @withSettings
 @task
 def build(*, project: ProjectSettings, settings: Settings):
-    args = ["dotnet", "build", "-c", settings.buildConfig]
-    if project.version:
-        args.append(f"/p:Version={project.version}")
-    run(args, cwd=project.src)
+    _build(project, settings).run()
+
+
+@grouped
+@withProject
+@withSettings
+@task
+async def buildAsync(*, project: ProjectSettings, settings: Settings):
+    await _build(project, settings).runAsync()
 
 
 @grouped
@@ -77,11 +113,15 @@ def build(*, project: ProjectSettings, settings: Settings):
 @withSettings
 @task
 def pack(*, project: ProjectSettings, settings: Settings):
-    args = ["dotnet", "pack", "-c", settings.buildConfig]
-    if project.version:
-        args.append(f"/p:Version={project.version}")
-    args.extend(["-o", str(project.package)])
-    run(args, cwd=project.src)
+    _pack(project, settings).run()
+
+
+@grouped
+@withProject
+@withSettings
+@task
+async def packAsync(*, project: ProjectSettings, settings: Settings):
+    await _pack(project, settings).runAsync()
 
 
 @grouped
@@ -89,5 +129,12 @@ def pack(*, project: ProjectSettings, settings: Settings):
 @withSettings
 @task
 def push(*, project: ProjectSettings, settings: Settings):
-    run(["dotnet", "nuget", "push", f"{str(project.package)}/*",
-        "-s", settings.nugetSource, "-k", settings.nugetToken])
+    _push(project, settings).run()
+
+
+@grouped
+@withProject
+@withSettings
+@task
+async def pushAsync(*, project: ProjectSettings, settings: Settings):
+    await _push(project, settings).runAsync()
@@ -2,22 +2,40 @@ from pathlib import Path
 
 import coxbuild
 from coxbuild.configurations import Configuration
-from coxbuild.schema import group, run, task
+from coxbuild.schema import CommandExecutionArgs, group, task
 
 from .. import ProjectSettings, withProject
 
 grouped = group("gradle")
 
 
+def _gradle(command: str, cwd: Path) -> CommandExecutionArgs:
+    return CommandExecutionArgs(["gradle", command], cwd=cwd)
+
+
 @grouped
 @withProject
 @task
 def build(path: Path | None = None, *, project: ProjectSettings):
-    run(["gradle", "build"], cwd=path or project.src)
+    _gradle("build", path or project.src).run()
+
+
+@grouped
+@withProject
+@task
+async def buildAsync(path: Path | None = None, *, project: ProjectSettings):
+    await _gradle("build", path or project.src).runAsync()
 
 
 @grouped
 @withProject
 @task
 def test(path: Path | None = None, *, project: ProjectSettings):
-    run(["gradle", "test"], cwd=path or project.test)
+    _gradle("test", path or project.test).run()
+
+
+@grouped
+@withProject
+@task
+async def testAsync(path: Path | None = None, *, project: ProjectSettings):
+    await _gradle("test", path or project.test).runAsync()
@@ -1,14 +1,17 @@
 import base64
 import importlib
 import logging
+import marshal
+import os
 import sys
 from hashlib import sha256
-from importlib.util import module_from_spec, spec_from_loader
+from importlib.util import MAGIC_NUMBER, module_from_spec, spec_from_loader
 from pathlib import Path
-from types import ModuleType
-from urllib import request
-from uuid import uuid1
+from types import CodeType, ModuleType
+from typing import Any
+from uuid import uuid1, uuid4
 
+from coxbuild import get_cache_directory
 from coxbuild.exceptions import CoxbuildSchemaException
 
 from . import Extension
@@ -25,6 +28,84 @@ def hashed(src: str):
     return sha256(src.encode()).hexdigest()
 
 
+def get_bytecode_directory() -> Path:
+    """Get the directory of compiled schemas."""
+    return get_cache_directory().joinpath("schemas")
+
+
+MAX_COMPILED = 256
+"""maximum number of cached compiled schemas, the least recently used ones are evicted"""
+
+
+def _evict(directory: Path, keep: int) -> None:
+    """Remove compiled schemas except the newest ones (by modification time, which is touched on each hit)."""
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".pyc"):
+            try:
+                entries.append((entry.stat().st_mtime_ns, entry.path))
+            except OSError:
+                pass
+    if len(entries) <= keep:
+        return
+    entries.sort(reverse=True)
+    for _, path in entries[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def compiled(src: str, filename: str, hashcode: str) -> CodeType:
+    """
+    Compile schema source, with a marshal cache keyed by the hashcode of the source.
+
+    At most MAX_COMPILED entries are kept.
+    """
+    path = get_bytecode_directory().joinpath(
+        f"{hashcode}.{sys.implementation.cache_tag}.pyc")
+    try:
+        data = path.read_bytes()
+        if data.startswith(MAGIC_NUMBER):
+            cachedname, code = marshal.loads(data[len(MAGIC_NUMBER):])
+            if cachedname == filename:
+                logger.debug("Load compiled schema: %s", path)
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return code
+    except FileNotFoundError:
+        pass
+    except Exception as ex:
+        logger.debug("Failed to load compiled schema: %s", path, exc_info=ex)
+
+    code = compile(src, filename, "exec")
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(f"{path.name}.{uuid4().hex}")
+        temp.write_bytes(MAGIC_NUMBER + marshal.dumps((filename, code)))
+        os.replace(temp, path)
+        _evict(path.parent, MAX_COMPILED)
+    except OSError as ex:
+        logger.debug("Failed to save compiled schema: %s", path, exc_info=ex)
+    return code
+
+
+_prelude: dict[str, Any] | None = None
+
+
+def prelude() -> dict[str, Any]:
+    """Get the namespace of 'from coxbuild.schema import *', which is the prelude of schemas."""
+    global _prelude
+    if _prelude is None:
+        from coxbuild import schema
+
+        _prelude = {name: getattr(schema, name) for name in schema.__all__}
+    return _prelude
+
+
 def fromModule(module: ModuleType, version: str = "") -> Extension:
     """
     Load extension from module.
@@ -92,9 +173,9 @@ def fromSource(src: str, filename: str = "<string>", hashcode: str = "") -> Exte
         spec = spec_from_loader(rhashcode, loader=None)
         mod = module_from_spec(spec)
 
-        srccode = compile(src, filename, "exec")
+        srccode = compiled(src, filename, rhashcode)
 
-        exec("from coxbuild.schema import *", mod.__dict__)
+        mod.__dict__.update(prelude())
         exec(srccode, mod.__dict__)
 
         ext = fromModule(mod)
@@ -134,6 +215,8 @@ def fromUrl(url: str, hashcode: str = "") -> Extension:
     """
     logger.info("Load extension from url: %s", url)
 
+    from urllib import request
+
     with request.urlopen(url) as f:
         src = f.read().decode("utf-8")
 
@@ -2,19 +2,31 @@ from pathlib import Path
 
 import coxbuild
 from coxbuild.configurations import Configuration
-from coxbuild.schema import group, run, task
+from coxbuild.schema import CommandExecutionArgs, group, task
 
 from .. import ProjectSettings, withProject
 
 grouped = group("nodejs")
 
 
+def _npm(*args: str, cwd: Path) -> CommandExecutionArgs:
+    return CommandExecutionArgs(["npm", *args], cwd=cwd)
+
+
 @grouped
 @withProject
 @task
 def restore(path: Path | None = None, *, project: ProjectSettings):
     """Restore npm packages (ci)."""
-    run(["npm", "ci"], cwd=path or project.src, retry=3)
+    _npm("ci", cwd=path or project.src).run(retry=3)
+
+
+@grouped
+@withProject
+@task
+async def restoreAsync(path: Path | None = None, *, project: ProjectSettings):
+    """Restore npm packages (ci), asynchronously."""
+    await _npm("ci", cwd=path or project.src).runAsync(retry=3)
 
 
 @grouped
@@ -22,7 +34,15 @@ def restore(path: Path | None = None, *, project: ProjectSettings):
 @task
 def build(path: Path | None = None, *, project: ProjectSettings):
     """Build npm project."""
-    run(["npm", "run", "build"], cwd=path or project.src)
+    _npm("run", "build", cwd=path or project.src).run()
+
+
+@grouped
+@withProject
+@task
+async def buildAsync(path: Path | None = None, *, project: ProjectSettings):
+    """Build npm project, asynchronously."""
+    await _npm("run", "build", cwd=path or project.src).runAsync()
 
 
 @grouped
@@ -30,7 +50,15 @@ def build(path: Path | None = None, *, project: ProjectSettings):
 @task
 def dev(path: Path | None = None, *, project: ProjectSettings):
     """Run dev script."""
-    run(["npm", "run", "dev"], cwd=path or project.src)
+    _npm("run", "dev", cwd=path or project.src).run()
+
+
+@grouped
+@withProject
+@task
+async def devAsync(path: Path | None = None, *, project: ProjectSettings):
+    """Run dev script, asynchronously."""
+    await _npm("run", "dev", cwd=path or project.src).runAsync()
 
 
 @grouped
@@ -38,4 +66,12 @@ def dev(path: Path | None = None, *, project: ProjectSettings):
 @task
 def serve(path: Path | None = None, *, project: ProjectSettings):
     """Run serve script."""
-    run(["npm", "run", "serve"], cwd=path or project.src)
+    _npm("run", "serve", cwd=path or project.src).run()
+
+
+@grouped
+@withProject
+@task
+async def serveAsync(path: Path | None = None, *, project: ProjectSettings):
+    """Run serve script, asynchronously."""
+    await _npm("run", "serve", cwd=path or project.src).runAsync()
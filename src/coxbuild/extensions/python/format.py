@@ -1,7 +1,10 @@
+import math
+import os
 from pathlib import Path
 
 from coxbuild import get_working_directory
-from coxbuild.schema import depend, group, precond, run, task
+from coxbuild.invocation import CommandExecutionArgs, chunked
+from coxbuild.schema import depend, group, precond, run, runMany, task
 
 from . import grouped
 from .package import hasPackages, upgradePackages
@@ -33,10 +36,11 @@ def autopep8(path: Path | None = None):
 @task
 def isort(path: Path | None = None):
     """Use isort to format Python imports."""
-    for file in (path or get_working_directory()).glob("**/*.py"):
-        if file.is_dir():
-            continue
-        run(["isort", str(file)])
+    files = [str(file) for file in (path or get_working_directory()).glob("**/*.py")
+             if not file.is_dir()]
+    jobs = os.cpu_count() or 1
+    runMany(chunked(CommandExecutionArgs(["isort"]), files,
+            max(math.ceil(len(files) / jobs), 1)), jobs=jobs)
 
 
 @grouped
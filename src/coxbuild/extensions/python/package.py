@@ -2,7 +2,8 @@ import shutil
 from pathlib import Path
 from typing import Tuple
 
-from coxbuild.schema import depend, group, precond, run, task
+from coxbuild.schema import (CommandExecutionArgs, depend, group, precond,
+                             run, task)
 
 from .. import ProjectSettings, withProject
 from . import Settings, grouped, withSettings
@@ -38,14 +39,33 @@ def upgradePackages(*packages: str):
     run(["python", "-m", "pip", "install", "--upgrade", *packages], retry=3)
 
 
+def _restore(requirements: Path) -> CommandExecutionArgs:
+    return CommandExecutionArgs(["python", "-m", "pip", "install", "-r", str(requirements)])
+
+
+def _build(src: Path, dist: Path) -> CommandExecutionArgs:
+    return CommandExecutionArgs(["python", "-m", "build", "-o", str(dist)], cwd=src)
+
+
+def _clean(src: Path):
+    for item in src.glob("*.egg-info"):
+        if not item.is_dir():
+            continue
+        shutil.rmtree(item)
+
+
+def _deploy(dist: Path) -> CommandExecutionArgs:
+    return CommandExecutionArgs(["python", "-m", "twine", "upload",
+                                 "--skip-existing", "--repository", "pypi", str(dist) + "/*"])
+
+
 @grouped
 @subgrouped
 @withSettings
 @task
 def restore(requirements: Path | None = None, *, settings: Settings):
     """Restore Python packages from requirements.txt."""
-    run(["python", "-m", "pip", "install", "-r",
-        str(requirements or settings.requirements)], retry=3)
+    _restore(requirements or settings.requirements).run(retry=3)
 
 
 @restore.precond
@@ -57,6 +77,16 @@ def needRestore(*, settings: Settings):
     return not hasPackages(reqs)
 
 
+@grouped
+@subgrouped
+@withSettings
+@precond(needRestore)
+@task
+async def restoreAsync(requirements: Path | None = None, *, settings: Settings):
+    """Restore Python packages from requirements.txt, asynchronously."""
+    await _restore(requirements or settings.requirements).runAsync(retry=3)
+
+
 @grouped
 @subgrouped
 @precond(lambda: not hasPackages({"build": "*", "twine": "*"}))
@@ -74,12 +104,20 @@ def prebuild():
 def build(src: Path | None = None, dist: Path | None = None, *, project: ProjectSettings):
     """Build Python package."""
     src = src or project.src
-    run(["python", "-m", "build", "-o", str(dist or project.package)],
-        cwd=src)
-    for item in src.glob("*.egg-info"):
-        if not item.is_dir():
-            continue
-        shutil.rmtree(item)
+    _build(src, dist or project.package).run()
+    _clean(src)
+
+
+@grouped
+@subgrouped
+@withProject
+@depend(prebuild)
+@task
+async def buildAsync(src: Path | None = None, dist: Path | None = None, *, project: ProjectSettings):
+    """Build Python package, asynchronously."""
+    src = src or project.src
+    await _build(src, dist or project.package).runAsync()
+    _clean(src)
 
 
 @grouped
@@ -109,5 +147,14 @@ def uninstallBuilt(dist: Path | None = None, *, project: ProjectSettings):
 @task
 def deploy(dist: Path | None = None, *, project: ProjectSettings):
     """Upload the package to PYPI."""
-    run(["python", "-m", "twine", "upload",
-        "--skip-existing", "--repository", "pypi", str(dist or project.package) + "/*"])
+    _deploy(dist or project.package).run()
+
+
+@grouped
+@subgrouped
+@withProject
+@depend(buildAsync)
+@task
+async def deployAsync(dist: Path | None = None, *, project: ProjectSettings):
+    """Upload the package to PYPI, asynchronously."""
+    await _deploy(dist or project.package).runAsync()
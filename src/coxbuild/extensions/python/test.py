@@ -1,7 +1,7 @@
 from pathlib import Path
 
 from coxbuild import get_working_directory
-from coxbuild.schema import depend, group, precond, run, task
+from coxbuild.schema import CommandExecutionArgs, depend, group, precond, task
 
 from .. import ProjectSettings, withProject
 from . import grouped
@@ -19,6 +19,11 @@ def restore():
     upgradePackages("pytest", "pytest-asyncio", "coverage", "pytest-cov")
 
 
+def _pytest(src: Path, test: Path) -> CommandExecutionArgs:
+    return CommandExecutionArgs(["pytest", "--cov-report=term-missing",
+                                 "--cov-report=html", f"--cov={str(src)}"], cwd=test)
+
+
 @grouped
 @subgrouped
 @withProject
@@ -26,8 +31,17 @@ def restore():
 @task
 def pytest(src: Path | None = None, test: Path | None = None, *, project: ProjectSettings):
     """Use pytest to test Python code."""
-    run(["pytest", "--cov-report=term-missing",
-        "--cov-report=html", f"--cov={str(src or project.src)}"], cwd=str(test or project.test))
+    _pytest(src or project.src, test or project.test).run()
+
+
+@grouped
+@subgrouped
+@withProject
+@depend(restore)
+@task
+async def pytestAsync(src: Path | None = None, test: Path | None = None, *, project: ProjectSettings):
+    """Use pytest to test Python code, asynchronously."""
+    await _pytest(src or project.src, test or project.test).runAsync()
 
 
 @grouped
@@ -37,3 +51,12 @@ def pytest(src: Path | None = None, test: Path | None = None, *, project: Projec
 def test():
     """Test Python code."""
     pass
+
+
+@grouped
+@subgrouped
+@depend(pytestAsync)
+@task
+def testAsync():
+    """Test Python code, asynchronously."""
+    pass
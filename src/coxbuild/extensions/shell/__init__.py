@@ -1,6 +1,6 @@
 import platform
 
-from coxbuild.schema import group, run, task
+from coxbuild.schema import group, run, runAsync, task
 
 grouped = group("shell")
 
@@ -28,3 +28,9 @@ def existCommand(name: str) -> bool:
 @task
 def execute(*args, **kwargs):
     run(*args, **kwargs)
+
+
+@grouped
+@task
+async def executeAsync(*args, **kwargs):
+    await runAsync(*args, **kwargs)
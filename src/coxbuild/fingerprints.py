@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+import string
+import threading
+from hashlib import sha256
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable
+
+from coxbuild import get_state_directory
+from coxbuild.configurations import Configuration
+from coxbuild.utils import fileLock
+
+if TYPE_CHECKING:
+    from coxbuild.tasks import Task
+
+logger = logging.getLogger("fingerprints")
+
+Fingerprint = dict[str, list[int]]
+"""file path -> [size, modification time in ns]"""
+
+
+class _PathFormatter(string.Formatter):
+    def __init__(self, paths: dict[str, Path]) -> None:
+        super().__init__()
+        self.paths = paths
+
+    def get_value(self, key, args, kwds):
+        if isinstance(key, str) and key in self.paths:
+            return str(self.paths[key])
+        raise KeyError(
+            f"Unknown path placeholder '{key}', use one of {', '.join(self.paths)}.")
+
+
+def placeholders(config: Configuration | None) -> dict[str, Path]:
+    """Get paths for placeholders in patterns, from project settings."""
+    from coxbuild.extensions import ProjectSettings
+
+    project = ProjectSettings(config or Configuration())
+    return {"src": project.src, "test": project.test, "docs": project.docs, "package": project.package}
+
+
+def expand(patterns: Iterable[str], config: Configuration | None = None) -> list[Path]:
+    """
+    Expand glob patterns to existing files.
+
+    Patterns are relative to the working directory, and can use placeholders for project paths,
+    e.g. '{src}/**/*.py' ('src', 'test', 'docs', 'package').
+    """
+    patterns = list(patterns)
+    if not patterns:
+        return []
+
+    formatter = _PathFormatter(placeholders(config))
+    files: set[Path] = set()
+    for pattern in patterns:
+        pattern = formatter.format(pattern)
+        path = Path(pattern)
+        if path.is_absolute():
+            root, pattern = Path(path.anchor), str(
+                path.relative_to(path.anchor))
+        else:
+            root = Path(".")
+        if not any(c in pattern for c in "*?["):
+            items = [root.joinpath(pattern)]
+        else:
+            items = root.glob(pattern)
+        for item in items:
+            if item.is_file():
+                files.add(item)
+    return sorted(files)
+
+
+def fingerprint(files: Iterable[Path]) -> Fingerprint:
+    """Get fingerprint (size and modification time) of files."""
+    result: Fingerprint = {}
+    for file in files:
+        try:
+            stat = file.stat()
+        except OSError:
+            continue
+        result[str(file)] = [stat.st_size, stat.st_mtime_ns]
+    return result
+
+
+def stableRepr(value: Any) -> str | None:
+    """Get a representation which is stable across runs, None if not available."""
+    match value:
+        case None | str() | int() | float() | bool() | Path():
+            return repr(value)
+        case list() | tuple():
+            items = [stableRepr(item) for item in value]
+            return None if None in items else f"[{', '.join(items)}]"
+        case _:
+            return None
+
+
+def taskKey(task: "Task", args: list[Any], kwds: dict[str, Any]) -> str:
+    """Get key for a task invocation, only stable arguments take effect."""
+    items = [task.name, *(stableRepr(arg) or "" for arg in args)]
+    items.extend(f"{k}={stableRepr(v)}" for k, v in sorted(
+        kwds.items()) if stableRepr(v) is not None)
+    return sha256("\0".join(items).encode()).hexdigest()
+
+
+class FingerprintStore:
+    """
+    Store fingerprints of inputs and outputs for the last successful runs.
+
+    Several processes may share the store, entries are merged under a lock file when they are recorded.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or get_state_directory().joinpath("fingerprints.json")
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, dict[str, Fingerprint]]:
+        try:
+            return json.loads(self.path.read_text("utf-8"))
+        except FileNotFoundError:
+            return {}
+        except Exception as ex:
+            logger.warning(f"Failed to load fingerprints: {ex}")
+            return {}
+
+    def get(self, key: str) -> dict[str, Fingerprint] | None:
+        """Get recorded fingerprints, with keys 'inputs' and 'outputs'."""
+        with self._lock:
+            return self._load().get(key)
+
+    def set(self, key: str, inputs: Fingerprint, outputs: Fingerprint) -> None:
+        """Record fingerprints."""
+        with self._lock, fileLock(self.path.with_name(f"{self.path.name}.lock")):
+            data = self._load()
+            data[key] = {"inputs": inputs, "outputs": outputs}
+            temp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            temp.write_text(json.dumps(data), "utf-8")
+            os.replace(temp, self.path)
+
+
+_store: FingerprintStore | None = None
+
+
+def store() -> FingerprintStore:
+    """Get the fingerprint store in the state directory."""
+    global _store
+    path = get_state_directory().joinpath("fingerprints.json").resolve()
+    if _store is None or _store.path != path:
+        _store = FingerprintStore(path)
+    return _store
+
+
+def current(task: "Task", config: Configuration | None) -> dict[str, Fingerprint]:
+    """Get current fingerprints of declared inputs and outputs of a task."""
+    return {
+        "inputs": fingerprint(expand(task.inputs, config)),
+        "outputs": fingerprint(expand(task.outputs, config)),
+    }
+
+
+def upToDate(task: "Task", args: list[Any], kwds: dict[str, Any], config: Configuration | None) -> bool:
+    """Check whether declared inputs and outputs are the same as the last successful run."""
+    if not task.inputs and not task.outputs:
+        return False
+    recorded = store().get(taskKey(task, args, kwds))
+    if recorded is None:
+        return False
+    now = current(task, config)
+    if task.outputs and not now["outputs"]:
+        return False
+    return recorded == now
+
+
+def record(task: "Task", args: list[Any], kwds: dict[str, Any], config: Configuration | None) -> None:
+    """Record fingerprints of declared inputs and outputs after a successful run."""
+    if not task.inputs and not task.outputs:
+        return
+    now = current(task, config)
+    store().set(taskKey(task, args, kwds), now["inputs"], now["outputs"])
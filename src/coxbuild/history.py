@@ -0,0 +1,189 @@
+import json
+import logging
+import math
+import sqlite3
+import statistics
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+
+from coxbuild import get_state_directory
+
+from .tasks import TaskResult, TaskStatus
+
+if TYPE_CHECKING:
+    from .pipelines import PipelineResult
+
+logger = logging.getLogger("history")
+
+_migrations = [
+    [
+        """CREATE TABLE IF NOT EXISTS tasks (
+            name TEXT NOT NULL,
+            status TEXT NOT NULL,
+            duration REAL NOT NULL,
+            finished REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS tasks_name ON tasks (name, finished)",
+    ],
+    [
+        """CREATE TABLE runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            targets TEXT NOT NULL,
+            status TEXT NOT NULL,
+            started REAL NOT NULL,
+            duration REAL NOT NULL,
+            cputime REAL NOT NULL
+        )""",
+        "ALTER TABLE tasks ADD COLUMN run INTEGER REFERENCES runs (id)",
+        "ALTER TABLE tasks ADD COLUMN started REAL",
+        "ALTER TABLE tasks ADD COLUMN cputime REAL",
+        "CREATE INDEX tasks_run ON tasks (run)",
+    ],
+]
+
+
+def percentile(values: Iterable[float], p: float) -> float:
+    """Get the percentile (0 to 100) by linear interpolation."""
+    values = sorted(values)
+    if not values:
+        return 0
+    rank = (len(values) - 1) * p / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+@dataclass
+class RunRecord:
+    """Recorded pipeline run."""
+    id: int
+    targets: list[str]
+    status: str
+    started: datetime
+    duration: float
+    """duration in seconds"""
+    cputime: float
+    """CPU time in seconds"""
+
+
+@dataclass
+class TaskStatistics:
+    """Statistics of a task over recorded runs."""
+    name: str
+    count: int
+    """number of runs"""
+    failures: int
+    """number of failing runs"""
+    p50: float
+    """median duration in seconds"""
+    p95: float
+    """95th percentile duration in seconds"""
+    last: float
+    """duration in seconds of the latest run"""
+    processCputime: float
+    """median CPU time in seconds of the process while the task ran, which overlaps with concurrent tasks"""
+
+
+class History:
+    """Local store of run history, in a SQLite database."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=10)
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version < len(_migrations):
+            with connection:
+                for migration in _migrations[version:]:
+                    for statement in migration:
+                        connection.execute(statement)
+                connection.execute(f"PRAGMA user_version = {len(_migrations)}")
+        return connection
+
+    def record(self, result: "PipelineResult") -> int:
+        """Append a pipeline run and its task results, return the run id."""
+        now = time.time()
+        started = result.started.timestamp() if result.started else now
+        with closing(self._connect()) as connection, connection:
+            run = connection.execute(
+                "INSERT INTO runs (targets, status, started, duration, cputime) VALUES (?, ?, ?, ?, ?)",
+                (json.dumps(result.targets), "Success" if result else "Failing", started,
+                 result.duration.total_seconds(), result.cputime.total_seconds())).lastrowid
+            connection.executemany(
+                "INSERT INTO tasks (name, status, duration, finished, run, started, cputime) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(r.task.name, r.status.name, r.duration.total_seconds(), now, run,
+                  r.started.timestamp() if r.started else None, r.processCputime.total_seconds()) for r in result.tasks])
+        return run
+
+    def runs(self, limit: int = 20) -> list[RunRecord]:
+        """Get the latest runs, latest first."""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT id, targets, status, started, duration, cputime FROM runs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [RunRecord(id, json.loads(targets), status, datetime.fromtimestamp(started), duration, cputime)
+                for id, targets, status, started, duration, cputime in rows]
+
+    def statistics(self, runs: int = 20) -> list[TaskStatistics]:
+        """Get statistics of tasks over the latest runs, slowest (by p95) first."""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT name, status, duration, cputime FROM tasks WHERE run IN (SELECT id FROM runs ORDER BY id DESC LIMIT ?) ORDER BY run",
+                (runs,)).fetchall()
+
+        items: dict[str, list[tuple[str, float, float]]] = {}
+        for name, status, duration, cputime in rows:
+            items.setdefault(name, []).append(
+                (status, duration, cputime or 0))
+
+        result = []
+        for name, records in items.items():
+            durations = [d for s, d, _ in records if s ==
+                         TaskStatus.Success.name] or [d for _, d, _ in records]
+            result.append(TaskStatistics(
+                name, len(records),
+                sum(1 for s, _, _ in records if s == TaskStatus.Failing.name),
+                percentile(durations, 50), percentile(durations, 95), records[-1][1],
+                percentile([c for _, _, c in records], 50)))
+        result.sort(key=lambda s: -s.p95)
+        return result
+
+    def durations(self, name: str, limit: int = 10) -> list[float]:
+        """Get durations in seconds of the latest successful runs of a task."""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT duration FROM tasks WHERE name = ? AND status = 'Success' ORDER BY finished DESC LIMIT ?", (name, limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def estimates(self, names: Iterable[str], limit: int = 10) -> dict[str, float]:
+        """
+        Estimate durations in seconds of tasks by the median of their latest successful runs.
+
+        Only wall time is used, recorded CPU time is per process and overlaps with concurrent tasks.
+
+        Tasks without history are estimated by the median of the others, or 1 second if no history at all.
+        """
+        names = list(names)
+        known: dict[str, float] = {}
+        for name in names:
+            items = self.durations(name, limit)
+            if items:
+                known[name] = statistics.median(items)
+        default = statistics.median(known.values()) if known else 1.0
+        return {name: known.get(name, default) for name in names}
+
+
+_store: History | None = None
+
+
+def store() -> History:
+    """Get the history store in the state directory."""
+    global _store
+    path = get_state_directory().joinpath("history.db").resolve()
+    if _store is None or _store.path != path:
+        _store = History(path)
+    return _store
@@ -1,9 +1,19 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import dataclasses
+import inspect
+import io
 import logging
+import os
 import pathlib
 import subprocess
+import threading
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import timedelta
 from timeit import default_timer as timer
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Callable, Iterable
 
 from .exceptions import CoxbuildRuntimeException
 
@@ -23,11 +33,96 @@ class CommandExecutionException(CoxbuildRuntimeException):
             message += f"\nstdout: {result.stdout}"
         if result.stderr:
             message += f"\nstderr: {result.stderr}"
+        if result.args.tee is not None:
+            message += f"\nfull output: {result.args.tee}"
         super().__init__(message)
         self.result = result
         self.error = error
 
 
+class CommandCancelledException(CoxbuildRuntimeException):
+    """Exception for command started in a cancelled process scope."""
+
+    def __init__(self, args: "CommandExecutionArgs"):
+        super().__init__(
+            f"Command {' '.join(args.cmds)} cancelled before starting")
+        self.args = args
+
+
+Process = subprocess.Popen | asyncio.subprocess.Process
+
+
+def _running(process: Process) -> bool:
+    if isinstance(process, subprocess.Popen):
+        return process.poll() is None
+    return process.returncode is None
+
+
+class ProcessScope:
+    """Track child processes started by commands, to terminate them on cancellation."""
+
+    def __init__(self, parent: "ProcessScope | None" = None) -> None:
+        self.parent = parent
+        """outer scope, which also tracks processes of this scope"""
+        self.processes: set[Process] = set()
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """Return if the scope or its outer scope is cancelled."""
+        return self._cancelled or (self.parent is not None and self.parent.cancelled)
+
+    def add(self, process: Process) -> None:
+        """Track a process, it is killed immediately if the scope is cancelled."""
+        if self.parent is not None:
+            self.parent.add(process)
+        with self._lock:
+            self.processes.add(process)
+            cancelled = self._cancelled
+        if cancelled:
+            process.kill()
+
+    def discard(self, process: Process) -> None:
+        """Stop tracking a process."""
+        if self.parent is not None:
+            self.parent.discard(process)
+        with self._lock:
+            self.processes.discard(process)
+
+    def cancel(self) -> list[Process]:
+        """Mark the scope as cancelled, and send SIGTERM to running processes."""
+        with self._lock:
+            self._cancelled = True
+            processes = [p for p in self.processes if _running(p)]
+        for process in processes:
+            logger.info(f"Terminate process {process.pid}")
+            try:
+                process.terminate()
+            except OSError:
+                pass
+        return processes
+
+    async def terminate(self, grace: timedelta = timedelta(seconds=5)) -> None:
+        """Cancel the scope, send SIGTERM to running processes, and SIGKILL if they are still running after the grace period."""
+        processes = self.cancel()
+        tic = timer()
+        while any(_running(p) for p in processes) and timer() - tic < grace.total_seconds():
+            await asyncio.sleep(0.05)
+        for process in processes:
+            if _running(process):
+                logger.info(f"Kill process {process.pid}")
+                try:
+                    process.kill()
+                except OSError:
+                    pass
+
+
+processScope: contextvars.ContextVar[ProcessScope | None] = contextvars.ContextVar(
+    "processScope", default=None)
+"""process scope for current context"""
+
+
 @dataclass
 class CommandExecutionResult:
     """Result for command execution."""
@@ -37,10 +132,10 @@ class CommandExecutionResult:
     """execution duration"""
     code: int | None = None
     """exit code, None for timeout"""
-    stdout: str = ""
-    """stdout in text (if pipe)"""
-    stderr: str = ""
-    """stderr in text (if pipe)"""
+    stdout: str | bytes = ""
+    """stdout in text (bytes if binary, if pipe), only the last lines if streaming"""
+    stderr: str | bytes = ""
+    """stderr in text (bytes if binary, if pipe), only the last lines if streaming"""
 
     @property
     def timeout(self) -> bool:
@@ -60,22 +155,342 @@ class CommandExecutionResult:
             raise CommandExecutionException(self)
 
 
+_CHUNK = 1 << 16
+_MAXLINE = 1 << 20
+
+
+class OutputTail:
+    """Split streamed output into lines, keep the last lines of each stream, and tee the raw output to a file."""
+
+    def __init__(self, args: "CommandExecutionArgs") -> None:
+        self.binary = args.binary
+        self.lines: dict[str, deque[str | bytes]] = {
+            "stdout": deque(maxlen=args.tail), "stderr": deque(maxlen=args.tail)}
+        self.partial: dict[str, bytes] = {"stdout": b"", "stderr": b""}
+        self.file = None
+        if args.tee is not None:
+            pathlib.Path(args.tee).parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(args.tee, "wb")
+        self.lock = threading.RLock()
+
+    def feed(self, name: str, data: bytes) -> list[str] | list[bytes]:
+        """Feed a chunk of a stream (empty at the end of stream), and return the completed lines (without line endings, bytes if binary)."""
+        with self.lock:
+            if self.file is not None and data:
+                self.file.write(data)
+            buffer = self.partial[name] + data
+            if data:
+                *completed, rest = buffer.split(b"\n")
+                if len(rest) > _MAXLINE:
+                    completed.append(rest)
+                    rest = b""
+                self.partial[name] = rest
+            else:
+                completed = [buffer] if buffer else []
+                self.partial[name] = b""
+            lines = completed if self.binary else [line.decode(
+                "utf-8", errors="replace").removesuffix("\r") for line in completed]
+            self.lines[name].extend(lines)
+            return lines
+
+    def text(self, name: str) -> str | bytes:
+        """Get the last lines of a stream."""
+        if self.binary:
+            return b"".join(line + b"\n" for line in self.lines[name])
+        return "".join(f"{line}\n" for line in self.lines[name])
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+
+
+Input = str | bytes | os.PathLike | BinaryIO | Iterable[bytes] | AsyncIterable[bytes]
+"""stdin of a command: text, bytes, a file path, a binary file, or an (async) iterable of bytes"""
+
+
+class _Stdin:
+    """Source for stdin of a command, files are passed to the child directly, and others are written through a pipe."""
+
+    def __init__(self, input: Input | None, asynchronous: bool = False) -> None:
+        self.opened = None
+        self.chunks: Iterable[bytes] | AsyncIterable[bytes] | None = None
+        self.stdin: Any = None
+        """stdin argument for the child"""
+        if input is None:
+            return
+        if isinstance(input, str):
+            self.chunks = [input.encode("utf-8")]
+        elif isinstance(input, (bytes, bytearray, memoryview)):
+            self.chunks = [bytes(input)]
+        elif isinstance(input, os.PathLike):
+            self.opened = self.stdin = open(input, "rb")
+        elif hasattr(input, "read"):
+            try:
+                fd = input.fileno()
+                if input.seekable():
+                    # the child reads from the position of the file object, not of its read-ahead buffer
+                    os.lseek(fd, input.tell(), os.SEEK_SET)
+                self.stdin = input
+            except (OSError, AttributeError, io.UnsupportedOperation):
+                self.chunks = iter(lambda: input.read(_CHUNK), b"")
+        elif hasattr(input, "__aiter__") and not asynchronous:
+            raise TypeError(
+                "Asynchronous iterable input is only supported by asynchronous runs.")
+        else:
+            self.chunks = input
+        if self.stdin is None:
+            self.stdin = subprocess.PIPE
+
+    @staticmethod
+    def _bytes(chunk: str | bytes) -> bytes:
+        return chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+    def write(self, pipe) -> None:
+        """Write input to the pipe and close it."""
+        try:
+            for chunk in self.chunks:
+                pipe.write(self._bytes(chunk))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+    async def writeAsync(self, pipe: asyncio.StreamWriter) -> None:
+        """Write input to the pipe asynchronously and close it."""
+        try:
+            if hasattr(self.chunks, "__aiter__"):
+                async for chunk in self.chunks:
+                    pipe.write(self._bytes(chunk))
+                    await pipe.drain()
+            else:
+                for chunk in self.chunks:
+                    pipe.write(self._bytes(chunk))
+                    await pipe.drain()
+            pipe.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def close(self) -> None:
+        if self.opened is not None:
+            self.opened.close()
+
+
+def _decode(data: bytes | None, binary: bool) -> str | bytes:
+    if binary:
+        return data or b""
+    return _text(data)
+
+
+def _streamcmd(args: "CommandExecutionArgs", process: subprocess.Popen, result: CommandExecutionResult, output: OutputTail, source: _Stdin):
+    def pump(name: str, source):
+        while True:
+            data = source.read1(_CHUNK)
+            with output.lock:
+                lines = output.feed(name, data)
+                if args.callback is not None:
+                    for line in lines:
+                        args.callback(name, line)
+            if not data:
+                break
+
+    threads = [threading.Thread(target=pump, args=(name, pipe), daemon=True)
+               for name, pipe in (("stdout", process.stdout), ("stderr", process.stderr))]
+    if process.stdin is not None:
+        threads.append(threading.Thread(
+            target=source.write, args=(process.stdin,), daemon=True))
+    for thread in threads:
+        thread.start()
+    try:
+        result.code = process.wait(
+            args.timeout.total_seconds() if args.timeout else None)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    for thread in threads:
+        thread.join()
+
+
 def execmd(args: "CommandExecutionArgs"):
     """Execute command and get result."""
     logger.debug(f"Execute command: {args}")
 
     result = CommandExecutionResult(args)
 
+    scope = processScope.get()
+    if scope is not None and scope.cancelled:
+        raise CommandCancelledException(args)
+
+    source = _Stdin(args.input)
+    try:
+        if args.streaming:
+            return _execmdStreaming(args, result, scope, source)
+        return _execmd(args, result, scope, source)
+    finally:
+        source.close()
+
+
+def _execmd(args: "CommandExecutionArgs", result: CommandExecutionResult, scope: ProcessScope | None, source: _Stdin):
+    tic = timer()
+    with subprocess.Popen(args=args.cmds, env=args.env, cwd=args.cwd, shell=args.shell,
+                          stdin=source.stdin,
+                          stdout=subprocess.PIPE if args.pipe else None,
+                          stderr=subprocess.PIPE if args.pipe else None) as process:
+        if scope is not None:
+            scope.add(process)
+        writer = None
+        if process.stdin is not None:
+            # write in a thread to stream input, and let communicate only collect output
+            stdin, process.stdin = process.stdin, None
+            writer = threading.Thread(
+                target=source.write, args=(stdin,), daemon=True)
+            writer.start()
+        try:
+            stdout, stderr = process.communicate(
+                timeout=args.timeout.total_seconds() if args.timeout else None)
+            result.code = process.returncode
+        except subprocess.TimeoutExpired:
+            process.kill()
+            stdout, stderr = process.communicate()
+        except:
+            process.kill()
+            raise
+        finally:
+            if scope is not None:
+                scope.discard(process)
+            if writer is not None:
+                writer.join()
+        result.stdout = _decode(stdout, args.binary)
+        result.stderr = _decode(stderr, args.binary)
+
+    result.duration = timedelta(seconds=timer()-tic)
+    logger.info(f"Executed command: {args} -> {result}")
+    return result
+
+
+def _execmdStreaming(args: "CommandExecutionArgs", result: CommandExecutionResult, scope: ProcessScope | None, source: _Stdin):
+    tic = timer()
+    output = OutputTail(args)
+    try:
+        with subprocess.Popen(args=args.cmds, env=args.env, cwd=args.cwd, shell=args.shell,
+                              stdin=source.stdin,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+            if scope is not None:
+                scope.add(process)
+            try:
+                _streamcmd(args, process, result, output, source)
+            except:
+                process.kill()
+                raise
+            finally:
+                if scope is not None:
+                    scope.discard(process)
+    finally:
+        output.close()
+    result.stdout = output.text("stdout")
+    result.stderr = output.text("stderr")
+
+    result.duration = timedelta(seconds=timer()-tic)
+    logger.info(f"Executed command: {args} -> {result}")
+    return result
+
+
+def _text(data: bytes | None) -> str:
+    # the same as text mode of subprocess (universal newlines)
+    if not data:
+        return ""
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+async def _spawn(args: "CommandExecutionArgs", stdin: Any, stdout: Any, stderr: Any) -> asyncio.subprocess.Process:
+    options = dict(env=args.env, cwd=args.cwd,
+                   stdin=stdin, stdout=stdout, stderr=stderr)
+    if not args.shell:
+        return await asyncio.create_subprocess_exec(*args.cmds, **options)
+    # same command line as subprocess.Popen(shell=True) with a list
+    if os.name == "nt":
+        return await asyncio.create_subprocess_shell(subprocess.list2cmdline(args.cmds), **options)
+    return await asyncio.create_subprocess_exec("/bin/sh", "-c", *args.cmds, **options)
+
+
+async def _communicate(args: "CommandExecutionArgs", process: asyncio.subprocess.Process, output: OutputTail | None, source: _Stdin) -> tuple[str | bytes, str | bytes]:
+    # write input separately to stream it, and let communicate only collect output
+    stdin, process.stdin = process.stdin, None
+    write = source.writeAsync(stdin) if stdin is not None else asyncio.sleep(0)
+
+    if output is None:
+        _, (stdout, stderr) = await asyncio.gather(write, process.communicate())
+        return _decode(stdout, args.binary), _decode(stderr, args.binary)
+
+    async def pump(name: str, source: asyncio.StreamReader):
+        while True:
+            data = await source.read(_CHUNK)
+            for line in output.feed(name, data):
+                if args.callback is not None:
+                    ret = args.callback(name, line)
+                    if inspect.isawaitable(ret):
+                        await ret
+            if not data:
+                break
+
+    await asyncio.gather(write, pump("stdout", process.stdout), pump("stderr", process.stderr))
+    await process.wait()
+    return output.text("stdout"), output.text("stderr")
+
+
+async def execmdAsync(args: "CommandExecutionArgs"):
+    """Execute command asynchronously and get result."""
+    logger.debug(f"Execute command asynchronously: {args}")
+
+    result = CommandExecutionResult(args)
+
+    scope = processScope.get()
+    if scope is not None and scope.cancelled:
+        raise CommandCancelledException(args)
+
     tic = timer()
+    source = _Stdin(args.input, asynchronous=True)
+    output = OutputTail(args) if args.streaming else None
+    try:
+        piped = subprocess.PIPE if args.pipe or args.streaming else None
+        process = await _spawn(args, source.stdin, piped, piped)
+    except:
+        source.close()
+        if output is not None:
+            output.close()
+        raise
+    if scope is not None:
+        scope.add(process)
+    # shielded, so that output is still collected after killing on timeout
+    communicate = asyncio.ensure_future(
+        _communicate(args, process, output, source))
     try:
-        subresult = subprocess.run(args=args.cmds, env=args.env, cwd=args.cwd, encoding="utf-8", text=True, input=args.input, shell=args.shell,
-                                   timeout=args.timeout.total_seconds() if args.timeout else None, capture_output=args.pipe)
-        result.code = subresult.returncode
-        result.stdout = subresult.stdout or ""
-        result.stderr = subresult.stderr or ""
-    except subprocess.TimeoutExpired as te:
-        result.stdout = te.stdout or ""
-        result.stderr = te.stderr or ""
+        try:
+            stdout, stderr = await asyncio.wait_for(asyncio.shield(communicate), args.timeout.total_seconds() if args.timeout else None)
+            result.code = process.returncode
+        except asyncio.TimeoutError:
+            process.kill()
+            stdout, stderr = await communicate
+    except:
+        if process.returncode is None:
+            process.kill()
+        communicate.cancel()
+        # reap the process, so that its transport is closed
+        try:
+            await process.wait()
+        except asyncio.CancelledError:
+            pass
+        raise
+    finally:
+        if scope is not None:
+            scope.discard(process)
+        source.close()
+        if output is not None:
+            output.close()
+    result.stdout = stdout
+    result.stderr = stderr
 
     result.duration = timedelta(seconds=timer()-tic)
     logger.info(f"Executed command: {args} -> {result}")
@@ -93,12 +508,25 @@ class CommandExecutionArgs:
     """current working directory"""
     timeout: timedelta | None = None
     """maximum execution duration"""
-    input: str | None = None
-    """text for stdin"""
+    input: Input | None = None
+    """stdin: text, bytes, a file path, a binary file, or an (async) iterable of bytes"""
     shell: bool = False
     """use system shell"""
     pipe: bool = False
     """pipe and collect stdout and stderr"""
+    callback: Callable[[str, str], Any] | None = None
+    """callback(stream name, line) for each line of stdout and stderr as they arrive (may be a coroutine function in async runs)"""
+    tee: pathlib.Path | None = None
+    """file to write the full output of stdout and stderr"""
+    tail: int = 100
+    """number of last lines of each stream kept in the result when streaming"""
+    binary: bool = False
+    """do not decode output, stdout, stderr and streamed lines are bytes"""
+
+    @property
+    def streaming(self) -> bool:
+        """Return if output is streamed (to the callback or the tee file) instead of being collected in whole."""
+        return self.callback is not None or self.tee is not None
 
     def run(self, retry: int = 0, fail: bool = False) -> CommandExecutionResult:
         """
@@ -119,12 +547,396 @@ class CommandExecutionArgs:
             result.ensure()
         return result
 
+    async def runAsync(self, retry: int = 0, fail: bool = False) -> CommandExecutionResult:
+        """
+        Run command asynchronously, without blocking the event loop.
+
+        retry: the number of times to retry when failing
+        fail: do not raise exception when the final result fails
+        """
+
+        result = await execmdAsync(self)
+        if not result:
+            for i in range(retry):
+                logger.info(f"Retry ({i+1}/{retry}) execute command: {self}")
+                result = await execmdAsync(self)
+                if result:
+                    break
+        if not fail:
+            result.ensure()
+        return result
+
+    def __or__(self, other: "CommandExecutionArgs | CommandPipeline") -> "CommandPipeline":
+        return CommandPipeline([self]) | other
+
+    def stream(self, retry: int = 0, fail: bool = False) -> "CommandOutputStream":
+        """
+        Run command asynchronously, and iterate lines of stdout and stderr as they arrive.
+
+        retry: the number of times to retry when failing
+        fail: do not raise exception when the final result fails
+        """
+        return CommandOutputStream(self, retry, fail)
+
+
+@dataclass
+class CommandPipelineResult:
+    """Result for command pipeline execution."""
+    pipeline: "CommandPipeline"
+    """the pipeline"""
+    results: list[CommandExecutionResult] = field(default_factory=list)
+    """results of stages, stdout is only collected for the last stage"""
+    duration: timedelta = field(default_factory=timedelta)
+    """execution duration"""
+
+    @property
+    def codes(self) -> list[int | None]:
+        """Exit codes of stages, None for timeout."""
+        return [result.code for result in self.results]
+
+    @property
+    def timeout(self) -> bool:
+        """Return if execution timeout."""
+        return any(result.timeout for result in self.results)
+
+    @property
+    def stdout(self) -> str:
+        """stdout of the last stage in text (if pipe)"""
+        return self.results[-1].stdout
+
+    def __bool__(self):
+        return all(self.results)
+
+    @property
+    def description(self):
+        """Return result's description string."""
+        return "🟢 SUCCESS" if self else ("🟡 TIMEOUT" if self.timeout else f"🔴 FAILING({self.codes})")
+
+    def ensure(self):
+        """Raise for the first failing stage."""
+        for result in self.results:
+            result.ensure()
+
+
+def _closeAll(fds: list[int]) -> None:
+    for fd in fds:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+def execpipe(pipeline: "CommandPipeline") -> CommandPipelineResult:
+    """Execute command pipeline and get result."""
+    logger.debug(f"Execute command pipeline: {pipeline}")
+
+    stages = pipeline.stages
+    result = CommandPipelineResult(
+        pipeline, [CommandExecutionResult(args) for args in stages])
+
+    scope = processScope.get()
+    if scope is not None and scope.cancelled:
+        raise CommandCancelledException(stages[0])
+
+    tic = timer()
+    processes: list[subprocess.Popen] = []
+    collected: dict[tuple[int, str], bytes] = {}
+
+    def collect(key: tuple[int, str], source):
+        collected[key] = source.read()
+
+    source = _Stdin(stages[0].input)
+    threads: list[threading.Thread] = []
+    try:
+        stdin = source.stdin
+        for i, args in enumerate(stages):
+            last = i == len(stages) - 1
+            read, stdout = (None, subprocess.PIPE if args.pipe else None) if last else os.pipe()
+            try:
+                process = subprocess.Popen(args=args.cmds, env=args.env, cwd=args.cwd, shell=args.shell,
+                                           stdin=stdin, stdout=stdout,
+                                           stderr=subprocess.PIPE if args.pipe else None)
+            except:
+                _closeAll([read] if read is not None else [])
+                raise
+            finally:
+                # the parent keeps no pipe ends between stages, so that a stage sees EOF or SIGPIPE when its neighbour exits
+                _closeAll(([stdin] if i > 0 else []) +
+                          ([stdout] if read is not None else []))
+            processes.append(process)
+            if scope is not None:
+                scope.add(process)
+            stdin = read
+
+        if processes[0].stdin is not None:
+            threads.append(threading.Thread(
+                target=source.write, args=(processes[0].stdin,), daemon=True))
+        for i, process in enumerate(processes):
+            if process.stderr is not None:
+                threads.append(threading.Thread(target=collect, args=(
+                    (i, "stderr"), process.stderr), daemon=True))
+        if processes[-1].stdout is not None:
+            threads.append(threading.Thread(target=collect, args=(
+                (len(processes) - 1, "stdout"), processes[-1].stdout), daemon=True))
+        for thread in threads:
+            thread.start()
+
+        timeout = pipeline.effectiveTimeout
+        deadline = None if timeout is None else timer() + timeout.total_seconds()
+        try:
+            for process, stage in zip(processes, result.results):
+                stage.code = process.wait(
+                    None if deadline is None else max(deadline - timer(), 0))
+        except subprocess.TimeoutExpired:
+            for process, stage in zip(processes, result.results):
+                if stage.code is None and process.poll() is None:
+                    process.kill()
+                    process.wait()
+                else:
+                    stage.code = process.returncode
+        for thread in threads:
+            thread.join()
+    except:
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+        raise
+    finally:
+        source.close()
+        for process in processes:
+            if scope is not None:
+                scope.discard(process)
+            for file in (process.stdin, process.stdout, process.stderr):
+                if file is not None:
+                    try:
+                        file.close()
+                    except OSError:
+                        pass
+
+    duration = timedelta(seconds=timer()-tic)
+    for i, (args, stage) in enumerate(zip(stages, result.results)):
+        stage.duration = duration
+        stage.stdout = _decode(collected.get((i, "stdout")), args.binary)
+        stage.stderr = _decode(collected.get((i, "stderr")), args.binary)
+    result.duration = duration
+    logger.info(f"Executed command pipeline: {pipeline} -> {result}")
+    return result
+
+
+async def execpipeAsync(pipeline: "CommandPipeline") -> CommandPipelineResult:
+    """Execute command pipeline asynchronously and get result."""
+    logger.debug(f"Execute command pipeline asynchronously: {pipeline}")
+
+    stages = pipeline.stages
+    result = CommandPipelineResult(
+        pipeline, [CommandExecutionResult(args) for args in stages])
+
+    scope = processScope.get()
+    if scope is not None and scope.cancelled:
+        raise CommandCancelledException(stages[0])
+
+    tic = timer()
+    processes: list[asyncio.subprocess.Process] = []
+
+    source = _Stdin(stages[0].input, asynchronous=True)
+
+    async def collect(pipe: asyncio.StreamReader | None) -> bytes | None:
+        return await pipe.read() if pipe is not None else None
+
+    async def communicate() -> list[tuple[bytes | None, bytes | None]]:
+        io = [] if processes[0].stdin is None else [
+            source.writeAsync(processes[0].stdin)]
+        outputs = await asyncio.gather(*[collect(process.stderr) for process in processes],
+                                       collect(processes[-1].stdout), *io)
+        await asyncio.gather(*[process.wait() for process in processes])
+        stderrs, stdout = outputs[:len(processes)], outputs[len(processes)]
+        return [(None, stderr) for stderr in stderrs[:-1]] + [(stdout, stderrs[-1])]
+
+    running = None
+    try:
+        stdin = source.stdin
+        for i, args in enumerate(stages):
+            last = i == len(stages) - 1
+            read, stdout = (None, subprocess.PIPE if args.pipe else None) if last else os.pipe()
+            try:
+                process = await _spawn(args, stdin, stdout, subprocess.PIPE if args.pipe else None)
+            except:
+                _closeAll([read] if read is not None else [])
+                raise
+            finally:
+                _closeAll(([stdin] if i > 0 else []) +
+                          ([stdout] if read is not None else []))
+            processes.append(process)
+            if scope is not None:
+                scope.add(process)
+            stdin = read
+
+        timeout = pipeline.effectiveTimeout
+        # shielded, so that output is still collected after killing on timeout
+        running = asyncio.ensure_future(communicate())
+        killed = [False] * len(processes)
+        try:
+            outputs = await asyncio.wait_for(asyncio.shield(running), timeout.total_seconds() if timeout else None)
+        except asyncio.TimeoutError:
+            killed = [process.returncode is None for process in processes]
+            for process, kill in zip(processes, killed):
+                if kill:
+                    process.kill()
+            outputs = await running
+        for process, args, stage, kill, (stdout, stderr) in zip(processes, stages, result.results, killed, outputs):
+            stage.code = None if kill else process.returncode
+            stage.stdout = _decode(stdout, args.binary)
+            stage.stderr = _decode(stderr, args.binary)
+    except:
+        if running is not None:
+            running.cancel()
+        for process in processes:
+            if process.returncode is None:
+                process.kill()
+        # reap processes, so that their transports are closed
+        try:
+            await asyncio.gather(*[process.wait() for process in processes])
+        except asyncio.CancelledError:
+            pass
+        raise
+    finally:
+        source.close()
+        for process in processes:
+            if scope is not None:
+                scope.discard(process)
+
+    duration = timedelta(seconds=timer()-tic)
+    for stage in result.results:
+        stage.duration = duration
+    result.duration = duration
+    logger.info(f"Executed command pipeline: {pipeline} -> {result}")
+    return result
+
+
+@dataclass
+class CommandPipeline:
+    """
+    Commands connected by OS pipes like `cmd1 | cmd2 | cmd3`, stdout of a stage is the stdin of the next stage.
+
+    Data flows between processes directly. `input` of the first stage is written to its stdin,
+    `pipe` of the last stage collects its stdout, and `pipe` of any stage collects its stderr.
+    """
+    stages: list[CommandExecutionArgs]
+    """commands in order"""
+    timeout: timedelta | None = None
+    """maximum execution duration of the whole pipeline, default to the shortest timeout of stages"""
+
+    @property
+    def effectiveTimeout(self) -> timedelta | None:
+        timeouts = [args.timeout for args in self.stages if args.timeout is not None]
+        if self.timeout is not None:
+            timeouts.append(self.timeout)
+        return min(timeouts, default=None)
+
+    def __or__(self, other: "CommandExecutionArgs | CommandPipeline") -> "CommandPipeline":
+        stages = other.stages if isinstance(other, CommandPipeline) else [other]
+        return CommandPipeline([*self.stages, *stages], self.timeout)
+
+    def __str__(self) -> str:
+        return " | ".join(" ".join(args.cmds) for args in self.stages)
+
+    def run(self, retry: int = 0, fail: bool = False) -> CommandPipelineResult:
+        """
+        Run command pipeline, it fails if any stage fails.
+
+        retry: the number of times to retry when failing
+        fail: do not raise exception when the final result fails
+        """
+
+        result = execpipe(self)
+        if not result:
+            for i in range(retry):
+                logger.info(f"Retry ({i+1}/{retry}) execute command pipeline: {self}")
+                result = execpipe(self)
+                if result:
+                    break
+        if not fail:
+            result.ensure()
+        return result
+
+    async def runAsync(self, retry: int = 0, fail: bool = False) -> CommandPipelineResult:
+        """
+        Run command pipeline asynchronously, it fails if any stage fails.
+
+        retry: the number of times to retry when failing
+        fail: do not raise exception when the final result fails
+        """
+
+        result = await execpipeAsync(self)
+        if not result:
+            for i in range(retry):
+                logger.info(f"Retry ({i+1}/{retry}) execute command pipeline: {self}")
+                result = await execpipeAsync(self)
+                if result:
+                    break
+        if not fail:
+            result.ensure()
+        return result
+
+
+class CommandOutputStream:
+    """Asynchronous iterator of (stream name, line) output of a running command, the result is available after iteration."""
+
+    def __init__(self, args: CommandExecutionArgs, retry: int = 0, fail: bool = False, buffer: int = 1024) -> None:
+        self.args = args
+        self.retry = retry
+        self.fail = fail
+        self.buffer = buffer
+        self.result: CommandExecutionResult | None = None
+
+    def __aiter__(self) -> AsyncIterator[tuple[str, str]]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[tuple[str, str]]:
+        # bounded, so that a slow consumer pauses reading from the command
+        queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue(self.buffer)
+        callback = self.args.callback
+
+        async def forward(name: str, line: str):
+            if callback is not None:
+                ret = callback(name, line)
+                if inspect.isawaitable(ret):
+                    await ret
+            await queue.put((name, line))
+
+        args = dataclasses.replace(self.args, callback=forward)
+        running = asyncio.ensure_future(
+            args.runAsync(retry=self.retry, fail=True))
+        try:
+            while True:
+                get = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({get, running}, return_when=asyncio.FIRST_COMPLETED)
+                if get not in done:
+                    get.cancel()
+                    break
+                yield get.result()
+            while not queue.empty():
+                yield queue.get_nowait()
+            self.result = running.result()
+        finally:
+            if not running.done():
+                running.cancel()
+                try:
+                    await running
+                except asyncio.CancelledError:
+                    pass
+        if not self.fail:
+            self.result.ensure()
+
 
 def run(cmds: list[str], env: dict[str, str] | None = None,
         cwd: pathlib.Path | None = None, timeout: timedelta | None = None,
-        input: str | None = None,
+        input: Input | None = None,
         shell: bool = False, pipe: bool = False,
-        retry: int = 0, fail: bool = False) -> CommandExecutionResult:
+        retry: int = 0, fail: bool = False,
+        callback: Callable[[str, str], Any] | None = None,
+        tee: pathlib.Path | None = None, tail: int = 100,
+        binary: bool = False) -> CommandExecutionResult:
     """
     Run command.
 
@@ -132,10 +944,165 @@ def run(cmds: list[str], env: dict[str, str] | None = None,
     env: environ
     cwd: current working directory
     timeout: maximum execution duration
-    input: text for stdin
+    input: stdin: text, bytes, a file path, a binary file, or an iterable of bytes
     shell: use system shell
     pipe: pipe and collect stdout and stderr
     retry: the number of times to retry when failing
     fail: do not raise exception when the final result fails
+    callback: callback(stream name, line) for each output line as they arrive, called in reader threads
+    tee: file to write the full output
+    tail: number of last lines of each stream kept in the result when streaming
+    binary: do not decode output, stdout, stderr and streamed lines are bytes
+    """
+    return CommandExecutionArgs(cmds, env, cwd, timeout, input, shell, pipe, callback, tee, tail, binary).run(retry=retry, fail=fail)
+
+
+async def runAsync(cmds: list[str], env: dict[str, str] | None = None,
+                   cwd: pathlib.Path | None = None, timeout: timedelta | None = None,
+                   input: Input | None = None,
+                   shell: bool = False, pipe: bool = False,
+                   retry: int = 0, fail: bool = False,
+                   callback: Callable[[str, str], Any] | None = None,
+                   tee: pathlib.Path | None = None, tail: int = 100,
+                   binary: bool = False) -> CommandExecutionResult:
     """
-    return CommandExecutionArgs(cmds, env, cwd, timeout, input, shell, pipe).run(retry=retry, fail=fail)
+    Run command asynchronously, the same arguments as run, input may be an async iterable of bytes, and callback may be a coroutine function.
+    """
+    return await CommandExecutionArgs(cmds, env, cwd, timeout, input, shell, pipe, callback, tee, tail, binary).runAsync(retry=retry, fail=fail)
+
+
+def _argmax(env: dict[str, str] | None) -> int:
+    """Get the maximum size of arguments for a new process, excluding the environ."""
+    if os.name == "nt":
+        # limit of command line in characters
+        return 32767 - 2048
+    try:
+        limit = os.sysconf("SC_ARG_MAX")
+    except (ValueError, OSError):
+        limit = 1 << 17
+    environ = os.environ if env is None else env
+    used = sum(len(k.encode()) + len(v.encode()) + 2 + 8 for k, v in environ.items())
+    # keep a margin for the loader and auxiliary vectors
+    return max(limit - used - 4096, 4096)
+
+
+def _argsize(arg: str) -> int:
+    if os.name == "nt":
+        return len(arg) + 3
+    return len(arg.encode()) + 1 + 8
+
+
+def chunked(args: CommandExecutionArgs, items: Iterable[str], size: int | None = None) -> list[CommandExecutionArgs]:
+    """
+    Split items into commands, each appends a chunk of items to the command, and fits in the OS limit of arguments (ARG_MAX).
+
+    args: command to append items to
+    items: arguments to split, such as file names
+    size: maximum number of items in a chunk
+    """
+    limit = _argmax(args.env) - sum(_argsize(arg) for arg in args.cmds)
+    result: list[CommandExecutionArgs] = []
+    chunk: list[str] = []
+    used = 0
+    for item in items:
+        cost = _argsize(item)
+        if chunk and (used + cost > limit or (size is not None and len(chunk) >= size)):
+            result.append(dataclasses.replace(args, cmds=args.cmds + chunk))
+            chunk, used = [], 0
+        chunk.append(item)
+        used += cost
+    if chunk:
+        result.append(dataclasses.replace(args, cmds=args.cmds + chunk))
+    return result
+
+
+def _ensureMany(results: list[CommandExecutionResult | None], first: CommandExecutionResult | None = None) -> None:
+    failed = first or next(
+        (result for result in results if result is not None and not result), None)
+    if failed is not None:
+        raise CommandExecutionException(failed)
+
+
+def runMany(commands: Iterable[CommandExecutionArgs], jobs: int | None = None, failFast: bool = False,
+            retry: int = 0, fail: bool = False) -> list[CommandExecutionResult | None]:
+    """
+    Run commands concurrently, and get results in the same order.
+
+    commands: commands to run
+    jobs: maximum number of commands running concurrently, None for the number of CPUs
+    failFast: on the first failure, terminate running commands and skip the others (skipped commands have None results, terminated commands have their failing results)
+    retry: the number of times to retry when a command fails
+    fail: do not raise exception when some command fails, otherwise raise for the first failure (in order if not failFast)
+    """
+    commands = list(commands)
+    results: list[CommandExecutionResult | None] = [None] * len(commands)
+    if not commands:
+        return results
+
+    scope = ProcessScope(processScope.get())
+    first: CommandExecutionResult | None = None
+
+    def work(args: CommandExecutionArgs) -> CommandExecutionResult | None:
+        if scope.cancelled:
+            return None
+        processScope.set(scope)
+        try:
+            return args.run(retry=retry, fail=True)
+        except CommandCancelledException:
+            return None
+
+    with concurrent.futures.ThreadPoolExecutor(min(jobs or os.cpu_count() or 1, len(commands)), thread_name_prefix="coxbuild-run") as executor:
+        futures = {executor.submit(contextvars.copy_context().run, work, args): i
+                   for i, args in enumerate(commands)}
+        for future in concurrent.futures.as_completed(futures):
+            result = results[futures[future]] = future.result()
+            if failFast and result is not None and not result and first is None:
+                logger.info(
+                    f"Command failed, cancel other commands: {result.args}")
+                first = result
+                scope.cancel()
+
+    if not fail:
+        _ensureMany(results, first)
+    return results
+
+
+async def runManyAsync(commands: Iterable[CommandExecutionArgs], jobs: int | None = None, failFast: bool = False,
+                       retry: int = 0, fail: bool = False) -> list[CommandExecutionResult | None]:
+    """
+    Run commands concurrently and asynchronously, the same arguments as runMany.
+    """
+    commands = list(commands)
+    results: list[CommandExecutionResult | None] = [None] * len(commands)
+    semaphore = asyncio.Semaphore(jobs or os.cpu_count() or 1)
+    scope = ProcessScope(processScope.get())
+    first: CommandExecutionResult | None = None
+
+    async def work(i: int, args: CommandExecutionArgs):
+        nonlocal first
+        async with semaphore:
+            if scope.cancelled:
+                return
+            processScope.set(scope)
+            try:
+                result = results[i] = await args.runAsync(retry=retry, fail=True)
+            except CommandCancelledException:
+                return
+        if failFast and not result and first is None:
+            logger.info(
+                f"Command failed, cancel other commands: {result.args}")
+            first = result
+            scope.cancel()
+
+    tasks = [asyncio.ensure_future(work(i, args))
+             for i, args in enumerate(commands)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if not fail:
+        _ensureMany(results, first)
+    return results
@@ -1,6 +1,7 @@
 import asyncio
 import logging
 from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
 
 from coxbuild.configurations.builders import (ConfigurationBuilderCollection,
                                               getDefaultBuilder)
@@ -12,6 +13,9 @@ from .runtime import ExecutionState
 from .services import Service
 from .tasks import Task
 
+if TYPE_CHECKING:
+    from .plans import Plan
+
 logger = logging.getLogger("managers")
 
 
@@ -62,8 +66,7 @@ class Manager:
                 pipeline.hook(ph)
             logger.debug(f"Imported extension: {ext.name}({ext.uri})")
 
-    async def executeAsync(self, *tasks: str) -> PipelineResult:
-        """Execute tasks asynchronously."""
+    def _prepare(self) -> tuple[Pipeline, Configuration]:
         from coxbuild.extensions import builtin
         from coxbuild.extensions.loader import fromModule
 
@@ -81,6 +84,11 @@ class Manager:
 
         self._load(*self.extensions.values(), fromModule(builtin),
                    pipeline=pipeline, service=service)
+        return pipeline, config
+
+    async def executeAsync(self, *tasks: str) -> PipelineResult:
+        """Execute tasks asynchronously."""
+        pipeline, config = self._prepare()
         runner = pipeline(*(tasks or ["default"]))
         runner.context.config = config
         return await runner
@@ -88,3 +96,19 @@ class Manager:
     def execute(self, *tasks: str) -> PipelineResult:
         """Execute tasks."""
         return asyncio.run(self.executeAsync(*tasks))
+
+    async def planAsync(self, *tasks: str, preconditions: bool = False, jobs: int | None = None) -> "Plan":
+        """
+        Build execution plan of tasks asynchronously, without running them.
+
+        preconditions: evaluate up-to-date checking and preconditions
+        jobs: maximum jobs to simulate
+        """
+        from .plans import plan
+
+        pipeline, config = self._prepare()
+        return await plan(pipeline, *(tasks or ["default"]), config=config, preconditions=preconditions, jobs=jobs)
+
+    def plan(self, *tasks: str, preconditions: bool = False, jobs: int | None = None) -> "Plan":
+        """Build execution plan of tasks, without running them."""
+        return asyncio.run(self.planAsync(*tasks, preconditions=preconditions, jobs=jobs))
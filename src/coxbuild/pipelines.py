@@ -1,3 +1,4 @@
+import asyncio
 import inspect
 import logging
 import sys
@@ -5,15 +6,15 @@ import traceback
 from dataclasses import asdict, dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
-from graphlib import TopologicalSorter
 from queue import Queue
 from typing import TYPE_CHECKING, Any, Awaitable, Callable
 
-from coxbuild.configurations import Configuration
+from coxbuild.configurations import Configuration, ConfigurationAccessor
 from coxbuild.hooks import Hook
-from coxbuild.runtime import ExecutionState
+from coxbuild.runtime import ExecutionState, currentTask
 
 from .exceptions import CoxbuildRuntimeException, CoxbuildSchemaException
+from .resources import ResourcePool, ResourceSettings
 from .runners import Runner
 from .tasks import Task, TaskContext, TaskHook, TaskResult
 
@@ -28,6 +29,40 @@ class PipelineRuntimeException(CoxbuildRuntimeException):
     pass
 
 
+class PipelineSettings(ConfigurationAccessor):
+    """Settings for pipeline execution."""
+    __configname__ = "pipeline"
+
+    @property
+    def jobs(self) -> int:
+        """Maximum number of tasks running concurrently, 1 for sequential execution."""
+        return max(int(self.get("jobs") or 1), 1)
+
+    @jobs.setter
+    def jobs(self, value: int) -> None:
+        self.config["jobs"] = value
+
+    @property
+    def failFast(self) -> bool:
+        """Cancel running tasks when a task fails, in concurrent execution."""
+        value = self.get("failFast")
+        return value is not None and str(value).lower() not in ("0", "false", "no", "off")
+
+    @failFast.setter
+    def failFast(self, value: bool) -> None:
+        self.config["failFast"] = value
+
+    @property
+    def history(self) -> bool:
+        """Record runs to history in the state directory, and prioritize tasks by recorded durations."""
+        value = self.get("history")
+        return value is not None and str(value).lower() not in ("0", "false", "no", "off")
+
+    @history.setter
+    def history(self, value: bool) -> None:
+        self.config["history"] = value
+
+
 @dataclass
 class PipelineContext:
     """Execution context for pipeline."""
@@ -50,6 +85,12 @@ class PipelineResult:
     """tasks in the pipeline"""
     exception: PipelineRuntimeException | None = None
     """exception when running"""
+    targets: list[str] = field(default_factory=list)
+    """requested task names"""
+    started: datetime | None = None
+    """start time"""
+    cputime: timedelta = field(default_factory=timedelta)
+    """CPU time of the process and its finished children during execution"""
 
     def __bool__(self):
         return self.exception is None and all((t for t in self.tasks if not t.task.continueOnError))
@@ -132,10 +173,42 @@ def afterTask(hook: Callable[[TaskContext, TaskResult], Awaitable | None] | Pipe
     return hook if isinstance(hook, PipelineAfterTaskHook) else PipelineAfterTaskHook(hook)
 
 
+def estimates(tasks: list[Task], config: Configuration | None = None) -> dict[str, float]:
+    """Estimate durations in seconds of tasks by history, 1 second for each task if history is disabled or unavailable."""
+    if PipelineSettings(config or Configuration()).history:
+        from coxbuild import history
+
+        try:
+            return history.store().estimates({task.name for task in tasks})
+        except Exception as ex:
+            logger.warning("Failed to load task history.", exc_info=ex)
+    return {}
+
+
+def priorities(tasks: list[Task], estimates: dict[str, float]) -> dict[Task, float]:
+    """
+    Get estimated duration of the longest path from each task to the end of the pipeline.
+
+    tasks: tasks in topological order
+    estimates: estimated durations in seconds by task name, default to 1 second
+    """
+    dependents: dict[Task, list[Task]] = {task: [] for task in tasks}
+    for task in tasks:
+        for dep in task.deps:
+            if dep in dependents:
+                dependents[dep].append(task)
+
+    result: dict[Task, float] = {}
+    for task in reversed(tasks):
+        result[task] = estimates.get(task.name, 1.0) + max(
+            (result[t] for t in dependents[task]), default=0)
+    return result
+
+
 class PipelineRunner(Runner):
     """Runner for pipeline."""
 
-    def __init__(self, pipeline: "Pipeline", tasks: list[Task], hooks: list[PipelineHook], unmatchedNames: list[str]) -> None:
+    def __init__(self, pipeline: "Pipeline", tasks: list[Task], hooks: list[PipelineHook], unmatchedNames: list[str], targets: list[str] | None = None) -> None:
         """
         Create runner.
 
@@ -143,9 +216,11 @@ class PipelineRunner(Runner):
         tasks: tasks in the pipeline
         hooks: hooks for pipeline
         unmatchedNames: not found task names
+        targets: requested task names
         """
         self.pipeline = pipeline
         self.tasks = tasks
+        self.targets = targets or []
         self.beforeTask = [beforeTask for beforeTask in hooks if isinstance(
             beforeTask, PipelineBeforeTaskHook)]
         self.afterTask = [afterTask for afterTask in hooks if isinstance(
@@ -202,16 +277,17 @@ class PipelineRunner(Runner):
             logger.error(f"Run pipeline after hook failed.", exc_info=ex)
             print(f"Run pipeline after hook failed: {ex}")
 
-    async def _run(self):
+    async def _runTask(self, index: int, task: Task) -> TaskResult | None:
+        """Run a task in the pipeline, return None if it is ignored."""
         n = len(self.tasks)
 
-        for i, task in enumerate(self.tasks):
-            logger.debug(f"Run task {i+1}({task.name}) of {n} tasks")
-            print(f"{'-'*15} ({i+1}/{n}) 📜 Task {task.name} {'-'*15}")
-            print("")
-
-            self._executionState.task = task
+        logger.debug(f"Run task {index+1}({task.name}) of {n} tasks")
+        print(f"{'-'*15} ({index+1}/{n}) 📜 Task {task.name} {'-'*15}")
+        print("")
 
+        # concurrent tasks run in their own contexts, so they do not overwrite each other
+        token = currentTask.set(task)
+        try:
             runner = task()
             runner.context.config = self.context.config
 
@@ -220,26 +296,109 @@ class PipelineRunner(Runner):
                 message = f"Stop task {task.name} running by pipeline before hook"
                 logger.info(message)
                 print(message)
-                continue
+                return None
 
             res = await runner
 
             self._results.append(res)
 
             await self._afterTask(runner.context, res)
+        finally:
+            currentTask.reset(token)
 
-            self._executionState.task = None
+        if not res:
+            if task.continueOnError:
+                message = f"Task {task.name} failed, but continue on error."
+                logger.error(message)
+                print(message)
+            print("")
 
-            if not res:
-                if task.continueOnError:
-                    message = f"Task {task.name} failed, but continue on error."
-                    logger.error(message)
-                    print(message)
-                    print("")
-                else:
-                    print("")
+        return res
+
+    async def _runSequential(self):
+        for i, task in enumerate(self.tasks):
+            res = await self._runTask(i, task)
+            if res is not None and not res and not task.continueOnError:
+                break
+
+    def _priorities(self) -> dict[Task, float]:
+        """Prioritize tasks by estimated duration of the longest remaining path to targets."""
+        result = priorities(self.tasks, estimates(
+            self.tasks, self.context.config))
+
+        logger.info("Task priorities: " + ", ".join(
+            f"{task.name}={result[task]:.3f}" for task in sorted(self.tasks, key=lambda t: -result[t])))
+        return result
+
+    def _cancel(self, running: dict[asyncio.Future, Task]):
+        for future, task in running.items():
+            if task.continueOnError:
+                continue
+            message = f"Cancel task {task.name} (fail fast)."
+            logger.info(message)
+            print(message)
+            future.cancel()
+
+    async def _runConcurrent(self, jobs: int):
+        from graphlib import TopologicalSorter
+
+        failFast = PipelineSettings(self.context.config).failFast
+        pool = ResourcePool(ResourceSettings(self.context.config))
+        index = {task: i for i, task in enumerate(self.tasks)}
+        priorities = self._priorities()
+        sorter = TopologicalSorter({task: set(task.deps) for task in self.tasks})
+        sorter.prepare()
+
+        ready: list[Task] = []
+        running: dict[asyncio.Future, Task] = {}
+        stopped = False
+
+        try:
+            while sorter.is_active():
+                if not stopped:
+                    ready.extend(sorter.get_ready())
+                    ready.sort(key=lambda t: (-priorities[t], index[t]))
+                    while len(running) < jobs:
+                        task = next(
+                            (t for t in ready if pool.tryAcquire(t.resources)), None)
+                        if task is None:
+                            break
+                        ready.remove(task)
+                        running[asyncio.ensure_future(
+                            self._runTask(index[task], task))] = task
+
+                if not running:
                     break
 
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    pool.release(task.resources)
+                    sorter.done(task)
+                    if future.cancelled():
+                        continue
+                    res = future.result()
+                    if res is not None and not res and not task.continueOnError and not stopped:
+                        logger.info(
+                            f"Stop scheduling new tasks since task {task.name} failed.")
+                        stopped = True
+                        if failFast:
+                            self._cancel(running)
+        finally:
+            for future in running:
+                future.cancel()
+
+        self._results.sort(key=lambda r: index[r.task])
+
+    async def _run(self):
+        jobs = PipelineSettings(self.context.config).jobs
+        if jobs > 1:
+            logger.debug(f"Run pipeline concurrently with {jobs} jobs")
+            await self._runConcurrent(jobs)
+        else:
+            await self._runSequential()
+
     async def __aenter__(self) -> Callable[[], Awaitable | None]:
         logger.debug(f"Running pipeline: {self.tasks}")
         print(f"{'-'*20} ⌛ Running 🕰️ {datetime.now()} {'-'*20}")
@@ -271,7 +430,8 @@ class PipelineRunner(Runner):
         exception = None if self.exc_value is None else PipelineRuntimeException(
             f"Failed to run pipeline", cause=self.exc_value)
         self.result = PipelineResult(
-            duration=self.duration, tasks=self._results, exception=exception)
+            duration=self.duration, tasks=self._results, exception=exception,
+            targets=self.targets, started=self.started, cputime=self.cputime)
 
         if self.exc_value is not None:
             logger.error("Task execute exception.", exc_info=self.exc_value)
@@ -280,6 +440,19 @@ class PipelineRunner(Runner):
 
         await self._after()
 
+        remote = sys.modules.get("coxbuild.cache.remote")
+        if remote is not None:
+            # flush background uploads, only when the remote cache has been used
+            await asyncio.get_running_loop().run_in_executor(None, remote.closeAll)
+
+        if PipelineSettings(self.context.config).history:
+            from coxbuild import history
+
+            try:
+                history.store().record(self.result)
+            except Exception as ex:
+                logger.warning("Failed to record task history.", exc_info=ex)
+
         logger.info(f"Finish pipeline: {self.result}")
 
         print(
@@ -359,14 +532,15 @@ class Pipeline:
         self.hook(hook)
         return hook
 
-    def __call__(self, *args: str | Task, **kwds: Any):
+    def resolve(self, *args: str | Task) -> tuple[list[Task], list[str]]:
         """
-        Build runner of pipeline.
+        Resolve tasks to run in topological order, and not found task names.
 
         args: list of tasks or task names
         """
+        from graphlib import TopologicalSorter
 
-        logger.debug(f"Build pipeline by {args}.")
+        logger.debug(f"Resolve pipeline by {args}.")
 
         unmatchedNames = []
 
@@ -407,4 +581,15 @@ class Pipeline:
 
         logger.debug(f"Tasks to run: {', '.join((t.name for t in tasks))}")
 
-        return PipelineRunner(self, tasks, self.hooks, unmatchedNames)
+        return tasks, unmatchedNames
+
+    def __call__(self, *args: str | Task, **kwds: Any):
+        """
+        Build runner of pipeline.
+
+        args: list of tasks or task names
+        """
+
+        tasks, unmatchedNames = self.resolve(*args)
+
+        return PipelineRunner(self, tasks, self.hooks, unmatchedNames, [t if isinstance(t, str) else t.name for t in args])
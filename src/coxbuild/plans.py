@@ -0,0 +1,171 @@
+import asyncio
+import heapq
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import timedelta
+from graphlib import TopologicalSorter
+
+from coxbuild.configurations import Configuration
+
+from .executors import threadPool
+from .pipelines import Pipeline, PipelineSettings, estimates, priorities
+from .resources import ResourcePool, ResourceSettings
+from .tasks import Task
+
+logger = logging.getLogger("plans")
+
+
+@dataclass
+class Simulation:
+    """Simulated execution with a number of concurrent jobs."""
+    jobs: int
+    """maximum number of tasks running concurrently"""
+    duration: timedelta
+    """estimated wall time"""
+    criticalPath: list[Task] = field(default_factory=list)
+    """tasks determining the wall time, in execution order"""
+
+
+@dataclass
+class Plan:
+    """Execution plan for a pipeline, without running tasks."""
+    tasks: list[Task]
+    """tasks to run in topological order"""
+    unmatchedNames: list[str] = field(default_factory=list)
+    """not found task names"""
+    waves: list[list[Task]] = field(default_factory=list)
+    """groups of tasks whose dependencies are all in former groups"""
+    estimates: dict[str, float] = field(default_factory=dict)
+    """estimated durations in seconds by task name"""
+    skipped: list[Task] = field(default_factory=list)
+    """tasks which would be skipped by up-to-date checking or preconditions"""
+    simulations: list[Simulation] = field(default_factory=list)
+    """simulations from 1 job to the maximum jobs"""
+
+    def __bool__(self):
+        return not self.unmatchedNames
+
+    def report(self) -> str:
+        """Format the plan."""
+        lines = [f"{'-'*20} 📐 Plan {'-'*20}"]
+        if self.unmatchedNames:
+            lines.append(f"Not found task names: {self.unmatchedNames}")
+        for i, wave in enumerate(self.waves):
+            lines.append(f"Wave {i+1}: " + ", ".join(
+                f"{task.name} ({'skipped' if task in self.skipped else f'~{self.estimates.get(task.name, 1.0):.2f}s'})" for task in wave))
+        lines.append("")
+        lines.append("Jobs\tWall time\tCritical path")
+        for simulation in self.simulations:
+            lines.append(f"{simulation.jobs}\t{simulation.duration}\t" + " → ".join(
+                task.name for task in simulation.criticalPath))
+        return "\n".join(lines)
+
+
+def waves(tasks: list[Task]) -> list[list[Task]]:
+    """Group tasks into waves, each wave only depends on former waves."""
+    sorter = TopologicalSorter(
+        {task: {dep for dep in task.deps if dep in tasks} for task in tasks})
+    sorter.prepare()
+    result: list[list[Task]] = []
+    while sorter.is_active():
+        wave = sorted(sorter.get_ready(), key=tasks.index)
+        result.append(wave)
+        sorter.done(*wave)
+    return result
+
+
+def simulate(tasks: list[Task], durations: dict[str, float], jobs: int, config: Configuration | None = None) -> Simulation:
+    """
+    Simulate concurrent execution in the same way as the pipeline scheduler.
+
+    tasks: tasks in topological order
+    durations: durations in seconds by task name
+    jobs: maximum number of tasks running concurrently
+    config: configuration for resource capacities
+    """
+    index = {task: i for i, task in enumerate(tasks)}
+    prior = priorities(tasks, durations)
+    pool = ResourcePool(ResourceSettings(config or Configuration()))
+    sorter = TopologicalSorter(
+        {task: {dep for dep in task.deps if dep in index} for task in tasks})
+    sorter.prepare()
+
+    ready: list[Task] = []
+    running: list[tuple[float, int, Task]] = []
+    blockers: dict[Task, Task | None] = {}
+    finished: dict[Task, float] = {}
+    now = 0.0
+    last: Task | None = None
+
+    while sorter.is_active():
+        ready.extend(sorter.get_ready())
+        ready.sort(key=lambda t: (-prior[t], index[t]))
+        while len(running) < jobs:
+            task = next(
+                (t for t in ready if pool.tryAcquire(t.resources)), None)
+            if task is None:
+                break
+            ready.remove(task)
+            # prefer the longest dependency finished just now, otherwise the task released the slot
+            deps = [dep for dep in task.deps if finished.get(dep) == now]
+            blockers[task] = max(deps, key=lambda d: durations.get(
+                d.name, 1.0)) if deps else last
+            heapq.heappush(
+                running, (now + durations.get(task.name, 1.0), index[task], task))
+
+        if not running:
+            break
+
+        now, _, last = heapq.heappop(running)
+        finished[last] = now
+        pool.release(last.resources)
+        sorter.done(last)
+
+    path: list[Task] = []
+    while last is not None:
+        path.append(last)
+        last = blockers[last]
+    path.reverse()
+
+    return Simulation(jobs, timedelta(seconds=now), path)
+
+
+async def plan(pipeline: Pipeline, *targets: str | Task, config: Configuration | None = None, preconditions: bool = False, jobs: int | None = None) -> Plan:
+    """
+    Build execution plan without running tasks.
+
+    pipeline: pipeline
+    targets: list of tasks or task names
+    config: configuration
+    preconditions: evaluate up-to-date checking and preconditions (in parallel), skipped tasks are estimated as 0 second
+    jobs: maximum jobs to simulate, None to use pipeline:jobs (or the number of CPUs if it is 1)
+    """
+    config = config or Configuration()
+    tasks, unmatchedNames = pipeline.resolve(*targets)
+
+    durations = estimates(tasks, config)
+    durations = {task.name: durations.get(task.name, 1.0) for task in tasks}
+
+    skipped: list[Task] = []
+    if preconditions and tasks:
+        executor = threadPool(os.cpu_count() or 1)
+        runners = [task() for task in tasks]
+        for runner in runners:
+            runner.context.config = config
+        results = await asyncio.gather(*[runner.check(executor) for runner in runners], return_exceptions=True)
+        for task, result in zip(tasks, results):
+            if isinstance(result, BaseException):
+                logger.warning(
+                    f"Failed to check preconditions of task {task.name}.", exc_info=result)
+            elif not result:
+                skipped.append(task)
+                durations[task.name] = 0.0
+
+    if jobs is None:
+        jobs = PipelineSettings(config).jobs
+        if jobs == 1:
+            jobs = os.cpu_count() or 1
+
+    return Plan(tasks, unmatchedNames, waves(tasks), durations, skipped, [
+        simulate(tasks, durations, n, config) for n in range(1, max(jobs, 1) + 1)])
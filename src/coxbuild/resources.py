@@ -0,0 +1,102 @@
+import logging
+import os
+from typing import Any
+
+from coxbuild.configurations import ConfigurationAccessor
+from coxbuild.utils import parseSize
+
+logger = logging.getLogger("resources")
+
+Resources = dict[str, int]
+"""resource name -> amount"""
+
+
+def normalize(needs: dict[str, Any]) -> Resources:
+    """
+    Normalize resource needs of a task.
+
+    'mem' accepts sizes with a unit (e.g. '4G'), 'lock' accepts a name or a list of names,
+    each lock is an exclusive resource 'lock:{name}'.
+    """
+    result: Resources = {}
+    for name, value in needs.items():
+        name = name.lower()
+        if name == "lock":
+            for lock in [value] if isinstance(value, str) else value:
+                result[f"lock:{lock}"] = 1
+        elif name == "mem":
+            result[name] = parseSize(value)
+        else:
+            result[name] = int(value)
+    return result
+
+
+class ResourceSettings(ConfigurationAccessor):
+    """Capacities of resources for task scheduling."""
+    __configname__ = "resources"
+
+    def capacity(self, name: str) -> int | None:
+        """Get capacity of a resource, None for unlimited."""
+        if name.startswith("lock:"):
+            return 1
+        value = self.get(name)
+        if value is None:
+            if name == "cpu":
+                return os.cpu_count() or 1
+            return None
+        if name == "mem":
+            return parseSize(value)
+        return int(value)
+
+    @property
+    def cpu(self) -> int:
+        """Number of CPUs."""
+        return self.capacity("cpu")
+
+    @cpu.setter
+    def cpu(self, value: int) -> None:
+        self.config["cpu"] = value
+
+    @property
+    def mem(self) -> int | None:
+        """Size of memory, e.g. '16G'."""
+        return self.capacity("mem")
+
+    @mem.setter
+    def mem(self, value: int | str) -> None:
+        self.config["mem"] = value
+
+
+class ResourcePool:
+    """Counting semaphores for resources, acquired all-or-nothing."""
+
+    def __init__(self, settings: ResourceSettings) -> None:
+        self.settings = settings
+        self.used: Resources = {}
+
+    def _clamp(self, needs: Resources) -> Resources:
+        result: Resources = {}
+        for name, amount in needs.items():
+            capacity = self.settings.capacity(name)
+            if capacity is not None and amount > capacity:
+                logger.warning(
+                    f"Resource {name} request {amount} exceeds capacity {capacity}, use the capacity.")
+                amount = capacity
+            result[name] = amount
+        return result
+
+    def tryAcquire(self, needs: Resources) -> bool:
+        """Acquire resources if all of them are available."""
+        needs = self._clamp(needs)
+        for name, amount in needs.items():
+            capacity = self.settings.capacity(name)
+            if capacity is not None and self.used.get(name, 0) + amount > capacity:
+                return False
+        for name, amount in needs.items():
+            self.used[name] = self.used.get(name, 0) + amount
+        return True
+
+    def release(self, needs: Resources) -> None:
+        """Release acquired resources."""
+        for name, amount in self._clamp(needs).items():
+            self.used[name] = self.used.get(name, 0) - amount
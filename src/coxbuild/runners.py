@@ -1,22 +1,34 @@
 import asyncio
 import inspect
-from datetime import timedelta
+import os
+from datetime import datetime, timedelta
 from timeit import default_timer as timer
 from typing import Awaitable, Callable
 
 
+def cputime() -> float:
+    """Get CPU time in seconds of current process and its finished children."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
 class Runner:
     """Generic async runner."""
 
     def __init__(self, func: Callable[[], Awaitable | None]) -> None:
         self.func = func
         self.duration = timedelta()
+        self.cputime = timedelta()
+        """CPU time of the whole process and its finished children while running"""
+        self.started: datetime | None = None
         self.exc_type = None
         self.exc_value = None
         self.exc_tb = None
 
     async def __aenter__(self) -> Callable[[], Awaitable | None]:
+        self.started = datetime.now()
         self._tic = timer()
+        self._cputic = cputime()
 
         return self.func
 
@@ -26,8 +38,10 @@ class Runner:
         self.exc_tb = exc_tb
 
         self.duration = timedelta(seconds=timer()-self._tic)
+        self.cputime = timedelta(seconds=cputime()-self._cputic)
 
         del self._tic
+        del self._cputic
         return True
 
     def __await__(self):
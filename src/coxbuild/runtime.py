@@ -1,3 +1,4 @@
+import contextvars
 from typing import TYPE_CHECKING
 
 from coxbuild.configurations import Configuration, ConfigurationAccessor
@@ -10,6 +11,11 @@ if TYPE_CHECKING:
     from coxbuild.tasks import Task
 
 
+currentTask: "contextvars.ContextVar[Task | None]" = contextvars.ContextVar(
+    "currentTask", default=None)
+"""running task for current context, concurrent tasks have their own"""
+
+
 class ExecutionState(ConfigurationAccessor):
     __configname__ = "execution"
 
@@ -51,12 +57,12 @@ class ExecutionState(ConfigurationAccessor):
 
     @property
     def task(self) -> "Task | None":
-        """Get task."""
-        return self.config.get("task") or None
+        """Get the running task of current context."""
+        return currentTask.get()
 
     @task.setter
     def task(self, value: "Task | None") -> None:
-        self.config["task"] = value
+        currentTask.set(value)
 
     @property
     def service(self) -> "Service | None":
@@ -3,32 +3,80 @@ import pathlib
 from dataclasses import asdict
 from datetime import timedelta
 from types import ModuleType
-from typing import Awaitable, Callable
-
-from .configurations import Configuration
-from .configurations.builders import (ConfigurationBuilderCollection,
-                                      JsonConfigurationBuilder,
-                                      YamlConfigurationBuilder)
-from .extensions import Extension, ProjectSettings, withProject
-from .invocation import CommandExecutionArgs, CommandExecutionResult, run
-from .managers import Manager
-from .pipelines import (Pipeline, PipelineContext, PipelineHook,
-                        PipelineResult, TaskContext, TaskHook, afterPipeline,
-                        afterTask, beforePipeline, beforeTask)
-from .runtime import (ExecutionState, withConfig, withEvent,
-                      withExecutionState, withHandler, withManager,
-                      withPipeline, withService, withTask)
-from .services import EventHandler, Service, on
-from .tasks import (after, asafter, asbefore, aspostcond, asprecond, assetup,
-                    asteardown, before, continueOnError, depend, group, named,
-                    postcond, precond, setup, task, teardown)
-
-manager = Manager()
-execute = manager.execute
-executeAsync = manager.executeAsync
-
-
-def ext(extension: ModuleType | str) -> Extension:
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+if TYPE_CHECKING:
+    from .configurations import Configuration
+    from .configurations.builders import (ConfigurationBuilderCollection,
+                                          JsonConfigurationBuilder,
+                                          YamlConfigurationBuilder)
+    from .extensions import Extension, ProjectSettings, withProject
+    from .invocation import (CommandExecutionArgs, CommandExecutionResult,
+                             CommandPipeline, run, runAsync, runMany, runManyAsync)
+    from .managers import Manager
+    from .pipelines import (Pipeline, PipelineContext, PipelineHook,
+                            PipelineResult, TaskContext, TaskHook, afterPipeline,
+                            afterTask, beforePipeline, beforeTask)
+    from .runtime import (ExecutionState, withConfig, withEvent,
+                          withExecutionState, withHandler, withManager,
+                          withPipeline, withService, withTask)
+    from .services import EventHandler, Service, on
+    from .tasks import (after, asafter, asbefore, aspostcond, asprecond, assetup,
+                        asteardown, before, cached, continueOnError, depend,
+                        group, inprocesspool, inputs, named, outputs, postcond, precond,
+                        resources, setup, task, teardown, timeout)
+
+    manager: Manager
+    execute = manager.execute
+    executeAsync = manager.executeAsync
+
+# names are imported on first access, to keep 'import coxbuild.schema' cheap
+_lazy: dict[str, str] = {
+    **dict.fromkeys(["Configuration"], ".configurations"),
+    **dict.fromkeys(["ConfigurationBuilderCollection", "JsonConfigurationBuilder",
+                     "YamlConfigurationBuilder"], ".configurations.builders"),
+    **dict.fromkeys(["Extension", "ProjectSettings", "withProject"], ".extensions"),
+    **dict.fromkeys(["CommandExecutionArgs", "CommandExecutionResult", "CommandPipeline",
+                     "run", "runAsync", "runMany", "runManyAsync"], ".invocation"),
+    **dict.fromkeys(["Manager"], ".managers"),
+    **dict.fromkeys(["Pipeline", "PipelineContext", "PipelineHook", "PipelineResult", "TaskContext",
+                     "TaskHook", "afterPipeline", "afterTask", "beforePipeline", "beforeTask"], ".pipelines"),
+    **dict.fromkeys(["ExecutionState", "withConfig", "withEvent", "withExecutionState", "withHandler",
+                     "withManager", "withPipeline", "withService", "withTask"], ".runtime"),
+    **dict.fromkeys(["EventHandler", "Service", "on"], ".services"),
+    **dict.fromkeys(["after", "asafter", "asbefore", "aspostcond", "asprecond", "assetup", "asteardown",
+                     "before", "cached", "continueOnError", "depend", "group", "inprocesspool", "inputs",
+                     "named", "outputs", "postcond", "precond", "resources", "setup", "task", "teardown",
+                     "timeout"], ".tasks"),
+}
+
+__all__ = ["importlib", "pathlib", "asdict", "timedelta", "ModuleType", "Awaitable", "Callable",
+           *_lazy, "manager", "execute", "executeAsync", "ext"]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _lazy:
+        value = getattr(importlib.import_module(_lazy[name], __package__), name)
+    elif name == "manager":
+        from .managers import Manager
+        value = Manager()
+    elif name in ("execute", "executeAsync"):
+        value = getattr(_manager(), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
+
+
+def _manager() -> "Manager":
+    return globals().get("manager") or __getattr__("manager")
+
+
+def ext(extension: ModuleType | str) -> "Extension":
     from .extensions.loader import fromModule
     from .extensions.loader import load as loadext
 
@@ -38,5 +86,5 @@ def ext(extension: ModuleType | str) -> Extension:
     else:
         print(f"Loading extension from module {extension.__name__}")
         extension = fromModule(extension)
-    manager.register(extension)
+    _manager().register(extension)
     return extension
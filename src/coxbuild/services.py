@@ -4,6 +4,7 @@ import logging
 import sys
 import traceback
 from dataclasses import dataclass, field
+from datetime import timedelta
 from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable
 
 from coxbuild.configurations import Configuration
@@ -57,12 +58,23 @@ class EventHandler:
     name: str = ""
     """handler name"""
     extension: "Extension | None" = None
+    timeout: timedelta | None = None
+    """maximum time to handle an event occurrence, None for no limit"""
+
+    def _handler(self) -> Task:
+        timeout = self.handler.timeout
+        if self.timeout is None or (timeout is not None and timeout <= self.timeout):
+            return self.handler
+        handler = self.handler.copy()
+        handler.timeout = self.timeout
+        return handler
 
     async def handle(self, config: Configuration | None = None):
         logger.debug(f"Handle for event: {self.name}.")
 
         config = config or Configuration()
         executionState = ExecutionState(config)
+        handler = self._handler()
 
         try:
             async for context in self.event:
@@ -77,8 +89,8 @@ class EventHandler:
                 logger.debug(f"Event handling: {self.name}({context}).")
 
                 try:
-                    runner = self.handler(
-                        *context.args, **context.kwds) if context else self.handler()
+                    runner = handler(
+                        *context.args, **context.kwds) if context else handler()
                     runner.context.config = config
                     result = await runner
                 except Exception as ex:
@@ -149,7 +161,7 @@ class ServiceRunner(Runner):
         logger.debug("Finish service.")
 
 
-def on(event: Callable[[], Awaitable], safe: bool = False, name: str | None = None):
+def on(event: Callable[[], Awaitable], safe: bool = False, name: str | None = None, timeout: timedelta | float | None = None):
     """
     Decorator to register event handler.
 
@@ -158,7 +170,11 @@ def on(event: Callable[[], Awaitable], safe: bool = False, name: str | None = No
     repeat: repeat times, 0 for no-repeat, positive integer for finite repeat, negative integer for infinite repeat
     safe: prevent exception
     name: handler name, None to use function name
+    timeout: maximum time (timedelta or seconds) to handle each event occurrence, None for no limit
     """
+    if timeout is not None and not isinstance(timeout, timedelta):
+        timeout = timedelta(seconds=timeout)
+
     def decorator(handler: Callable[[], None] | Task | EventHandler | list[EventHandler]) -> EventHandler | list[EventHandler]:
         if isinstance(handler, EventHandler):
             tname = name or handler.name
@@ -175,7 +191,7 @@ def on(event: Callable[[], Awaitable], safe: bool = False, name: str | None = No
             tname = name or handler.__name__
             tk = named(tname)(task(handler))
 
-        eh = EventHandler(event, tk, safe, tname)
+        eh = EventHandler(event, tk, safe, tname, timeout=timeout)
 
         if isinstance(handler, EventHandler):
             return [eh, handler]
@@ -1,16 +1,24 @@
 import asyncio
 import inspect
 import logging
+import os
 import sys
 import traceback
-from dataclasses import dataclass, field
+from concurrent.futures import Executor
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timedelta
+from enum import Enum
 from typing import TYPE_CHECKING, Any, Awaitable, Callable
 
-from coxbuild.configurations import Configuration
+from coxbuild.configurations import Configuration, ConfigurationAccessor
 from coxbuild.hooks import Hook
 
+from . import fingerprints
 from .exceptions import CoxbuildRuntimeException
+from .invocation import ProcessScope, processScope
+from .executors import (invoke, invokeInProcess, picklable, processPool,
+                        threadPool)
+from .resources import normalize as normalizeResources
 from .runners import Runner
 
 if TYPE_CHECKING:
@@ -38,6 +46,42 @@ class TaskPostConditionFailed(TaskRuntimeException):
         super().__init__(task, error="postcondition failed")
 
 
+class TaskTimeoutException(TaskRuntimeException):
+    """
+    Exception to indicate task does not finish before timeout.
+    """
+
+    def __init__(self, task: "Task", timeout: timedelta):
+        super().__init__(task, error=f"timeout ({timeout})")
+
+
+class TaskSettings(ConfigurationAccessor):
+    """Settings for task execution."""
+    __configname__ = "task"
+
+    @property
+    def threads(self) -> int:
+        """Size of the thread pool to run non-coroutine bodies and hooks, 0 to run them in the event loop, default to the number of pipeline jobs."""
+        value = self.get("threads")
+        if value is None:
+            # one thread for each concurrent task
+            return max(int(self.rootConfig.get("pipeline:jobs") or 1), 1)
+        return max(int(value), 0)
+
+    @threads.setter
+    def threads(self, value: int) -> None:
+        self.config["threads"] = value
+
+    @property
+    def processes(self) -> int:
+        """Size of the process pool for tasks running in process pool."""
+        return max(int(self.get("processes") or os.cpu_count() or 1), 1)
+
+    @processes.setter
+    def processes(self, value: int) -> None:
+        self.config["processes"] = value
+
+
 @dataclass
 class TaskContext:
     """Execution context for task."""
@@ -51,6 +95,16 @@ class TaskContext:
     """configuration"""
 
 
+class TaskStatus(Enum):
+    """Final status of a task run."""
+    Success = 0
+    Failing = 1
+    UpToDate = 2
+    Cached = 3
+    Cancelled = 4
+    Timeout = 5
+
+
 @dataclass
 class TaskResult:
     """Execution result for task."""
@@ -60,6 +114,16 @@ class TaskResult:
     """execution duration"""
     exception: TaskRuntimeException | None
     """exception when running"""
+    status: TaskStatus | None = None
+    """final status, default to success or failing by exception"""
+    started: datetime | None = None
+    """start time"""
+    processCputime: timedelta = field(default_factory=timedelta)
+    """CPU time of the whole process and its finished children during execution, including concurrent tasks and the event loop"""
+
+    def __post_init__(self):
+        if self.status is None:
+            self.status = TaskStatus.Success if self.exception is None else TaskStatus.Failing
 
     def __bool__(self):
         return self.exception is None
@@ -67,7 +131,19 @@ class TaskResult:
     @property
     def description(self) -> str:
         """Return result's description string."""
-        return "🟢 SUCCESS" if self else "🔴 FAILING"
+        match self.status:
+            case TaskStatus.UpToDate:
+                return "🔵 UP-TO-DATE"
+            case TaskStatus.Cached:
+                return "🟣 CACHED"
+            case TaskStatus.Cancelled:
+                return "⚪ CANCELLED"
+            case TaskStatus.Timeout:
+                return "🟠 TIMEOUT"
+            case TaskStatus.Failing:
+                return "🔴 FAILING"
+            case _:
+                return "🟢 SUCCESS"
 
     def ensure(self) -> None:
         """Ensure the result is success, otherwise re-raise exception."""
@@ -193,10 +269,24 @@ class Task:
     continueOnError: bool = False
     """continue execution on error"""
     extension: "Extension | None" = None
+    processPool: bool = False
+    """run task body in a worker process"""
+    inputs: list[str] = field(default_factory=list)
+    """glob patterns of input files, for up-to-date checking"""
+    outputs: list[str] = field(default_factory=list)
+    """glob patterns of output files, for up-to-date checking"""
+    cached: bool = False
+    """restore outputs from cache instead of running when possible"""
+    cacheKeys: list[str] = field(default_factory=list)
+    """configuration keys which affect outputs, for cache key"""
+    resources: dict[str, int] = field(default_factory=dict)
+    """resources held while running, for concurrent scheduling"""
+    timeout: timedelta | None = None
+    """maximum running time (from preconditions to postconditions), None for no limit"""
 
     def copy(self) -> "Task":
         """Clone task."""
-        return Task(self.name, self.body, self.description, self.deps.copy(), self.hooks.copy(), self.continueOnError, self.extension)
+        return replace(self, deps=self.deps.copy(), hooks=self.hooks.copy(), inputs=self.inputs.copy(), outputs=self.outputs.copy(), cacheKeys=self.cacheKeys.copy(), resources=self.resources.copy())
 
     def __call__(self, *args: Any, **kwds: Any) -> "TaskRunner":
         """
@@ -265,6 +355,12 @@ class TaskRunner(Runner):
         self.postcond = [postcond for postcond in task.hooks if isinstance(
             postcond, TaskPostconditionHook)]
 
+        self.executor = None
+        self.status: TaskStatus | None = None
+        self.cacheKey: str | None = None
+        self.scope: ProcessScope | None = None
+        """child processes of the running task, created for each run"""
+
         super().__init__(self._run)
 
     async def _before(self):
@@ -298,23 +394,17 @@ class TaskRunner(Runner):
     async def _setup(self):
         logger.debug(f"Task {self.context.task.name} setup hook.")
         for hook in self.setup:
-            af = hook(*self.context.args, **self.context.kwds)
-            if inspect.isawaitable(af):
-                af = await af
+            await invoke(self.executor, hook.hook, *self.context.args, **self.context.kwds)
 
     async def _teardown(self):
         logger.debug(f"Task {self.context.task.name} teardown hook.")
         for hook in self.teardown:
-            af = hook(*self.context.args, **self.context.kwds)
-            if inspect.isawaitable(af):
-                af = await af
+            await invoke(self.executor, hook.hook, *self.context.args, **self.context.kwds)
 
     async def _precond(self):
         logger.debug(f"Task {self.context.task.name} check precondition.")
         for hook in self.precond:
-            pre = hook.hook(*self.context.args, **self.context.kwds)
-            if inspect.isawaitable(pre):
-                pre: bool = await pre
+            pre: bool = await invoke(self.executor, hook.hook, *self.context.args, **self.context.kwds)
 
             if not pre:
                 return pre
@@ -323,15 +413,154 @@ class TaskRunner(Runner):
     async def _postcond(self):
         logger.debug(f"Task {self.context.task.name} check postcondition.")
         for hook in self.postcond:
-            post = hook.hook(*self.context.args, **self.context.kwds)
-            if inspect.isawaitable(post):
-                post: bool = await post
+            post: bool = await invoke(self.executor, hook.hook, *self.context.args, **self.context.kwds)
 
             if not post:
                 return post
         return True
 
+    async def _upToDate(self) -> bool:
+        task = self.context.task
+        if not task.inputs and not task.outputs:
+            return False
+        logger.debug(f"Task {task.name} check up-to-date.")
+        return await invoke(self.executor, fingerprints.upToDate, task, self.context.args, self.context.kwds, self.context.config)
+
+    async def _record(self):
+        task = self.context.task
+        if not task.inputs and not task.outputs:
+            return
+        logger.debug(f"Task {task.name} record fingerprints.")
+        try:
+            await invoke(self.executor, fingerprints.record, task, self.context.args, self.context.kwds, self.context.config)
+        except Exception as ex:
+            logger.warning(
+                f"Failed to record fingerprints for task {task.name}.", exc_info=ex)
+
+    async def _restore(self) -> bool:
+        task = self.context.task
+        self.cacheKey = None
+        if not task.cached or not task.outputs:
+            return False
+        from . import cache
+
+        try:
+            self.cacheKey = await invoke(self.executor, cache.actionKey, task, self.context.args, self.context.kwds, self.context.config)
+            logger.debug(f"Task {task.name} look up cache {self.cacheKey}.")
+            if await invoke(self.executor, cache.restore, self.cacheKey, self.context.config):
+                return True
+            return await cache.fetch(self.cacheKey, self.context.config)
+        except Exception as ex:
+            logger.warning(
+                f"Failed to restore cache for task {task.name}.", exc_info=ex)
+            return False
+
+    async def _save(self):
+        task = self.context.task
+        if self.cacheKey is None:
+            return
+        logger.debug(f"Task {task.name} save cache {self.cacheKey}.")
+        from . import cache
+
+        try:
+            await invoke(self.executor, cache.save, task, self.cacheKey, self.context.config)
+        except Exception as ex:
+            logger.warning(
+                f"Failed to save cache for task {task.name}.", exc_info=ex)
+
+    async def _runInProcess(self):
+        task = self.context.task
+        target = task.body
+        if not picklable(target):
+            if task.extension is None or not task.extension.uri:
+                raise TaskRuntimeException(
+                    task, error="task body cannot be sent to process pool")
+            target = (task.extension.uri, task.name)
+
+        processes = TaskSettings(
+            self.context.config).processes if self.context.config else os.cpu_count() or 1
+        logger.debug(
+            f"Task {task.name} body execute in process pool: {target}.")
+        await invokeInProcess(processPool(processes), target, *self.context.args, **self.context.kwds)
+
+    async def check(self, executor: Executor | None = None) -> bool:
+        """
+        Check whether the task needs to run (not up-to-date, and preconditions pass), without running it.
+
+        Before hooks run first as they do when running, since they inject keyword arguments (e.g. withProject).
+
+        executor: executor for non-coroutine preconditions, None to use the task settings
+        """
+        self.executor = executor or self._executor()
+        if await self._before() == False:
+            return False
+        return not await self._upToDate() and bool(await self._precond())
+
+    def _executor(self) -> Executor | None:
+        """Get the thread pool for non-coroutine bodies and hooks by task settings, None to run them in the event loop."""
+        threads = TaskSettings(self.context.config or Configuration()).threads
+        return threadPool(threads) if threads > 0 else None
+
+    async def _terminate(self):
+        logger.debug(
+            f"Task {self.context.task.name} terminate child processes.")
+        await self.scope.terminate()
+
     async def _run(self):
+        token = processScope.set(self.scope)
+        timeout = self.context.task.timeout
+        expired = False
+        handle = None
+        try:
+            if timeout is None:
+                await self._execute()
+            else:
+                execution = asyncio.ensure_future(self._execute())
+
+                def expire():
+                    nonlocal expired
+                    expired = True
+                    execution.cancel()
+
+                # only expiry is a timeout, TimeoutError raised by the body propagates as it is
+                handle = asyncio.get_running_loop().call_later(
+                    timeout.total_seconds(), expire)
+                await execution
+        except asyncio.CancelledError:
+            if expired:
+                logger.info(
+                    f"Task {self.context.task.name} timeout after {timeout}.")
+                if self.status != TaskStatus.Cancelled:
+                    await self._terminate()
+                self.status = TaskStatus.Timeout
+                raise TaskTimeoutException(self.context.task, timeout) from None
+            if self.status != TaskStatus.Cancelled:
+                self.status = TaskStatus.Cancelled
+                await self._terminate()
+            raise
+        finally:
+            if handle is not None:
+                handle.cancel()
+            processScope.reset(token)
+
+    async def _execute(self):
+        self.executor = self._executor()
+
+        if await self._upToDate():
+            message = f"Task {self.context.task.name} ignored: up-to-date"
+            logger.info(message)
+            print(message)
+            self.status = TaskStatus.UpToDate
+            return
+
+        if await self._restore():
+            message = f"Task {self.context.task.name} ignored: outputs restored from cache"
+            logger.info(message)
+            print(message)
+            self.status = TaskStatus.Cached
+            await self._record()
+            return
+
         pre = await self._precond()
         if not pre:
             message = f"Task {self.context.task.name} ignored: precondition filtered"
@@ -344,10 +573,14 @@ class TaskRunner(Runner):
         try:
             if self.context.task.body is not None:
                 logger.debug(f"Task {self.context.task.name} body execute.")
-                af = self.context.task.body(
-                    *self.context.args, **self.context.kwds)
-                if inspect.isawaitable(af):
-                    af = await af
+                if self.context.task.processPool:
+                    await self._runInProcess()
+                else:
+                    await invoke(self.executor, self.context.task.body, *self.context.args, **self.context.kwds)
+        except asyncio.CancelledError:
+            self.status = TaskStatus.Cancelled
+            await self._terminate()
+            raise
         finally:
             await self._teardown()
 
@@ -355,11 +588,17 @@ class TaskRunner(Runner):
         if not post:
             raise TaskPostConditionFailed(self.context.task)
 
+        await self._record()
+        await self._save()
+
     async def __aenter__(self) -> Callable[[], Awaitable | None]:
         logger.debug(f"Start task {self.context.task.name}.")
         print(f"{'-'*3} 🔻 {self.context.task.name} 🕰️ {datetime.now()} {'-'*3}")
 
         self.result = None
+        self.status = None
+        # processes are also tracked by the enclosing scope, e.g. of the task running this pipeline
+        self.scope = ProcessScope(processScope.get())
 
         res = await super().__aenter__()
 
@@ -379,7 +618,8 @@ class TaskRunner(Runner):
         exception = None if self.exc_value is None else TaskRuntimeException(
             self.context.task, cause=self.exc_value)
         self.result = TaskResult(
-            self.context.task, duration=self.duration, exception=exception)
+            self.context.task, duration=self.duration, exception=exception, status=self.status if self.status in (TaskStatus.Cancelled, TaskStatus.Timeout) or not exception else None,
+            started=self.started, processCputime=self.cputime)
 
         if self.exc_value is not None:
             logger.error("Task execute exception.", exc_info=self.exc_value)
@@ -429,6 +669,93 @@ def continueOnError(inner: Task) -> Task:
     return inner
 
 
+def inprocesspool(inner: Task) -> Task:
+    """
+    Decorator to run task body in a worker process.
+
+    Arguments and return value of the body are pickled, so they must be picklable.
+    """
+    inner.processPool = True
+    return inner
+
+
+def inputs(*patterns: str):
+    """
+    Decorator to declare input files of the task.
+
+    The task is skipped as up-to-date if declared inputs and outputs are unchanged since its last successful run.
+
+    patterns: glob patterns relative to working directory, placeholders {src}, {test}, {docs}, {package} for project paths
+    """
+    def decorator(inner: Task) -> Task:
+        inner.inputs.extend(patterns)
+        return inner
+    return decorator
+
+
+def outputs(*patterns: str):
+    """
+    Decorator to declare output files of the task.
+
+    patterns: glob patterns relative to working directory, placeholders {src}, {test}, {docs}, {package} for project paths
+    """
+    def decorator(inner: Task) -> Task:
+        inner.outputs.extend(patterns)
+        return inner
+    return decorator
+
+
+def cached(*keys: str):
+    """
+    Decorator to cache declared outputs of the task.
+
+    When the task runs with the same arguments, input contents, configuration entries and extension,
+    outputs are restored from the cache instead of running.
+
+    keys: configuration keys which affect outputs
+    """
+    def decorator(inner: Task) -> Task:
+        inner.cached = True
+        inner.cacheKeys.extend(keys)
+        return inner
+    return decorator
+
+
+def timeout(value: timedelta | float):
+    """
+    Decorator to set timeout of the task.
+
+    When the task does not finish in time, it is cancelled, its child processes are terminated,
+    and the result status is TIMEOUT. Non-coroutine bodies are interrupted only when they are waiting for commands,
+    or running in the thread pool (by default, see task:threads).
+
+    value: timedelta or seconds
+    """
+    def decorator(inner: Task) -> Task:
+        inner.timeout = value if isinstance(
+            value, timedelta) else timedelta(seconds=value)
+        return inner
+    return decorator
+
+
+def resources(**needs: Any):
+    """
+    Decorator to declare resources held by the task while running.
+
+    Concurrent pipeline only starts the task when the resources are available,
+    capacities are configured in 'resources' section (e.g. resources:mem=16G, default cpu is the number of CPUs).
+
+    cpu: number of CPUs
+    mem: size of memory, e.g. '4G'
+    lock: name (or list of names) of exclusive locks
+    others: amount of the resource
+    """
+    def decorator(inner: Task) -> Task:
+        inner.resources.update(normalizeResources(needs))
+        return inner
+    return decorator
+
+
 def group(*names: str):
     """
     Decorator to set task group.
@@ -0,0 +1,60 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+@contextmanager
+def fileLock(path: Path) -> Iterator[None]:
+    """
+    Hold an exclusive lock across processes, block until it is acquired.
+
+    path: lock file, created if it does not exist
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK gives up after 10 attempts
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+_units = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parseSize(value: int | str) -> int:
+    """Parse size with an optional unit (K, M, G, T), e.g. '512M'."""
+    if isinstance(value, int):
+        return value
+    value = value.strip().upper().removesuffix("B")
+    unit = value[-1:] if value[-1:] in _units else ""
+    return int(float(value.removesuffix(unit) or 0) * _units[unit])
+
+
+def formatSize(value: int) -> str:
+    """Format size in bytes with a unit, e.g. '1.5M'."""
+    for unit in ("", "K", "M", "G"):
+        if value < 1024:
+            return f"{value:.1f}{unit}" if unit else f"{value}B"
+        value /= 1024
+    return f"{value:.1f}T"
@@ -1,8 +1,12 @@
+import asyncio
 from datetime import timedelta
+from timeit import default_timer as timer
 
 import pytest
 
-from coxbuild.events import delay, limit, occur, once, periodic
+from coxbuild.events import (batch, debounce, delay, distinct, limit, occur,
+                             once, periodic, repeat, throttle)
+from coxbuild.services import EventContext
 
 
 @pytest.mark.asyncio
@@ -44,3 +48,78 @@ async def test_occur():
     c = 0
     await occur(periodic(timedelta(seconds=0.1)))
     assert c == 0
+
+
+async def burst(*groups: list[int], gap: float = 0.3):
+    """Occur with numbers in groups, the numbers in a group occur quickly, and groups are separated by a gap."""
+    for i, group in enumerate(groups):
+        if i:
+            await asyncio.sleep(gap)
+        for n in group:
+            await asyncio.sleep(0.01)
+            yield EventContext.build(n)
+
+
+def values(contexts):
+    return [c.args[0] for c in contexts]
+
+
+@pytest.mark.asyncio
+async def test_debounce():
+    result = [c async for c in debounce(burst([1, 2, 3], [4, 5]), timedelta(seconds=0.1))]
+    assert values(result) == [3, 5]
+
+
+@pytest.mark.asyncio
+async def test_throttle():
+    result = [c async for c in throttle(burst([1, 2, 3], [4, 5], gap=0.5), timedelta(seconds=0.2))]
+    assert values(result) == [1, 3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_batch():
+    result = [c.kwds["contexts"] async for c in batch(burst([1, 2, 3], [4, 5]), window=timedelta(seconds=0.1))]
+    assert [values(b) for b in result] == [[1, 2, 3], [4, 5]]
+
+    result = [c.kwds["contexts"] async for c in batch(burst(list(range(5))), maxsize=2, window=timedelta(seconds=1))]
+    assert [values(b) for b in result] == [[0, 1], [2, 3], [4]]
+
+    # without window, collect occurrences while the consumer is busy
+    result = []
+    async for c in batch(burst(list(range(10)))):
+        result.append(values(c.kwds["contexts"]))
+        await asyncio.sleep(0.05)
+    assert sum(result, []) == list(range(10))
+    assert len(result) < 10
+
+
+@pytest.mark.asyncio
+async def test_distinct():
+    result = [c async for c in distinct(burst([1, 1, 2, 1, 1]))]
+    assert values(result) == [1, 2, 1]
+
+    result = [c async for c in distinct(burst([1, 1, 2, 1], [1, 2]), window=timedelta(seconds=0.2))]
+    assert values(result) == [1, 2, 1, 2]
+
+    result = [c async for c in distinct(burst([1, 3, 5, 2]), key=lambda c: c.args[0] % 2)]
+    assert values(result) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_compose():
+    result = [c async for c in once(batch(burst([1, 2], [3]), window=timedelta(seconds=0.1)))]
+    assert len(result) == 1
+    assert values(result[0].kwds["contexts"]) == [1, 2]
+
+    result = [c async for c in limit(debounce(repeat(lambda: burst([1, 2]), 2), timedelta(seconds=0.1)), 1)]
+    assert values(result) == [2]
+
+    async def forever():
+        while True:
+            await asyncio.sleep(0.01)
+            yield EventContext.build(0)
+    tic = timer()
+    result = [c async for c in limit(throttle(forever(), timedelta(seconds=0.1)), 3)]
+    assert len(result) == 3
+    assert timer() - tic < 1
+    assert len(asyncio.all_tasks()) == 1
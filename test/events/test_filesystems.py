@@ -1,13 +1,18 @@
 import asyncio
 import os
+import threading
 from datetime import timedelta
 from pathlib import Path
 
 import pytest
 
-from coxbuild.events import limit
-from coxbuild.events.filesystems import (FileSystemChangeType, FileSystemEntry,
-                                         changed)
+from coxbuild.events import contents, inotify, limit
+from coxbuild.events.contents import ContentIndex
+from coxbuild.events.filesystems import (DirectoryEntry, FileEntry,
+                                         FileSystemChangeType, FileSystemEntry,
+                                         FileSystemSnapshot, _watch, _watcher,
+                                         changed, diff, globPattern)
+from coxbuild.events.ignores import IgnoreRules
 
 
 @pytest.mark.asyncio
@@ -30,3 +35,297 @@ async def test_changed():
         os.remove(file)
 
     await asyncio.gather(change(), touch())
+
+
+def test_globpattern():
+    pattern = globPattern("**/*.py")
+    assert pattern.fullmatch("a.py")
+    assert pattern.fullmatch("a/b/c.py")
+    assert not pattern.fullmatch("a/b/c.pyc")
+    pattern = globPattern("src/[!_]*.txt")
+    assert pattern.fullmatch("src/a.txt")
+    assert not pattern.fullmatch("src/_a.txt")
+    assert not pattern.fullmatch("src/a/b.txt")
+
+
+async def collect(event, count: int, timeout: float = 5) -> list[tuple[FileSystemChangeType, Path]]:
+    result = []
+
+    async def inner():
+        async for context in limit(event, count):
+            result.append((context.kwds["type"], context.kwds["entry"].path))
+    try:
+        await asyncio.wait_for(inner(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    return result
+
+
+@pytest.mark.skipif(not inotify.available(), reason="inotify is not available")
+@pytest.mark.asyncio
+async def test_inotify(tmp_path: Path):
+    root = tmp_path.resolve()
+    root.joinpath("a").mkdir()
+
+    async def change():
+        await asyncio.sleep(0.2)
+        root.joinpath("a", "x.txt").write_text("x")
+        # new directories are watched recursively
+        root.joinpath("a", "b", "c").mkdir(parents=True)
+        await asyncio.sleep(0.1)
+        root.joinpath("a", "b", "c", "y.txt").write_text("y")
+        root.joinpath("a", "x.txt").unlink()
+
+    events, _ = await asyncio.gather(collect(changed(root, "**/*.txt", {FileSystemChangeType.Create, FileSystemChangeType.Delete}, backend="inotify"), 3), change())
+    assert events == [
+        (FileSystemChangeType.Create, root / "a" / "x.txt"),
+        (FileSystemChangeType.Create, root / "a" / "b" / "c" / "y.txt"),
+        (FileSystemChangeType.Delete, root / "a" / "x.txt"),
+    ]
+
+    async def modify():
+        await asyncio.sleep(0.2)
+        root.joinpath("a", "b", "c", "y.txt").write_text("z")
+        root.joinpath("other.txt").write_text("z")
+
+    # without glob, only the path itself is watched
+    events, _ = await asyncio.gather(collect(changed(root / "a" / "b" / "c", type={FileSystemChangeType.Modify}, backend="inotify"), 1, 1), modify())
+    assert events == []
+    events, _ = await asyncio.gather(collect(changed(root / "a" / "b" / "c" / "y.txt", type={FileSystemChangeType.Modify}, backend="inotify"), 1), modify())
+    assert events == [(FileSystemChangeType.Modify,
+                       root / "a" / "b" / "c" / "y.txt")]
+
+
+@pytest.mark.asyncio
+async def test_overflow(tmp_path: Path):
+    root = tmp_path.resolve()
+    root.joinpath("a.txt").write_text("a")
+    snap = FileSystemSnapshot(root, "*.txt")
+    root.joinpath("b.txt").write_text("b")
+    root.joinpath("a.txt").unlink()
+
+    class Watcher:
+        async def events(self):
+            yield [inotify.InotifyEvent(inotify.IN_Q_OVERFLOW, root)]
+
+    # lost events are recovered by a rescan
+    events = await collect(_watch(Watcher(), root, "*.txt", {FileSystemChangeType.Create, FileSystemChangeType.Delete}, IgnoreRules(), snap), 2)
+    assert sorted(events, key=lambda e: e[0].value) == [
+        (FileSystemChangeType.Create, root / "b.txt"),
+        (FileSystemChangeType.Delete, root / "a.txt"),
+    ]
+
+
+@pytest.mark.skipif(not inotify.available(), reason="inotify is not available")
+@pytest.mark.asyncio
+async def test_inotify_replace(tmp_path: Path):
+    root = tmp_path.resolve()
+    file = root.joinpath("a.txt")
+    file.write_text("a")
+    other = root.joinpath("a.tmp")
+
+    async def save():
+        for content in ["b", "c"]:
+            await asyncio.sleep(0.2)
+            other.write_text(content)
+            other.replace(file)
+
+    # an atomic save modifies the file
+    events, _ = await asyncio.gather(collect(changed(root, "*.txt", {FileSystemChangeType.Create, FileSystemChangeType.Modify}, backend="inotify"), 2, 1), save())
+    assert events == [(FileSystemChangeType.Modify, file)] * 2
+
+    async def replace():
+        await save()
+        await asyncio.sleep(0.2)
+        file.unlink()
+
+    # a single file is still watched after being replaced
+    events, _ = await asyncio.gather(collect(changed(file, type={FileSystemChangeType.Create, FileSystemChangeType.Modify, FileSystemChangeType.Delete}, backend="inotify"), 3), replace())
+    assert events == [(FileSystemChangeType.Modify, file)] * 2 + \
+        [(FileSystemChangeType.Delete, file)]
+
+
+@pytest.mark.asyncio
+async def test_overflow_delivered(tmp_path: Path):
+    root = tmp_path.resolve()
+    root.joinpath("a.txt").write_text("a")
+    snap = FileSystemSnapshot(root, "*.txt")
+
+    class Watcher:
+        async def events(self):
+            root.joinpath("b.txt").write_text("b")
+            yield [inotify.InotifyEvent(inotify.IN_CREATE, root / "b.txt")]
+            root.joinpath("a.txt").unlink()
+            yield [inotify.InotifyEvent(inotify.IN_Q_OVERFLOW, root)]
+
+    # changes delivered before the overflow are not reported again
+    events = await collect(_watch(Watcher(), root, "*.txt", {FileSystemChangeType.Create, FileSystemChangeType.Delete}, IgnoreRules(), snap), 3)
+    assert events == [
+        (FileSystemChangeType.Create, root / "b.txt"),
+        (FileSystemChangeType.Delete, root / "a.txt"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_polling(tmp_path: Path):
+    root = tmp_path.resolve()
+
+    async def change():
+        await asyncio.sleep(0.3)
+        root.joinpath("x.txt").write_text("x")
+
+    events, _ = await asyncio.gather(collect(changed(root, "*.txt", {FileSystemChangeType.Create}, timedelta(seconds=0.05), backend="polling"), 1), change())
+    assert events == [(FileSystemChangeType.Create, root / "x.txt")]
+
+
+def test_snapshot(tmp_path: Path):
+    root = tmp_path.resolve()
+    root.joinpath("a", "b").mkdir(parents=True)
+    root.joinpath("x.txt").write_text("x")
+    root.joinpath("a", "y.txt").write_text("y")
+    root.joinpath("a", "b", "z.txt").write_text("z")
+
+    assert sorted(FileSystemSnapshot(root, "**/*.txt").paths) == [
+        "a/b/z.txt", "a/y.txt", "x.txt"]
+    assert sorted(FileSystemSnapshot(root, "*").paths) == ["a", "x.txt"]
+    assert sorted(FileSystemSnapshot(root, "a/*").paths) == ["a/b", "a/y.txt"]
+    snap = FileSystemSnapshot(root)
+    assert snap.paths == [""]
+    assert isinstance(snap.entry(0), DirectoryEntry)
+    assert str(root) in snap.entries
+
+    old = FileSystemSnapshot(root, "**/*")
+    assert list(diff(old, FileSystemSnapshot(root, "**/*"))) == []
+
+    # same paths, only modification
+    root.joinpath("a", "y.txt").write_text("yy")
+    changes = list(diff(old, FileSystemSnapshot(root, "**/*")))
+    assert (FileSystemChangeType.Modify, root / "a" / "y.txt") in [
+        (t, e.path) for t, e in changes]
+
+    root.joinpath("x.txt").unlink()
+    root.joinpath("a", "b", "w.txt").write_text("w")
+    root.joinpath("a", "b", "z.txt").unlink()
+    root.joinpath("a", "b", "z.txt").mkdir()
+    changes = {(t, e.path, type(e)) for t, e in diff(old, FileSystemSnapshot(root, "**/*"))}
+    assert (FileSystemChangeType.Delete, root / "x.txt", FileEntry) in changes
+    assert (FileSystemChangeType.Create, root / "a" / "b" / "w.txt", FileEntry) in changes
+    assert (FileSystemChangeType.Delete, root / "a" / "b" / "z.txt", FileEntry) in changes
+    assert (FileSystemChangeType.Create, root / "a" / "b" / "z.txt", DirectoryEntry) in changes
+
+
+def test_prune(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    root = tmp_path.resolve()
+    for directory in ["src/a", "node_modules/x/y", "src/__pycache__"]:
+        root.joinpath(directory).mkdir(parents=True)
+        root.joinpath(directory, "f.py").write_text("")
+    root.joinpath(".coxbuildignore").write_text("__pycache__/\n")
+
+    visited = []
+    scandir = os.scandir
+
+    def record(path):
+        visited.append(Path(path))
+        return scandir(path)
+    monkeypatch.setattr(os, "scandir", record)
+
+    snap = FileSystemSnapshot(root, "**/*.py",
+                              IgnoreRules.load(root, ["node_modules/"]))
+    assert snap.paths == ["src/a/f.py"]
+    assert all("node_modules" not in p.parts and "__pycache__" not in p.parts
+               for p in visited)
+
+    if inotify.available():
+        watcher = _watcher(root, "**/*.py", None,
+                           IgnoreRules.load(root, ["node_modules/"]))
+        try:
+            assert set(watcher.inotify.paths) == {
+                root, root / "src", root / "src" / "a"}
+        finally:
+            watcher.close()
+
+
+@pytest.mark.asyncio
+async def test_changed_ignore(tmp_path: Path):
+    root = tmp_path.resolve()
+    root.joinpath("dist").mkdir()
+
+    async def change():
+        await asyncio.sleep(0.3)
+        root.joinpath("dist", "out.txt").write_text("x")
+        root.joinpath("a.log").write_text("x")
+        root.joinpath("a.txt").write_text("x")
+
+    for backend in ["inotify", "polling"] if inotify.available() else ["polling"]:
+        events, _ = await asyncio.gather(collect(changed(root, "**/*", {FileSystemChangeType.Create}, timedelta(seconds=0.05), backend=backend, ignore=["dist/", "*.log"]), 1), change())
+        assert events == [(FileSystemChangeType.Create, root / "a.txt")]
+        for file in ["dist/out.txt", "a.log", "a.txt"]:
+            root.joinpath(file).unlink()
+
+
+@pytest.mark.parametrize("backend", ["inotify", "polling"])
+@pytest.mark.asyncio
+async def test_verify(tmp_path: Path, backend: str, monkeypatch: pytest.MonkeyPatch):
+    if backend == "inotify" and not inotify.available():
+        pytest.skip("inotify is not available")
+    root = tmp_path.resolve().joinpath("src")
+    root.mkdir()
+    file = root.joinpath("a.txt")
+    file.write_text("a")
+    other = root.joinpath("a.tmp")
+
+    async def change():
+        await asyncio.sleep(0.3)
+        os.utime(file, ns=(1, 1))
+        await asyncio.sleep(0.1)
+        file.write_text("a")
+        await asyncio.sleep(0.1)
+        # replaced with the same content
+        other.write_text("a")
+        other.replace(file)
+        await asyncio.sleep(0.1)
+        file.write_text("b")
+
+    threads = set()
+    original = contents.hashFile
+    monkeypatch.setattr(contents, "hashFile",
+                        lambda f: threads.add(threading.get_ident()) or original(f))
+    index = ContentIndex(tmp_path / "hashes.json")
+    events, _ = await asyncio.gather(collect(changed(root, "*.txt", {FileSystemChangeType.Create, FileSystemChangeType.Modify},
+                                                     timedelta(seconds=0.05), backend=backend, verify=index), 3, 2), change())
+    # polling reports changed ctime as creation
+    expected = [(FileSystemChangeType.Modify, file)]
+    if backend == "polling":
+        expected.insert(0, (FileSystemChangeType.Create, file))
+    assert events == expected
+    # files are hashed out of the event loop
+    assert threads and threading.get_ident() not in threads
+
+
+def test_contentindex(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    file = tmp_path / "a.txt"
+    file.write_text("a")
+    key = contents.statKey(file.stat())
+
+    index = ContentIndex(tmp_path / "hashes.json")
+    index.prime({file: key})
+    index.save()
+    assert not index.changed(file)
+    file.write_text("b")
+    assert index.changed(file)
+    os.utime(file, ns=(1, 1))
+    assert not index.changed(file)
+    # throttled saves are skipped within the interval
+    index.save(throttle=True)
+    assert len(ContentIndex(tmp_path / "hashes.json").hashes) == 1
+    index.save()
+
+    hashed = []
+    original = contents.hashFile
+    monkeypatch.setattr(contents, "hashFile",
+                        lambda f: hashed.append(f) or original(f))
+    # stale keys are removed, and unchanged files are not hashed again
+    index = ContentIndex(tmp_path / "hashes.json")
+    assert list(index.hashes) == [":".join(map(str, contents.statKey(file.stat())))]
+    index.prime({file: contents.statKey(file.stat())})
+    assert hashed == []
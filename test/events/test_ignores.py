@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from coxbuild.events.ignores import IgnoreRules
+
+
+def test_rules():
+    rules = IgnoreRules(["# comment", "", "node_modules/", "*.log", "!keep.log",
+                         "/dist", "docs/**/draft", "\\#hash"])
+    assert rules.ignored("node_modules", True)
+    assert rules.ignored("web/node_modules", True)
+    assert not rules.ignored("node_modules", False)
+    assert rules.ignored("a.log", False)
+    assert rules.ignored("src/a.log", False)
+    assert not rules.ignored("src/keep.log", False)
+    assert rules.ignored("dist", True)
+    assert not rules.ignored("src/dist", True)
+    assert rules.ignored("docs/draft", False)
+    assert rules.ignored("docs/a/b/draft", True)
+    assert rules.ignored("#hash", False)
+    assert not rules.ignored("src", True)
+    assert not IgnoreRules()
+
+
+def test_load(tmp_path: Path):
+    tmp_path.joinpath(".coxbuildignore").write_text("build/\n*.tmp\n")
+    tmp_path.joinpath(".gitignore").write_text("*.pyc\n")
+
+    rules = IgnoreRules.load(tmp_path, ["!a.tmp"])
+    assert rules.ignored("build", True)
+    assert rules.ignored("b.tmp", False)
+    assert not rules.ignored("a.tmp", False)
+    assert not rules.ignored("a.pyc", False)
+
+    rules = IgnoreRules.load(tmp_path, files=[".gitignore"])
+    assert rules.ignored("a.pyc", False)
+    assert not rules.ignored("build", True)
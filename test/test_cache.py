@@ -0,0 +1,148 @@
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from coxbuild.cache import ActionCache, CacheSettings, actionKey
+from coxbuild.cache import remote as remotecache
+from coxbuild.cache.remote import RemoteCache, RemoteCacheException
+from coxbuild.cache.server import createServer
+from coxbuild.configurations import Configuration
+from coxbuild.pipelines import Pipeline
+from coxbuild.tasks import Task, TaskStatus, cached, inputs, outputs
+from coxbuild.utils import parseSize
+
+
+def test_parse_size():
+    assert parseSize("100") == 100
+    assert parseSize("2K") == 2048
+    assert parseSize("1.5M") == 1536 * 1024
+    assert parseSize("1GB") == 1 << 30
+
+
+def test_put_get(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("a.txt").write_text("a")
+    c = ActionCache(tmp_path.joinpath("cache"), 1 << 20)
+
+    assert c.put("k1", [Path("a.txt")])
+    os.remove("a.txt")
+    assert c.get("k1")
+    assert Path("a.txt").read_text() == "a"
+    assert not c.get("k2")
+
+
+def test_prune(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    c = ActionCache(tmp_path.joinpath("cache"), 1 << 30)
+    for i in range(3):
+        c.write(f"k{i}", os.urandom(1024))
+        os.utime(c.entry(f"k{i}"), ns=(i * 10**9, i * 10**9))
+
+    assert c.stats().entries == 3
+    assert c.prune(1024) == 2
+    assert c.has("k2")
+    assert not c.has("k0")
+
+
+@pytest.mark.asyncio
+async def test_task_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = Configuration()
+    CacheSettings(config).path = tmp_path.joinpath("cache")
+    Path("in.txt").write_text("a")
+    c = 0
+
+    def build():
+        nonlocal c
+        c += 1
+        Path("out.txt").write_text("out")
+
+    r = cached()(outputs("out.txt")(inputs("in.txt")(Task(body=build))))
+
+    runner = r()
+    runner.context.config = config
+    res = await runner
+    assert res.status == TaskStatus.Success
+
+    os.remove("out.txt")
+    os.remove(".coxbuild/fingerprints.json")
+
+    runner = r()
+    runner.context.config = config
+    res = await runner
+    assert res.status == TaskStatus.Cached
+    assert c == 1
+    assert Path("out.txt").read_text() == "out"
+
+
+def test_action_key(tmp_path, monkeypatch):
+    keys = []
+    for name in ("a", "b"):
+        root = tmp_path.joinpath(name)
+        root.joinpath("src").mkdir(parents=True)
+        root.joinpath("src", "in.txt").write_text("a")
+        monkeypatch.chdir(root)
+        # placeholders expand to absolute paths
+        keys.append(actionKey(inputs("{src}/*.txt")(Task()), [], {}, None))
+    assert keys[0] == keys[1]
+
+    Path("src/in.txt").write_text("b")
+    assert actionKey(inputs("{src}/*.txt")(Task()), [], {}, None) != keys[0]
+
+
+def test_remote(tmp_path):
+    server = createServer(tmp_path.joinpath("remote"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address[:2]
+        with RemoteCache(f"http://{host}:{port}/cache") as remote:
+            assert remote.get("k1") is None
+            remote.put("k1", b"data")
+            assert remote.get("k1") == b"data"
+            futures = [remote.upload(f"k{i}", bytes([i])) for i in range(2, 10)]
+            remote.wait()
+            assert all(f.done() for f in futures)
+            assert remote.get("k5") == bytes([5])
+
+            futures = [remote.upload(f"l{i}", bytes([i])) for i in range(10)]
+        # uploads are flushed on close
+        assert all(f.done() and f.exception() is None for f in futures)
+        with pytest.raises(RemoteCacheException):
+            remote.upload("k1", b"data")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_remote(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = createServer(tmp_path.joinpath("remote"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address[:2]
+        config = Configuration()
+        CacheSettings(config).path = tmp_path.joinpath("cache")
+        CacheSettings(config).remote = f"http://{host}:{port}/cache"
+        Path("in.txt").write_text("a")
+
+        def build():
+            Path("out.txt").write_text("out")
+
+        p = Pipeline()
+        p.register(cached()(outputs("out.txt")(
+            inputs("in.txt")(Task(name="build", body=build)))))
+        runner = p("build")
+        runner.context.config = config
+        assert await runner
+
+        # uploads are flushed when the pipeline finishes
+        assert not remotecache._clients
+        assert len(list(tmp_path.joinpath("remote").glob("*/*"))) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
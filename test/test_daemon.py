@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import coxbuild
+
+pytestmark = pytest.mark.skipif(
+    os.name != "posix", reason="Unix socket is required.")
+
+
+def environ(cwd: Path) -> dict[str, str]:
+    return os.environ | {"PYTHONPATH": str(Path(coxbuild.__file__).parent.parent), "COXBUILD_CACHE": str(cwd / ".cache")}
+
+
+def client(cwd: Path, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-m", "coxbuild.client", *args], cwd=cwd, capture_output=True, text=True, timeout=30, env=environ(cwd))
+
+
+def test_daemon(tmp_path: Path):
+    schema = tmp_path.joinpath("buildcox.py")
+    schema.write_text("""
+ext("file://lib.py")
+
+@task
+def hello():
+    print("hello from daemon")
+""")
+    lib = tmp_path.joinpath("lib.py")
+    lib.write_text("""
+@task
+def greet():
+    print("greet from lib")
+""")
+    daemon = subprocess.Popen([sys.executable, "-m", "coxbuild", "--daemon", "-vvv"], cwd=tmp_path, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              text=True, env=environ(tmp_path), preexec_fn=lambda: os.umask(0))
+    try:
+        sock = tmp_path.joinpath(".coxbuild", "daemon.sock")
+        for _ in range(100):
+            if sock.exists():
+                break
+            time.sleep(0.1)
+        assert sock.exists()
+        # not accessible by other users, even with a permissive umask
+        assert sock.stat().st_mode & 0o777 == 0o600
+
+        result = client(tmp_path, "hello")
+        assert result.returncode == 0
+        assert "hello from daemon" in result.stdout
+
+        result = client(tmp_path, "hello", "-vvv")
+        assert "Reuse loaded schema" in result.stdout
+
+        # not a nested daemon
+        result = client(tmp_path, "hello", "--daemon")
+        assert result.returncode == 0
+        assert "hello from daemon" in result.stdout
+
+        lib.write_text("""
+@task
+def greet():
+    print("greet from changed lib")
+""")
+        result = client(tmp_path, "greet", "-vvv")
+        assert "Load schema" in result.stdout
+        assert "greet from changed lib" in result.stdout
+
+        schema.write_text("""
+@task
+def hello():
+    raise Exception("changed")
+""")
+        result = client(tmp_path, "hello", "-vvv")
+        assert result.returncode == 1
+        assert "Load schema" in result.stdout
+        assert "changed" in result.stdout
+    finally:
+        daemon.terminate()
+        daemon.wait(10)
+    assert not sock.exists()
@@ -0,0 +1,99 @@
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+from coxbuild import history
+from coxbuild.configurations import Configuration
+from coxbuild.history import History, percentile
+from coxbuild.pipelines import Pipeline, PipelineResult, PipelineSettings
+from coxbuild.tasks import Task, TaskResult
+
+
+def run(**durations: float) -> PipelineResult:
+    return PipelineResult(timedelta(seconds=sum(durations.values())),
+                          [TaskResult(Task(name), timedelta(seconds=d), None) for name, d in durations.items()], targets=["default"])
+
+
+def test_percentile():
+    assert percentile([], 50) == 0
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile([1, 2], 50) == 1.5
+    assert percentile(range(101), 95) == 95
+
+
+def test_estimates(tmp_path):
+    h = History(tmp_path.joinpath("history.db"))
+    assert h.estimates(["a"]) == {"a": 1.0}
+
+    h.record(run(a=1, b=4))
+    h.record(run(a=3))
+    assert h.durations("a") == [3, 1]
+    assert h.estimates(["a", "b", "c"]) == {"a": 2, "b": 4, "c": 3}
+
+    # process CPU time overlaps with concurrent tasks, it is not an estimate
+    result = run(a=1)
+    result.tasks[0].processCputime = timedelta(seconds=100)
+    h.record(result)
+    assert h.estimates(["a"]) == {"a": 1}
+    assert h.statistics()[0].processCputime == 0
+
+
+def test_runs(tmp_path):
+    h = History(tmp_path.joinpath("history.db"))
+    for i in range(5):
+        h.record(run(a=i, b=10))
+
+    runs = h.runs(3)
+    assert len(runs) == 3
+    assert runs[0].targets == ["default"]
+    assert runs[0].duration == 14
+
+    stats = h.statistics(3)
+    assert [s.name for s in stats] == ["b", "a"]
+    assert stats[1].count == 3
+    assert stats[1].p50 == 3
+    assert stats[1].last == 4
+
+
+def test_priorities(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    history.store().record(run(short=1, long=10, final=1))
+
+    p = Pipeline()
+    short = Task("short")
+    long = Task("long")
+    final = Task("final", deps=[short, long])
+    for t in (short, long, final):
+        p.register(t)
+
+    runner = p("final")
+    runner.context.config = Configuration()
+    # history is opt-in
+    assert runner._priorities()[long] == 2
+
+    PipelineSettings(runner.context.config).history = True
+    priorities = runner._priorities()
+    assert priorities[final] == 1
+    assert priorities[long] == 11
+    assert priorities[short] == 2
+
+
+@pytest.mark.asyncio
+async def test_record(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    p = Pipeline()
+    p.register(Task("a", body=lambda: None))
+
+    runner = p("a")
+    runner.context.config = Configuration()
+    assert await runner
+    assert not Path(".coxbuild/history.db").exists()
+
+    runner = p("a")
+    runner.context.config = Configuration()
+    PipelineSettings(runner.context.config).history = True
+    assert await runner
+    runs = history.store().runs(10)
+    assert len(runs) == 1
+    assert runs[0].targets == ["a"]
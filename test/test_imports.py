@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import coxbuild
+
+
+def imported(code: str) -> set[str]:
+    result = subprocess.run([sys.executable, "-c", code + "\nimport sys\nprint(' '.join(sys.modules))"],
+                            capture_output=True, text=True, env=os.environ | {"PYTHONPATH": str(Path(coxbuild.__file__).parent.parent)})
+    return set(result.stdout.split())
+
+
+def test_lazy_schema():
+    modules = imported("import coxbuild.schema")
+    assert "coxbuild.pipelines" not in modules
+    assert "asyncio" not in modules
+
+    modules = imported("from coxbuild.schema import *\nmanager")
+    assert "coxbuild.pipelines" in modules
+    assert "yaml" not in modules
+    assert "urllib.request" not in modules
+    assert "sqlite3" not in modules
+
+
+def test_lazy_main():
+    modules = imported("import coxbuild.__main__")
+    for name in ("yaml", "asyncio", "graphlib", "coxbuild.configurations.builders"):
+        assert name not in modules
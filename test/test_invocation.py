@@ -1,7 +1,16 @@
+import asyncio
+import io
+import os
+import sys
 from datetime import timedelta
+from timeit import default_timer as timer
+
+import pytest
 
 from coxbuild import get_working_directory
-from coxbuild.invocation import CommandExecutionArgs, run
+from coxbuild.invocation import (CommandExecutionArgs,
+                                 CommandExecutionException, CommandPipeline,
+                                 chunked, run, runAsync, runMany, runManyAsync)
 
 
 def test_run():
@@ -20,3 +29,273 @@ def test_timeout():
         ["ping", "bing.com"], cwd=get_working_directory(), timeout=timedelta(seconds=0.2), pipe=True, fail=True)
     assert not result
     assert result.timeout
+
+
+@pytest.mark.asyncio
+async def test_runasync():
+    result = await runAsync(
+        [sys.executable, "-c", "print('abc')"], cwd=get_working_directory(), pipe=True)
+    assert result
+    assert result.stdout == "abc\n"
+
+    result = await runAsync(
+        [sys.executable, "-c", "import sys; print(sys.stdin.read().upper())"], input="abc", pipe=True)
+    assert result.stdout == "ABC\n"
+
+    missing = [sys.executable, "-c", "open('abc.txt')"]
+    result = await runAsync(missing, pipe=True, fail=True, retry=1)
+    assert not result
+    assert result.code != 0
+    with pytest.raises(CommandExecutionException):
+        await runAsync(missing, pipe=True)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX shell is required.")
+@pytest.mark.asyncio
+async def test_runasync_shell():
+    result = await runAsync(
+        ["echo abc"], shell=True, cwd=get_working_directory(), pipe=True)
+    assert result
+    assert result.stdout == "abc\n"
+
+
+@pytest.mark.asyncio
+async def test_runasync_concurrent():
+    cmd = [sys.executable, "-c",
+           "import time; print('begin', flush=True); time.sleep(10)"]
+    tic = timer()
+    results = await asyncio.gather(*[runAsync(cmd, timeout=timedelta(seconds=0.5), pipe=True, fail=True) for _ in range(3)])
+    assert timer() - tic < 5
+    assert all(r.timeout for r in results)
+    assert all(r.stdout == "begin\n" for r in results)
+
+
+SPAM = [sys.executable, "-c",
+        "import sys\nfor i in range(1000): print(i)\nprint('bad', file=sys.stderr)\nsys.exit(1)"]
+
+
+def test_streaming(tmp_path):
+    lines = []
+    result = run(SPAM, callback=lambda name, line: lines.append((name, line)),
+                 tee=tmp_path / "out.log", tail=3, fail=True)
+    assert result.code == 1
+    assert [line for name, line in lines if name == "stdout"] == [
+        str(i) for i in range(1000)]
+    assert ("stderr", "bad") in lines
+    assert result.stdout == "997\n998\n999\n"
+    assert result.stderr == "bad\n"
+    assert (tmp_path / "out.log").read_text().count("\n") == 1001
+
+    with pytest.raises(CommandExecutionException) as ex:
+        run(SPAM, tee=tmp_path / "out.log", tail=1)
+    assert "0\n" not in str(ex.value)
+    assert "999" in str(ex.value)
+    assert "out.log" in str(ex.value)
+
+
+@pytest.mark.asyncio
+async def test_streaming_async(tmp_path):
+    lines = []
+
+    async def callback(name, line):
+        lines.append(line)
+    result = await runAsync(SPAM, callback=callback, tail=2, fail=True)
+    assert len(lines) == 1001
+    assert result.stdout == "998\n999\n"
+
+    stream = CommandExecutionArgs(SPAM, tail=2).stream(fail=True)
+    received = [item async for item in stream]
+    assert len(received) == 1001
+    assert received[0] == ("stdout", "0")
+    assert stream.result.code == 1
+
+    with pytest.raises(CommandExecutionException):
+        async for _ in CommandExecutionArgs(SPAM).stream():
+            pass
+
+    # stop early, the command is killed
+    cmd = [sys.executable, "-c",
+           "import time\nwhile True: print('x', flush=True); time.sleep(0.01)"]
+    tic = timer()
+    async for name, line in CommandExecutionArgs(cmd).stream():
+        assert line == "x"
+        break
+    assert timer() - tic < 5
+
+
+def test_chunked():
+    files = [f"file{i}.py" for i in range(10)]
+    commands = chunked(CommandExecutionArgs(["isort"]), files, 4)
+    assert [len(c.cmds) for c in commands] == [5, 5, 3]
+    assert sum((c.cmds[1:] for c in commands), []) == files
+
+    files = ["x" * 1000] * 10000
+    commands = chunked(CommandExecutionArgs(["isort"], env={}), files)
+    assert len(commands) > 1
+    assert sum(len(c.cmds) - 1 for c in commands) == len(files)
+
+
+def test_runmany():
+    ok = CommandExecutionArgs([sys.executable, "-c", "print(1)"], pipe=True)
+    bad = CommandExecutionArgs([sys.executable, "-c", "exit(2)"])
+    slow = CommandExecutionArgs(
+        [sys.executable, "-c", "import time; time.sleep(10)"])
+
+    results = runMany([ok] * 8, jobs=4)
+    assert all(r and r.stdout == "1\n" for r in results)
+
+    results = runMany([ok, bad, ok], fail=True)
+    assert [bool(r) for r in results] == [True, False, True]
+    with pytest.raises(CommandExecutionException) as ex:
+        runMany([ok, bad, ok])
+    assert ex.value.result.code == 2
+
+    tic = timer()
+    results = runMany([bad, slow, slow, slow], jobs=2,
+                      failFast=True, fail=True)
+    assert timer() - tic < 5
+    assert results[0].code == 2
+    assert results[1] is not None and not results[1]
+    assert results[3] is None
+
+
+@pytest.mark.asyncio
+async def test_runmanyasync():
+    ok = CommandExecutionArgs([sys.executable, "-c", "print(1)"], pipe=True)
+    bad = CommandExecutionArgs([sys.executable, "-c", "exit(2)"])
+    slow = CommandExecutionArgs(
+        [sys.executable, "-c", "import time; time.sleep(10)"])
+
+    results = await runManyAsync([ok, bad, ok], jobs=2, fail=True)
+    assert [bool(r) for r in results] == [True, False, True]
+
+    tic = timer()
+    with pytest.raises(CommandExecutionException) as ex:
+        await runManyAsync([bad, slow, slow, slow], jobs=2, failFast=True)
+    assert timer() - tic < 5
+    assert ex.value.result.code == 2
+
+    results = await runManyAsync([bad, slow, slow, slow], jobs=2,
+                                 failFast=True, fail=True)
+    assert results[0].code == 2
+    assert results[1] is not None and not results[1]
+    assert results[3] is None
+
+
+def py(code: str, **kwds) -> CommandExecutionArgs:
+    return CommandExecutionArgs([sys.executable, "-c", code], **kwds)
+
+
+UPPER = "import sys; sys.stdout.write(sys.stdin.read().upper())"
+
+
+def test_pipeline():
+    pipeline = py("print('abc'); print('def')") | py(UPPER) | py(
+        "import sys; print(len(sys.stdin.read().splitlines()))", pipe=True)
+    assert isinstance(pipeline, CommandPipeline)
+    assert len(pipeline.stages) == 3
+    result = pipeline.run()
+    assert result
+    assert result.codes == [0, 0, 0]
+    assert result.stdout == "2\n"
+
+    result = (py(UPPER, input="xyz") | py(UPPER, pipe=True)).run()
+    assert result.stdout == "XYZ"
+
+    # the downstream stage exits early, the upstream one gets a broken pipe
+    result = (py("while True: print('y' * 100)") | py(
+        "import sys; print(sys.stdin.readline().strip()[:3])", pipe=True)).run(fail=True)
+    assert result.results[1].code == 0
+    assert result.results[1].stdout == "yyy\n"
+    assert result.results[0].code != 0
+
+    result = (py("import sys; print('e', file=sys.stderr); exit(3)", pipe=True) | py(UPPER)).run(fail=True)
+    assert not result
+    assert result.codes == [3, 0]
+    assert result.results[0].stderr == "e\n"
+    with pytest.raises(CommandExecutionException):
+        result.ensure()
+
+    tic = timer()
+    result = CommandPipeline([py("import time; time.sleep(10)"), py(UPPER)],
+                             timeout=timedelta(seconds=0.5)).run(fail=True)
+    assert timer() - tic < 5
+    assert result.timeout
+    assert result.results[0].code is None
+
+
+@pytest.mark.asyncio
+async def test_pipelineasync():
+    result = await (py("print('abc')") | py(UPPER) | py(UPPER, pipe=True)).runAsync()
+    assert result.stdout == "ABC\n"
+
+    result = await (py(UPPER, input="xyz") | py("import sys; sys.stdin.read(); exit(4)")).runAsync(fail=True)
+    assert result.codes == [0, 4]
+
+    tic = timer()
+    result = await (py("import time; time.sleep(10)", timeout=timedelta(seconds=0.5)) | py(UPPER)).runAsync(fail=True)
+    assert timer() - tic < 5
+    assert result.timeout
+
+
+COUNT = "import sys; data = sys.stdin.buffer.read(); print(len(data), data[:4])"
+
+
+def test_input(tmp_path):
+    file = tmp_path / "input.bin"
+    file.write_bytes(b"\0\1\2\3" * 100000)
+
+    assert run(py(COUNT).cmds, input=b"\0\1\2",
+               pipe=True).stdout == "3 b'\\x00\\x01\\x02'\n"
+    assert run(py(COUNT).cmds, input=file,
+               pipe=True).stdout == "400000 b'\\x00\\x01\\x02\\x03'\n"
+    with open(file, "rb") as f:
+        f.read(2)
+        assert run(py(COUNT).cmds, input=f,
+                   pipe=True).stdout == "399998 b'\\x02\\x03\\x00\\x01'\n"
+    assert run(py(COUNT).cmds, input=io.BytesIO(b"abcdef"),
+               pipe=True).stdout == "6 b'abcd'\n"
+    assert run(py(COUNT).cmds, input=(b"ab" for _ in range(100000)),
+               pipe=True).stdout == "200000 b'abab'\n"
+
+    # the child exits without reading the whole input
+    assert run(py("print(1)").cmds, input=(b"x" * 65536 for _ in range(1000)),
+               pipe=True).stdout == "1\n"
+
+    result = run(py("import sys; sys.stdout.buffer.write(bytes(range(256)))").cmds,
+                 pipe=True, binary=True)
+    assert result.stdout == bytes(range(256))
+
+    result = (py("import sys; sys.stdout.buffer.write(sys.stdin.buffer.read())", input=file)
+              | py(COUNT, pipe=True)).run()
+    assert result.stdout == "400000 b'\\x00\\x01\\x02\\x03'\n"
+
+    with pytest.raises(TypeError):
+        async def agen():
+            yield b"a"
+        run(py(COUNT).cmds, input=agen())
+
+
+@pytest.mark.asyncio
+async def test_input_async(tmp_path):
+    async def agen():
+        for _ in range(1000):
+            await asyncio.sleep(0)
+            yield b"abc"
+
+    result = await runAsync(py(COUNT).cmds, input=agen(), pipe=True)
+    assert result.stdout == "3000 b'abca'\n"
+
+    file = tmp_path / "input.bin"
+    file.write_bytes(b"\r\n" * 10)
+    result = await runAsync(py("import sys; sys.stdout.buffer.write(sys.stdin.buffer.read())").cmds,
+                            input=file, pipe=True, binary=True)
+    assert result.stdout == b"\r\n" * 10
+
+    lines = []
+    result = await runAsync(py("print('a'); print('b')").cmds, binary=True, callback=lambda name, line: lines.append(line))
+    assert lines == [b"a", b"b"]
+    assert result.stdout == b"a\nb\n"
+
+    result = await (py(UPPER, input=agen()) | py(COUNT, pipe=True)).runAsync()
+    assert result.stdout == "3000 b'ABCA'\n"
@@ -0,0 +1,41 @@
+import os
+
+from coxbuild.extensions import loader
+
+
+def test_compiled(tmp_path, monkeypatch):
+    monkeypatch.setenv("COXBUILD_CACHE", str(tmp_path))
+    src = """
+@task
+def hello():
+    return 1
+"""
+    ext = loader.fromSource(src, "hello.py")
+    assert [t.name for t in ext.tasks] == ["hello"]
+    assert list(loader.get_bytecode_directory().glob(f"{ext.hashcode}.*"))
+
+    def fail(*args, **kwds):
+        raise AssertionError("compiled again")
+
+    monkeypatch.setattr(loader, "compile", fail, raising=False)
+    ext = loader.fromSource(src, "hello.py")
+    assert [t.name for t in ext.tasks] == ["hello"]
+
+    monkeypatch.undo()
+    monkeypatch.setenv("COXBUILD_CACHE", str(tmp_path))
+    code = loader.compiled(src, "other.py", ext.hashcode)
+    assert code.co_filename == "other.py"
+
+
+def test_evict(tmp_path, monkeypatch):
+    monkeypatch.setenv("COXBUILD_CACHE", str(tmp_path))
+    monkeypatch.setattr(loader, "MAX_COMPILED", 3)
+    directory = loader.get_bytecode_directory()
+    for i in range(5):
+        src = f"x = {i}"
+        loader.compiled(src, "x.py", loader.hashed(src))
+        for j, file in enumerate(sorted(directory.glob("*.pyc"), key=lambda f: f.stat().st_mtime_ns)):
+            # distinct modification times
+            os.utime(file, ns=(j * 10**9, j * 10**9))
+    remained = {file.name.split(".")[0] for file in directory.glob("*.pyc")}
+    assert remained == {loader.hashed(f"x = {i}") for i in range(2, 5)}
@@ -1,10 +1,17 @@
 import asyncio
+import sys
+import time
+from timeit import default_timer as timer
 
 import pytest
 
+from coxbuild.configurations import Configuration
 from coxbuild.pipelines import (Pipeline, PipelineBeforeTaskHook, PipelineHook,
-                                TaskHook)
-from coxbuild.tasks import Task
+                                PipelineSettings, TaskHook)
+from coxbuild.invocation import run
+from coxbuild.resources import ResourceSettings
+from coxbuild.runtime import withTask
+from coxbuild.tasks import Task, TaskSettings, TaskStatus, resources
 
 
 def taskpre(l: list):
@@ -49,3 +56,149 @@ async def test_pipeline_before_ignore():
     res = await p("1")
     assert res
     assert len(data) == 0
+
+
+def concurrentpipe(data: list, fail: bool = False) -> Pipeline:
+    p = Pipeline()
+
+    def sleeper(name: str, failed: bool = False):
+        async def f():
+            data.append(f"start {name}")
+            await asyncio.sleep(0.2)
+            data.append(f"end {name}")
+            if failed:
+                raise Exception("failed")
+        return Task(name, f)
+
+    a = sleeper("a", fail)
+    b = sleeper("b")
+    c = Task("c", lambda: data.append("c"), deps=[a, b])
+    for t in (a, b, c):
+        p.register(t)
+    return p
+
+
+@pytest.mark.asyncio
+async def test_concurrent():
+    data = []
+    p = concurrentpipe(data)
+    runner = p("c")
+    runner.context.config = Configuration()
+    PipelineSettings(runner.context.config).jobs = 2
+    res = await runner
+    assert res
+    assert data[:2] == ["start a", "start b"] or data[:2] == [
+        "start b", "start a"]
+    assert data[-1] == "c"
+    assert [r.task.name for r in res.tasks] == [t.name for t in runner.tasks]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sync():
+    p = Pipeline()
+    seen = {}
+
+    async def yielding(context):
+        await asyncio.sleep(0.05)
+
+    def body(name):
+        def f(task: Task):
+            time.sleep(0.5)
+            seen[name] = task.name
+        return withTask(Task(name, f))
+
+    tasks = [body("a"), body("b")]
+    for t in tasks:
+        p.register(t)
+    p.register(Task("c", lambda: None, deps=tasks))
+    p.beforeTask(yielding)
+
+    runner = p("c")
+    runner.context.config = Configuration()
+    PipelineSettings(runner.context.config).jobs = 2
+    tic = timer()
+    res = await runner
+    # synchronous bodies run in the thread pool by default
+    assert timer() - tic < 0.9
+    assert res
+    # each task gets itself, though concurrent tasks interleave
+    assert seen == {"a": "a", "b": "b"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_fail():
+    data = []
+    p = concurrentpipe(data, fail=True)
+    runner = p("c")
+    runner.context.config = Configuration()
+    PipelineSettings(runner.context.config).jobs = 2
+    res = await runner
+    assert not res
+    assert "end b" in data
+    assert "c" not in data
+
+
+@pytest.mark.asyncio
+async def test_fail_fast():
+    data = []
+    p = Pipeline()
+
+    async def fail():
+        await asyncio.sleep(0.1)
+        raise Exception("failed")
+
+    def slow():
+        run([sys.executable, "-c", "import time; time.sleep(10)"])
+
+    a = Task("a", fail)
+    b = Task("b", slow)
+    b.teardown(lambda: data.append("teardown"))
+    c = Task("c", lambda: data.append("c"), deps=[a, b])
+    for t in (a, b, c):
+        p.register(t)
+
+    runner = p("c")
+    runner.context.config = Configuration()
+    PipelineSettings(runner.context.config).jobs = 2
+    PipelineSettings(runner.context.config).failFast = True
+    TaskSettings(runner.context.config).threads = 2
+
+    tic = timer()
+    res = await runner
+    assert timer() - tic < 5
+    assert not res
+    assert data == ["teardown"]
+    assert [r.status for r in res.tasks] == [
+        TaskStatus.Failing, TaskStatus.Cancelled] or [r.status for r in res.tasks] == [TaskStatus.Cancelled, TaskStatus.Failing]
+
+
+@pytest.mark.asyncio
+async def test_resources():
+
+    active = []
+    peak = []
+    p = Pipeline()
+
+    def body(name):
+        async def f():
+            active.append(name)
+            peak.append(len(active))
+            await asyncio.sleep(0.05)
+            active.remove(name)
+        return f
+
+    tasks = [resources(mem="3G", lock="db" if i < 2 else [])(Task(f"t{i}", body(f"t{i}")))
+             for i in range(4)]
+    for t in tasks:
+        p.register(t)
+    p.register(Task("all", lambda: None, deps=tasks))
+
+    runner = p("all")
+    runner.context.config = Configuration()
+    PipelineSettings(runner.context.config).jobs = 4
+    ResourceSettings(runner.context.config).mem = "8G"
+
+    res = await runner
+    assert res
+    assert max(peak) == 2
+    assert tasks[0].resources == {"mem": 3 * 1024 ** 3, "lock:db": 1}
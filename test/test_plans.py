@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+import pytest
+
+from coxbuild.configurations import Configuration
+from coxbuild.extensions import ProjectSettings, withProject
+from coxbuild.pipelines import Pipeline, PipelineSettings
+from coxbuild.plans import plan, simulate, waves
+from coxbuild.tasks import Task
+
+
+def graph():
+    a = Task("a", lambda: None)
+    b = Task("b", lambda: None)
+    c = Task("c", lambda: None, deps=[a])
+    d = Task("d", lambda: None, deps=[b, c])
+    return [a, b, c, d]
+
+
+def test_waves():
+    a, b, c, d = graph()
+    assert waves([a, b, c, d]) == [[a, b], [c], [d]]
+
+
+def test_simulate():
+    tasks = graph()
+    a, b, c, d = tasks
+    durations = {"a": 2, "b": 3, "c": 2, "d": 1}
+
+    res = simulate(tasks, durations, 1)
+    assert res.duration == timedelta(seconds=8)
+
+    res = simulate(tasks, durations, 2)
+    assert res.duration == timedelta(seconds=5)
+    assert res.criticalPath == [a, c, d]
+
+
+@pytest.mark.asyncio
+async def test_plan(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    executed = []
+    p = Pipeline()
+    tasks = graph()
+    tasks[1].body = lambda: executed.append("b")
+    tasks[1].precond(lambda: False)
+    for t in tasks:
+        p.register(t)
+
+    config = Configuration()
+    PipelineSettings(config).history = False
+    res = await plan(p, "d", "e", config=config, preconditions=True, jobs=3)
+
+    assert not res
+    assert res.unmatchedNames == ["e"]
+    assert res.skipped == [tasks[1]]
+    assert [s.duration for s in res.simulations] == [
+        timedelta(seconds=3)] * 3
+    assert executed == []
+    assert "Wave 1" in res.report()
+
+
+@pytest.mark.asyncio
+async def test_plan_project(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    p = Pipeline()
+    a = withProject(Task("a", lambda *, project: None))
+
+    @a.precond
+    def exists(*, project: ProjectSettings):
+        return project.src.exists()
+
+    p.register(a)
+
+    # keyword arguments injected by before hooks are available to preconditions
+    res = await plan(p, "a", config=Configuration(), preconditions=True, jobs=1)
+    assert res.skipped == [a]
+    tmp_path.joinpath("src").mkdir()
+    res = await plan(p, "a", config=Configuration(), preconditions=True, jobs=1)
+    assert res.skipped == []
@@ -75,3 +75,23 @@ async def test_unsafeevent():
     await ser()
 
     assert c == 0
+
+
+@pytest.mark.asyncio
+async def test_timeouthandler():
+    ser = Service()
+    c = 0
+
+    @task
+    async def handler():
+        nonlocal c
+        await asyncio.sleep(5)
+        c = 1
+
+    eh = EventHandler(delay(timedelta(seconds=0.1)), handler,
+                      timeout=timedelta(seconds=0.2))
+    ser.register(eh)
+    await ser()
+
+    assert c == 0
+    assert handler.timeout is None
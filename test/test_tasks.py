@@ -1,8 +1,21 @@
 import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from timeit import default_timer as timer
 
 import pytest
 
-from coxbuild.tasks import Task
+from coxbuild.configurations import Configuration
+from coxbuild.executors import (invokeInProcess, picklable, portable,
+                                processPool)
+from coxbuild.extensions import loader
+from coxbuild.fingerprints import FingerprintStore
+from coxbuild.invocation import processScope, run
+from coxbuild.tasks import (Task, TaskSettings, TaskStatus, inprocesspool,
+                            inputs, outputs, timeout)
 
 
 @pytest.mark.asyncio
@@ -94,3 +107,206 @@ async def test_hook():
     res = await r()
     assert res
     assert c == 3
+
+
+@pytest.mark.asyncio
+async def test_timeout():
+    data = []
+
+    async def f():
+        await asyncio.sleep(5)
+        data.append("body")
+
+    tk = timeout(0.2)(Task(body=f))
+    tk.teardown(lambda: data.append("teardown"))
+    res = await tk()
+    assert not res
+    assert res.status == TaskStatus.Timeout
+    assert data == ["teardown"]
+
+    def g():
+        run([sys.executable, "-c", "import time; time.sleep(10)"])
+
+    tk = timeout(0.2)(Task(body=g))
+    runner = tk()
+    runner.context.config = Configuration()
+    TaskSettings(runner.context.config).threads = 1
+    tic = timer()
+    res = await runner
+    assert timer() - tic < 5
+    assert res.status == TaskStatus.Timeout
+
+    async def h():
+        raise asyncio.TimeoutError()
+
+    # timeout errors raised by the body are failures
+    for tk in (Task(body=h), timeout(5)(Task(body=h))):
+        res = await tk()
+        assert not res
+        assert res.status == TaskStatus.Failing
+        assert isinstance(res.exception.cause, asyncio.TimeoutError)
+
+
+@pytest.mark.parametrize("threads", [None, 2])
+@pytest.mark.asyncio
+async def test_threads(threads: int | None):
+    r = Task(body=lambda: time.sleep(0.5))
+    r.precond(lambda: time.sleep(0.1) or True)
+    runner = r()
+    if threads is not None:
+        runner.context.config = Configuration()
+        TaskSettings(runner.context.config).threads = threads
+
+    gaps = []
+
+    async def ticker():
+        last = timer()
+        while not done:
+            await asyncio.sleep(0.01)
+            now = timer()
+            gaps.append(now - last)
+            last = now
+
+    done = False
+    tick = asyncio.ensure_future(ticker())
+    res = await runner
+    done = True
+    await tick
+
+    assert res
+    # the event loop stays responsive with default settings too
+    assert max(gaps) < 0.2
+
+
+def square(x: int) -> int:
+    return x * x
+
+
+def crash():
+    raise ValueError("crash")
+
+
+def entries(config: Configuration) -> list[str]:
+    return sorted(config.data)
+
+
+@pytest.mark.asyncio
+async def test_inprocesspool():
+    config = Configuration()
+    config["a"] = 1
+    config["b"] = lambda: None
+    TaskSettings(config).processes = 1
+
+    r = inprocesspool(Task(body=square))
+    runner = r(3)
+    runner.context.config = config
+    res = await runner
+    assert res
+
+    r = inprocesspool(Task(body=crash))
+    runner = r()
+    runner.context.config = config
+    res = await runner
+    assert not res
+    assert isinstance(res.exception.cause, ValueError)
+
+    copied = portable(config)
+    assert copied["a"] == 1
+    assert copied.get("b") is None
+    assert await invokeInProcess(processPool(1), entries, config) == ["a", "task:processes"]
+
+
+BUILDFILE = """
+import os
+from pathlib import Path
+
+@inprocesspool
+@task
+def pid(path):
+    Path(path).write_text(str(os.getpid()))
+"""
+
+
+@pytest.mark.asyncio
+async def test_inprocesspool_file(tmp_path, monkeypatch):
+    # workers compile the buildfile again, keep them out of the user cache
+    monkeypatch.setenv("COXBUILD_CACHE", str(tmp_path / ".cache"))
+    file = tmp_path / "build.py"
+    file.write_text(BUILDFILE)
+    ext = loader.fromFile(file)
+    tk = next(t for t in ext.tasks if t.name == "pid")
+    # as registered by Manager
+    tk.extension = ext
+    # bodies of buildfiles are not importable, they are looked up by the extension URI
+    assert not picklable(tk.body)
+
+    out = tmp_path / "pid.txt"
+    runner = tk(str(out))
+    runner.context.config = Configuration()
+    TaskSettings(runner.context.config).processes = 3
+    res = await runner
+    assert res
+    assert int(out.read_text()) != os.getpid()
+
+
+@pytest.mark.asyncio
+async def test_uptodate(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("in.txt").write_text("a")
+    c = 0
+
+    def build():
+        nonlocal c
+        c += 1
+        Path("out.txt").write_text(Path("in.txt").read_text())
+
+    r = outputs("out.txt")(inputs("*.txt", "{src}/*.py")(Task(body=build)))
+
+    res = await r()
+    assert res.status == TaskStatus.Success
+    res = await r()
+    assert res.status == TaskStatus.UpToDate
+    assert res
+    assert c == 1
+
+    Path("in.txt").write_text("ab")
+    res = await r()
+    assert res.status == TaskStatus.Success
+    assert c == 2
+
+    Path("out.txt").unlink()
+    res = await r()
+    assert res.status == TaskStatus.Success
+    assert c == 3
+
+
+RECORD = """
+import sys
+from pathlib import Path
+from coxbuild.fingerprints import FingerprintStore
+store = FingerprintStore(Path(sys.argv[1]))
+for i in range(20):
+    store.set(f"{sys.argv[2]}-{i}", {}, {})
+"""
+
+
+def test_fingerprintstore(tmp_path):
+    path = tmp_path / "fingerprints.json"
+    processes = [subprocess.Popen([sys.executable, "-c", RECORD, str(path), str(i)], env=os.environ | {"PYTHONPATH": os.pathsep.join(sys.path)})
+                 for i in range(4)]
+    assert all(p.wait() == 0 for p in processes)
+    assert len(FingerprintStore(path)._load()) == 80
+
+
+@pytest.mark.asyncio
+async def test_scope():
+    scopes = []
+    inner = Task(body=lambda: scopes.append(processScope.get()))
+
+    async def outer():
+        scopes.append(processScope.get())
+        await inner()
+
+    assert await Task(body=outer)()
+    assert scopes[1].parent is scopes[0]
+    assert scopes[0].parent is None